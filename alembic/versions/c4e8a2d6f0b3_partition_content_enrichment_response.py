@@ -0,0 +1,91 @@
+"""partition content enrichment response by month
+
+Revision ID: c4e8a2d6f0b3
+Revises: a7c3e5f1b9d2
+Create Date: 2025-08-04 11:02:37.160934
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d6f0b3'
+down_revision: Union[str, None] = 'a7c3e5f1b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = 'content_enrichment_response'
+LEGACY = 'content_enrichment_response_legacy'
+# Months of partitions created ahead, core/content_enrichment/partitions.py keeps them coming after that
+MONTHS_AHEAD = 3
+INDEXES = (
+    ('ix_content_enrichment_response_created_at', 'created_at'),
+    ('ix_content_enrichment_response_function_created_at', 'function, created_at'),
+    ('ix_content_enrichment_response_updated_at', 'updated_at'),
+)
+
+
+def _add_months(year: int, month: int, months: int) -> tuple[int, int]:
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def _bound(year: int, month: int) -> str:
+    return f"'{year:04d}-{month:02d}-01 00:00:00+00'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # MANUALLY: the existing table is not copied, it becomes the partition for everything before `boundary` (the
+    # start of next month, UTC) and new monthly partitions take over from there. It is detached by the retention
+    # job like any other partition once all of its rows are past retention.
+    now = datetime.now(timezone.utc)
+    year, month = _add_months(now.year, now.month, 1)
+    boundary = _bound(year, month)
+
+    # Without holding a lock on the live table: the (id, created_at) unique index a partition's primary key needs,
+    # and a validated CHECK matching the partition bound so ATTACH PARTITION doesn't have to scan the table
+    with op.get_context().autocommit_block():
+        op.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {LEGACY}_pkey ON ai.{TABLE} (id, created_at)')
+        op.execute(f'ALTER TABLE ai.{TABLE} ADD CONSTRAINT {LEGACY}_bound CHECK (created_at < {boundary}) NOT VALID')
+        op.execute(f'ALTER TABLE ai.{TABLE} VALIDATE CONSTRAINT {LEGACY}_bound')
+
+    op.execute(f'ALTER TABLE ai.{TABLE} RENAME TO {LEGACY}')
+    op.execute(f'ALTER TABLE ai.{LEGACY} DROP CONSTRAINT {TABLE}_pkey')
+    op.execute(f'ALTER TABLE ai.{LEGACY} ADD CONSTRAINT {LEGACY}_pkey PRIMARY KEY USING INDEX {LEGACY}_pkey')
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX ai.{name} RENAME TO {name.replace(TABLE, LEGACY)}")
+
+    # A partitioned table's primary key has to include the partition key. Lookups by id alone still use it, one
+    # index probe per partition.
+    op.execute(f'CREATE TABLE ai.{TABLE} (LIKE ai.{LEGACY} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+    op.execute(f'ALTER TABLE ai.{TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)')
+    for name, columns in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON ai.{TABLE} ({columns})')
+
+    # The legacy table's indexes match the parent's, so they are attached as its partition indexes, not rebuilt
+    op.execute(f'ALTER TABLE ai.{TABLE} ATTACH PARTITION ai.{LEGACY} FOR VALUES FROM (MINVALUE) TO ({boundary})')
+    op.execute(f'ALTER TABLE ai.{LEGACY} DROP CONSTRAINT {LEGACY}_bound')
+
+    for offset in range(MONTHS_AHEAD):
+        start = _add_months(year, month, offset)
+        end = _add_months(year, month, offset + 1)
+        op.execute(
+            f'CREATE TABLE ai.{TABLE}_p{start[0]:04d}_{start[1]:02d} PARTITION OF ai.{TABLE} '
+            f'FOR VALUES FROM ({_bound(*start)}) TO ({_bound(*end)})'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # MANUALLY: rows of partitions the retention job already detached (ai.*_archived tables) are not brought back
+    op.execute(f'CREATE TABLE ai.{TABLE}_unpartitioned (LIKE ai.{TABLE} INCLUDING DEFAULTS)')
+    op.execute(f'INSERT INTO ai.{TABLE}_unpartitioned SELECT * FROM ai.{TABLE}')
+    op.execute(f'DROP TABLE ai.{TABLE}')
+    op.execute(f'ALTER TABLE ai.{TABLE}_unpartitioned RENAME TO {TABLE}')
+    op.execute(f'ALTER TABLE ai.{TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id)')
+    for name, columns in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON ai.{TABLE} ({columns})')
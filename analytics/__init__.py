@@ -0,0 +1,4 @@
+'''
+    Offline analytics over the rows the API has written (see analytics/cost.py).
+    Run as CLIs against whatever DB_* points at, never imported by the app.
+'''
@@ -0,0 +1,178 @@
+'''
+    Cost analytics over historical content enrichment and summary rows.
+    Everything is aggregated by Postgres in one grouped query: counts, sums and means, and the percentiles with
+    percentile_disc, which is the nearest-rank definition of benchmarks/stats.py. Only one row per group reaches
+    Python, so the client does no per-row work and its memory doesn't grow with the range; Postgres sorts each
+    group's values for the percentiles, spilling to disk past work_mem on very large ranges.
+
+    python -m analytics.cost --dataset content_enrichment --since 2026-01-01 --until 2026-02-01 --group-by function tone model day
+    python -m analytics.cost --dataset summaries --group-by source_type day --format csv --output summaries.csv
+
+    Per group: rows, total/mean/p50/p95/p99 cost_usd, mean/p50/p95/p99 latency_ms and, for content enrichment, the
+    acceptance rate (share of rows with accepted_at set).
+'''
+import sys
+import csv
+import json
+import argparse
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+
+PERCENTILES = (50, 95, 99)
+
+'''
+    Per dataset: the table, the SQL expression of every dimension it can be grouped by, and of every measure.
+    Measures are cast to float8 in Postgres so their sums and percentiles come back as floats rather than Decimals.
+    Summaries have no acceptance, their `accepted` is NULL and the rate is reported as None.
+'''
+DATASETS = {
+    'content_enrichment': {
+        'table': 'ai.content_enrichment_response',
+        'dimensions': {
+            'function': 'function::text',
+            'tone': 'tone',
+            'model': 'ai_model',
+            'day': "(created_at AT TIME ZONE 'UTC')::date::text"
+        },
+        'measures': {
+            'latency_ms': 'latency_ms::float8',
+            'cost_usd': 'cost_usd::float8',
+            'accepted': 'accepted_at IS NOT NULL'
+        }
+    },
+    'summaries': {
+        'table': 'ai.summaries',
+        'dimensions': {
+            'source_type': 'source_type::text',
+            'model': "(SELECT string_agg(model, ',') FROM json_array_elements_text(metadata->'models') AS model)",
+            'day': "(created_at AT TIME ZONE 'UTC')::date::text"
+        },
+        'measures': {
+            'latency_ms': "(metadata->>'latency')::float8 * 1000",
+            'cost_usd': "(metadata->>'cost')::float8",
+            'accepted': 'NULL::boolean'
+        }
+    }
+}
+
+def build_query(dataset: str, group_by: list[str]) -> str:
+    '''
+        Aggregates of the rows created in [:since, :until) per `group_by` dimensions, ordered by them (NULLs first).
+        Columns: the dimensions, rows, acceptance_known, accepted, then cost_total, cost_mean, cost_percentiles,
+        latency_mean and latency_percentiles, the percentiles as arrays in PERCENTILES order.
+    '''
+    config = DATASETS[dataset]
+    columns = [f"{config['dimensions'][name]} AS {name}" for name in group_by]
+    columns += [f'{expression} AS {name}' for name, expression in config['measures'].items()]
+    fractions = f"ARRAY[{', '.join(str(p / 100) for p in PERCENTILES)}]::float8[]"
+    positions = [str(position) for position in range(1, len(group_by) + 1)]
+    return (
+        f"SELECT {''.join(f'{name}, ' for name in group_by)}"
+        'count(*) AS rows, count(accepted) AS acceptance_known, count(*) FILTER (WHERE accepted) AS accepted, '
+        'coalesce(sum(cost_usd), 0) AS cost_total, avg(cost_usd) AS cost_mean, '
+        f'percentile_disc({fractions}) WITHIN GROUP (ORDER BY cost_usd) AS cost_percentiles, '
+        'avg(latency_ms) AS latency_mean, '
+        f'percentile_disc({fractions}) WITHIN GROUP (ORDER BY latency_ms) AS latency_percentiles '
+        f"FROM (SELECT {', '.join(columns)} FROM {config['table']} "
+        'WHERE created_at >= :since AND created_at < :until) AS measured'
+        + (f" GROUP BY {', '.join(positions)} ORDER BY {', '.join(f'{position} NULLS FIRST' for position in positions)}" if positions else '')
+    )
+
+def _round(value: float | None, digits: int) -> float | None:
+    return None if value is None else round(value, digits)
+
+def _percentiles(values: list | None, digits: int) -> dict:
+    '''percentile_disc is NULL for a group with no non-NULL values.'''
+    values = values or [None] * len(PERCENTILES)
+    return {f'p{p}': _round(value, digits) for p, value in zip(PERCENTILES, values)}
+
+def result_row(row, group_by: list[str]) -> dict:
+    '''One group of build_query as reported: the dimensions, counts, acceptance and the cost and latency aggregates.'''
+    acceptance_known = bool(row.acceptance_known)
+    return {
+        **{name: getattr(row, name) for name in group_by},
+        'rows': row.rows,
+        'accepted': row.accepted if acceptance_known else None,
+        'acceptance_rate': round(row.accepted / row.rows, 4) if acceptance_known else None,
+        'cost_usd': {
+            'total': round(row.cost_total, 6),
+            'mean': _round(row.cost_mean, 6),
+            **_percentiles(row.cost_percentiles, 6)
+        },
+        'latency_ms': {
+            'mean': _round(row.latency_mean, 1),
+            **_percentiles(row.latency_percentiles, 1)
+        }
+    }
+
+def flatten(result: dict) -> dict:
+    '''cost_usd/latency_ms sub-dicts as cost_usd_total, latency_ms_p95, ... columns for CSV.'''
+    row = {}
+    for name, value in result.items():
+        if isinstance(value, dict):
+            row.update({f'{name}_{key}': inner for key, inner in value.items()})
+        else:
+            row[name] = value
+    return row
+
+def write_report(report: dict, output, output_format: str):
+    if output_format == 'json':
+        json.dump(report, output, indent = 2, default = str)
+        output.write('\n')
+        return
+    rows = [flatten(result) for result in report['results']]
+    if not rows:
+        return
+    writer = csv.DictWriter(output, fieldnames = list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+def run(dataset: str, group_by: list[str], since: datetime, until: datetime) -> dict:
+    from db.base import engine
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(build_query(dataset, group_by)), {'since': since, 'until': until}).all()
+    return {
+        'dataset': dataset,
+        'group_by': group_by,
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        # Without group_by the one aggregate row comes back even when nothing matched
+        'results': [result_row(row, group_by) for row in rows if row.rows]
+    }
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = 'Grouped cost, latency and acceptance analytics')
+    parser.add_argument('--dataset', choices = list(DATASETS), default = 'content_enrichment')
+    parser.add_argument('--group-by', nargs = '*', default = None, help = 'Dimensions to group by, all of the dataset\'s by default')
+    parser.add_argument('--since', type = date.fromisoformat, default = None, help = 'First day (UTC) included, 7 days before --until by default')
+    parser.add_argument('--until', type = date.fromisoformat, default = None, help = 'First day (UTC) excluded, tomorrow by default')
+    parser.add_argument('--format', choices = ('json', 'csv'), default = 'json')
+    parser.add_argument('--output', default = None, help = 'File to write, stdout by default')
+    args = parser.parse_args(argv)
+
+    dimensions = list(DATASETS[args.dataset]['dimensions'])
+    group_by = dimensions if args.group_by is None else args.group_by
+    unknown = [name for name in group_by if name not in dimensions]
+    if unknown:
+        parser.error(f"unknown dimension(s) for {args.dataset}: {', '.join(unknown)} (choose from {', '.join(dimensions)})")
+
+    until = args.until or datetime.now(timezone.utc).date() + timedelta(days = 1)
+    since = args.since or until - timedelta(days = 7)
+    report = run(
+        args.dataset,
+        group_by,
+        datetime.combine(since, time.min, tzinfo = timezone.utc),
+        datetime.combine(until, time.min, tzinfo = timezone.utc)
+    )
+
+    if args.output:
+        with open(args.output, 'w', newline = '') as f:
+            write_report(report, f, args.format)
+    else:
+        write_report(report, sys.stdout, args.format)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
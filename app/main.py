@@ -1,11 +1,18 @@
+import asyncio
 import logging
 import logging.config
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from core.custom_exceptions import validation_exception_handler
 from app.api import api_router
 from app.middleware.auth import verify_api_key
-from settings import validate_environment
+from app.middleware.timing import server_timing
+from app.middleware.metrics import request_metrics
+from utils.metrics import REGISTRY
+from settings import validate_environment, SUMMARY_WORKER_IN_PROCESS, SUMMARY_PUBLISH_BATCHED
+from utils import create_http_session
 
 # Custom filter class to only allow INFO level logs
 class InfoOnlyFilter:
@@ -54,10 +61,37 @@ logging.config.dictConfig(LOGGING_CONFIG)
 
 validate_environment()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP client for the app's lifetime, shared by everything making outbound calls
+    app.state.http_session = create_http_session()
+    # In production the summaries worker (and outbox dispatcher) runs as its own process (entrypoint.sh worker);
+    # SUMMARY_WORKER_IN_PROCESS runs it alongside the API instead, for local development
+    worker, dispatcher, background_task = None, None, None
+    if SUMMARY_WORKER_IN_PROCESS:
+        from core.summaries.worker import Summary_Worker
+        from core.summaries.publisher import Summary_Publisher
+        from core.summaries.dispatcher import Summary_Outbox_Dispatcher
+        publisher = Summary_Publisher(app.state.http_session) if SUMMARY_PUBLISH_BATCHED else None
+        worker = Summary_Worker()
+        dispatcher = Summary_Outbox_Dispatcher(http_session = app.state.http_session, publisher = publisher)
+        background_task = asyncio.gather(worker.run(), dispatcher.run())
+    yield
+    if worker:
+        worker.stop()
+        dispatcher.stop()
+        await background_task
+        if dispatcher.publisher:
+            await dispatcher.publisher.close()
+    await app.state.http_session.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add middleware
 app.middleware('http')(verify_api_key)
+# Added after auth so they wrap it, and their totals cover the whole request
+app.middleware('http')(server_timing)
+app.middleware('http')(request_metrics)
 
 # Add exception handlers
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -71,3 +105,8 @@ async def root():
 @app.get('/status')
 async def status():
     return {'message': 'Fora AI V2 is up and running 😊'}
+
+@app.get('/metrics', response_class = PlainTextResponse)
+async def metrics():
+    '''Process-wide metrics in the Prometheus text format, see utils/metrics.py.'''
+    return PlainTextResponse(REGISTRY.render(), media_type = 'text/plain; version=0.0.4')
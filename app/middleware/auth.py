@@ -10,7 +10,7 @@ async def verify_api_key(request: Request, call_next):
         Middleware to verify the API key in the Authorization header.
         Expected format: Authorization: Bearer {API_KEY}
     '''
-    # Skip auth for health check endpoints 
+    # Skip auth for health check endpoints; /metrics needs the key (Prometheus scrapes it with authorization credentials)
     if request.url.path in ['/', '/status']:
         return await call_next(request)
     
@@ -0,0 +1,26 @@
+import time
+from fastapi import Request
+
+from utils.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+
+async def request_metrics(request: Request, call_next):
+    '''
+        Latency and in-flight count of every request, for /metrics.
+        Labelled by route template (/v1/content-enrichment/{content_id}/accept), never the raw path, to keep cardinality low.
+    '''
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get('route')
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start_time,
+            method = request.method,
+            route = getattr(route, 'path', 'unmatched'),
+            status = status
+        )
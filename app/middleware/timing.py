@@ -0,0 +1,21 @@
+from fastapi import Request
+
+from utils import StageTimer
+
+async def server_timing(request: Request, call_next):
+    '''
+        Gives every request a StageTimer (request.state.stage_timer) for routes to record their stages in,
+        and returns them as a Server-Timing header.
+        For a streaming response the headers go out before the body, so only the stages recorded by then are included.
+    '''
+    request.state.stage_timer = StageTimer()
+    response = await call_next(request)
+    response.headers['Server-Timing'] = request.state.stage_timer.server_timing()
+    return response
+
+def get_stage_timer(request: Request) -> StageTimer:
+    '''The request's StageTimer, or a fresh one when the middleware isn't installed.'''
+    timer = getattr(request.state, 'stage_timer', None)
+    if timer is None:
+        timer = request.state.stage_timer = StageTimer()
+    return timer
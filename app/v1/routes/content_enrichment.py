@@ -1,72 +1,122 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
-import psycopg2
 import time
 import json
+import asyncio
 import logging
-from datetime import datetime, timezone
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 
 from core.content_enrichment import (
     ContentEnrichmentRequest, ParsedContentEnrichmentResponse,
+    ContentEnrichmentBatchRequest, ContentEnrichmentBatchItemResult, ParsedContentEnrichmentBatchResponse,
     Function, ContentEnrichmentResponse,
-    ContentGenerator
+    ContentGenerator,
+    StatsBucket, StatsDimension, ParsedContentEnrichmentStatsResponse,
+    refresh_rollup_if_stale, query_stats
 )
+from settings import CONTENT_BATCH_CONCURRENCY, CONTENT_STATS_MAX_DAYS
+from app.middleware.timing import get_stage_timer
 
-from db import get_db, BaseDBOperations
+from db import get_async_db, AsyncBaseDBOperations, AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
 content_enrichment_router = APIRouter()
-content_db = BaseDBOperations(ContentEnrichmentResponse)
+content_db = AsyncBaseDBOperations(ContentEnrichmentResponse)
+
+# SQLSTATE Postgres raises for a value its enum type doesn't have
+INVALID_TEXT_REPRESENTATION = "22P02"
+
+def _log_input(request_uuid, request: ContentEnrichmentRequest, function_key, context):
+    # Log input data
+    context_data = context.model_dump()
+    # Truncate long text fields
+    if context_data.get('existing_text'):
+        context_data['existing_text'] = context_data['existing_text'][:200] + "..." if len(context_data['existing_text']) > 200 else context_data['existing_text']
+    if context_data.get('user_instructions'):
+        context_data['user_instructions'] = context_data['user_instructions'][:200] + "..." if len(context_data['user_instructions']) > 200 else context_data['user_instructions']
+
+    logger.info(f"{request_uuid}, [INPUT] Function: {function_key}, Metadata: {json.dumps(request.metadata)}, Output Format: {request.output_format}, Context: {json.dumps(context_data)}")
+
+def _log_output(request_uuid, response: str):
+    # Escape new lines and truncate response for logging
+    response_preview = response[:300] + "..." if len(response) > 300 else response
+    response_preview_clean = response_preview.strip().replace('\n', '\\n')
+    logger.info(f"{request_uuid}, [OUTPUT]: {response_preview_clean}")
+
+def _build_content_record(request: ContentEnrichmentRequest, generator: ContentGenerator, response: str, model: str, latency_ms: int, cost) -> dict:
+    # Passing the enum value (lowercase) instead of the enum itself
+    return {
+        # Stages recorded so far, the DB write of this row is only in the Server-Timing header
+        "content_metadata": {**(request.metadata or {}), **generator.metadata, "timings_ms": generator.timer.as_ms()},
+        "function": generator.function_key,
+        "tone": generator.context.tone,
+        "user_instructions": generator.context.user_instructions,
+        "existing_text": generator.context.existing_text,
+        "ai_response": response,
+        "output_format": generator.output_format,
+        "ai_model": model,
+        "latency_ms": latency_ms,
+        "cost_usd": cost
+    }
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _store_batch(db: AsyncSession, batch_uuid, records: list) -> list:
+    """
+    Bulk insert of the batch's records. If it fails, the records are stored one by one instead, so one bad row
+    doesn't throw away every generation of the batch. None for each record that couldn't be stored.
+    """
+    if not records:
+        return []
+    try:
+        return await content_db.create_many(db, records)
+    except Exception as e:
+        logger.exception(f"{batch_uuid}, Error storing batch content, storing items one by one: {str(e)}")
+        await db.rollback()
+
+    stored_contents = []
+    for record in records:
+        try:
+            stored_contents.append(await content_db.create(db, record))
+        except Exception as e:
+            logger.exception(f"{batch_uuid}, Error storing batch item: {str(e)}")
+            await db.rollback()
+            stored_contents.append(None)
+    return stored_contents
 
 @content_enrichment_router.post("/", response_model=ParsedContentEnrichmentResponse)
 async def content_enrichment(
     request: ContentEnrichmentRequest,
-    db: Session = Depends(get_db)
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         request_uuid = uuid.uuid4()
+        timer = get_stage_timer(http_request)
+        # Everything before the handler: auth, reading and validating the body, dependencies
+        timer.add("validation", timer.elapsed())
         function_key, context = request.get_function_data()
-        
-        # Log input data
-        context_data = context.model_dump()
-        # Truncate long text fields
-        if context_data.get('existing_text'):
-            context_data['existing_text'] = context_data['existing_text'][:200] + "..." if len(context_data['existing_text']) > 200 else context_data['existing_text']
-        if context_data.get('user_instructions'):
-            context_data['user_instructions'] = context_data['user_instructions'][:200] + "..." if len(context_data['user_instructions']) > 200 else context_data['user_instructions']
-        
-        logger.info(f"{request_uuid}, [INPUT] Function: {function_key}, Metadata: {json.dumps(request.metadata)}, Output Format: {request.output_format}, Context: {json.dumps(context_data)}")
+        _log_input(request_uuid, request, function_key, context)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Handle all business logic
-        generator = ContentGenerator(request)
+        generator = ContentGenerator(request, timer)
         response, model, cost = await generator.generate()
-
-        # Escape new lines and truncate response for logging
-        response_preview = response[:300] + "..." if len(response) > 300 else response
-        response_preview_clean = response_preview.strip().replace('\n', '\\n')
-        logger.info(f"{request_uuid}, [OUTPUT]: {response_preview_clean}")
+        _log_output(request_uuid, response)
 
         # Calculate latency in milliseconds
-        generation_time = time.time()
-        latency_ms = int((generation_time - start_time) * 1000)
-
-        # Store everything - passing the enum value (lowercase) instead of the enum itself
-        stored_content = content_db.create(db, {
-            "content_metadata": request.metadata,
-            "function": generator.function_key,
-            "tone": generator.context.tone,
-            "user_instructions": generator.context.user_instructions,
-            "existing_text": generator.context.existing_text,
-            "ai_response": response,
-            "output_format": generator.output_format,
-            "ai_model": model,
-            "latency_ms": latency_ms,
-            "cost_usd": cost
-        })
+        latency_ms = int((time.perf_counter() - start_time) * 1000)
+
+        # Store everything
+        with timer.stage("db_write"):
+            stored_content = await content_db.create(db, _build_content_record(request, generator, response, model, latency_ms, cost))
 
         return ParsedContentEnrichmentResponse(
             id=str(stored_content.id),
@@ -75,7 +125,11 @@ async def content_enrichment(
     except ValueError as e:
         logger.exception(f"{request_uuid}, ValueError occurred")
         raise HTTPException(status_code=400, detail=f"{request_uuid}, {str(e)}")
-    except (psycopg2.errors.InvalidTextRepresentation) as e:
+    except DBAPIError as e:
+        # asyncpg errors all come through as a generic DBAPIError, only the SQLSTATE tells a bad enum value apart
+        if getattr(e.orig, "sqlstate", None) != INVALID_TEXT_REPRESENTATION:
+            logger.exception(f"{request_uuid}, Error in /v1/content-enrichment endpoint: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"{request_uuid}, Content enrichment failed")
         logger.exception(f"{request_uuid}, Invalid enum value error: {str(e)}")
         raise HTTPException(
             status_code=400,
@@ -85,10 +139,162 @@ async def content_enrichment(
         logger.exception(f"{request_uuid}, Error in /v1/content-enrichment endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"{request_uuid}, Content enrichment failed")
 
+@content_enrichment_router.post("/stream")
+async def content_enrichment_stream(request: ContentEnrichmentRequest, http_request: Request):
+    """
+    Streaming variant of the content enrichment endpoint, as Server-Sent Events.
+
+    Emits `delta` events ({"text": ...}) as tokens are generated, then a single `done` event
+    ({"id": ..., "text": ...}) once the full response has been stored, or an `error` event.
+    """
+    request_uuid = uuid.uuid4()
+    timer = get_stage_timer(http_request)
+    timer.add("validation", timer.elapsed())
+    try:
+        function_key, context = request.get_function_data()
+        _log_input(request_uuid, request, function_key, context)
+        generator = ContentGenerator(request, timer)
+    except ValueError as e:
+        logger.exception(f"{request_uuid}, ValueError occurred")
+        raise HTTPException(status_code=400, detail=f"{request_uuid}, {str(e)}")
+
+    async def event_stream():
+        try:
+            start_time = time.perf_counter()
+            async for delta in generator.stream():
+                yield _sse_event("delta", {"text": delta})
+
+            response, model, cost = generator.result
+            _log_output(request_uuid, response)
+            latency_ms = int((time.perf_counter() - start_time) * 1000)
+
+            # Dependencies with yield are torn down before a streaming body is sent, so the row is written on its own session
+            with timer.stage("db_write"):
+                async with AsyncSessionLocal() as db:
+                    stored_content = await content_db.create(db, _build_content_record(request, generator, response, model, latency_ms, cost))
+
+            yield _sse_event("done", {"id": str(stored_content.id), "text": stored_content.ai_response})
+        except Exception as e:
+            logger.exception(f"{request_uuid}, Error in /v1/content-enrichment/stream endpoint: {str(e)}")
+            yield _sse_event("error", {"detail": f"{request_uuid}, Content enrichment failed"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@content_enrichment_router.post("/batch", response_model=ParsedContentEnrichmentBatchResponse)
+async def content_enrichment_batch(
+    request: ContentEnrichmentBatchRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Run many content enrichment requests in one call.
+
+    Items are generated concurrently (at most CONTENT_BATCH_CONCURRENCY at a time) and every
+    successful item is stored with a single bulk insert. Results are returned in request order;
+    an item that fails carries an error instead of failing the whole batch.
+    """
+    batch_uuid = uuid.uuid4()
+    timer = get_stage_timer(http_request)
+    timer.add("validation", timer.elapsed())
+    semaphore = asyncio.Semaphore(CONTENT_BATCH_CONCURRENCY)
+    logger.info(f"{batch_uuid}, [INPUT] Batch of {len(request.items)} items")
+
+    async def run_item(index: int, item: ContentEnrichmentRequest):
+        item_uuid = f"{batch_uuid}:{index}"
+        async with semaphore:
+            try:
+                function_key, context = item.get_function_data()
+                _log_input(item_uuid, item, function_key, context)
+
+                start_time = time.perf_counter()
+                # Each item keeps its own stages, the request's Server-Timing only has validation and the bulk insert
+                generator = ContentGenerator(item)
+                response, model, cost = await generator.generate()
+                _log_output(item_uuid, response)
+                latency_ms = int((time.perf_counter() - start_time) * 1000)
+
+                return _build_content_record(item, generator, response, model, latency_ms, cost), None
+            except ValueError as e:
+                logger.exception(f"{item_uuid}, ValueError occurred")
+                return None, f"{item_uuid}, {str(e)}"
+            except Exception as e:
+                logger.exception(f"{item_uuid}, Error in /v1/content-enrichment/batch endpoint: {str(e)}")
+                return None, f"{item_uuid}, Content enrichment failed"
+
+    outcomes = await asyncio.gather(*(run_item(index, item) for index, item in enumerate(request.items)))
+
+    records = [record for record, _ in outcomes if record is not None]
+    with timer.stage("db_write"):
+        stored_contents = await _store_batch(db, batch_uuid, records)
+
+    stored_iter = iter(stored_contents)
+    results = []
+    for index, (record, error) in enumerate(outcomes):
+        if record is None:
+            results.append(ContentEnrichmentBatchItemResult(index=index, error=error))
+            continue
+        stored_content = next(stored_iter)
+        if stored_content is None:
+            # Still hand back the generated text, the caller has paid for it
+            results.append(ContentEnrichmentBatchItemResult(index=index, text=record["ai_response"], error=f"{batch_uuid}:{index}, Content was generated but could not be stored"))
+        else:
+            results.append(ContentEnrichmentBatchItemResult(index=index, id=str(stored_content.id), text=stored_content.ai_response))
+
+    return ParsedContentEnrichmentBatchResponse(results=results)
+
+@content_enrichment_router.get("/stats", response_model=ParsedContentEnrichmentStatsResponse)
+async def content_enrichment_stats(
+    since: Optional[datetime] = Query(None, description="Start of the range, 7 days before `until` by default"),
+    until: Optional[datetime] = Query(None, description="End of the range (exclusive), now by default"),
+    bucket: StatsBucket = Query("day", description="Time bucket (UTC) the rows are grouped into"),
+    group_by: List[StatsDimension] = Query(["function"], description="Dimensions to group by besides the time bucket"),
+    function: Optional[Function] = Query(None, description="Only count this function"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Request counts, acceptance rate, latency (mean, p50, p95) and cost of content enrichment, per time bucket
+    and group_by dimensions.
+
+    Served from the hourly rollup (core/content_enrichment/rollup.py), refreshed first if it is stale, so the
+    range is applied at hour granularity and rows newer than `refreshed_through` are not counted yet.
+    `refreshed_through` is null until the rollup has been backfilled with `python -m core.content_enrichment.rollup`.
+    Latency percentiles are estimated from the rollup's latency histogram.
+    """
+    request_uuid = uuid.uuid4()
+    until = until or datetime.now(timezone.utc)
+    since = since or until - timedelta(days=7)
+    # Query params without an offset are taken as UTC
+    since, until = [value if value.tzinfo else value.replace(tzinfo=timezone.utc) for value in (since, until)]
+    if since >= until:
+        raise HTTPException(status_code=400, detail=f"{request_uuid}, since must be before until")
+    if until - since > timedelta(days=CONTENT_STATS_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"{request_uuid}, The range can cover at most {CONTENT_STATS_MAX_DAYS} days")
+
+    group_by = list(dict.fromkeys(group_by))
+    try:
+        refreshed_through = await refresh_rollup_if_stale(db)
+        rows = await query_stats(db, since, until, bucket, group_by, function.value if function else None)
+    except Exception as e:
+        logger.exception(f"{request_uuid}, Error in /v1/content-enrichment/stats endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"{request_uuid}, Content enrichment stats failed")
+
+    return ParsedContentEnrichmentStatsResponse(
+        bucket=bucket,
+        group_by=group_by,
+        since=since,
+        until=until,
+        refreshed_through=refreshed_through,
+        rows=rows
+    )
+
 @content_enrichment_router.post("/{content_id}/accept")
 async def accept_content(
     content_id: uuid.UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Mark a piece of generated content as accepted by setting accepted_at to the current time.
@@ -105,7 +311,7 @@ async def accept_content(
         logger.info(f"{request_uuid}, [INPUT] Accept Content ID: {content_id}")
         
         # Get the content
-        content = content_db.get(db, content_id)
+        content = await content_db.get(db, content_id)
         if not content:
             logger.exception(f"{request_uuid}, Content not found: {content_id}")
             raise HTTPException(
@@ -114,7 +320,7 @@ async def accept_content(
             )
 
         # Update accepted_at
-        updated_content = content_db.update(db, content.id, {
+        updated_content = await content_db.update(db, content.id, {
             "accepted_at": datetime.now(timezone.utc)
         })
         if not updated_content:
@@ -135,7 +341,7 @@ async def accept_content(
         logger.exception(f"{request_uuid}, Re-raising HTTPException from accept_content: {e.status_code} - {e.detail}")
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.exception(f"{request_uuid}, Error type: {type(e)}, Error accepting content: {str(e)}")
         raise HTTPException(
             status_code=500,
@@ -1,15 +1,30 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from uuid import UUID
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.summaries.summaries import Summaries
-from core.summaries.serializers import Summaries_Request
+from db import get_async_db
+from settings import SUMMARY_QUEUE_MAX_PENDING
+from core.summaries.jobs import Summary_Job_Queue
+from core.summaries.serializers import Summaries_Request, Summary_Job_Response
 
 summaries_router = APIRouter()
+job_queue = Summary_Job_Queue()
 
 @summaries_router.post('/')
-async def summaries(request: Summaries_Request, background_tasks: BackgroundTasks):
+async def summaries(request: Summaries_Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        summaries = Summaries()
-        background_tasks.add_task(summaries.generate, request)
-        return {'status': f'Reviews for supplier: {request.entity_id} recieved.'}
+        if (SUMMARY_QUEUE_MAX_PENDING and await job_queue.count_pending(db) >= SUMMARY_QUEUE_MAX_PENDING):
+            raise HTTPException(status_code = 429, detail = f'Summaries queue is full ({SUMMARY_QUEUE_MAX_PENDING} pending jobs), retry later.')
+        job = await job_queue.enqueue(db, request)
+        return {'status': f'Reviews for supplier: {request.entity_id} recieved.', 'job_id': str(job.id)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code = 500, detail = str(e))
+
+@summaries_router.get('/jobs/{job_id}', response_model = Summary_Job_Response)
+async def summary_job_status(job_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    job = await job_queue.get(db, job_id)
+    if not job:
+        raise HTTPException(status_code = 404, detail = f'Summary job {job_id} not found')
+    return Summary_Job_Response.model_validate(job, from_attributes = True)
@@ -0,0 +1,62 @@
+'''
+    Compares two benchmark results (see benchmarks/run.py) and exits non-zero on a regression.
+    python -m benchmarks.compare baseline.json results.json --threshold 10
+    A regression is a latency percentile more than `threshold` percent slower, or throughput more than `threshold` percent
+    lower, for the same scenario and concurrency.
+'''
+import sys
+import json
+import argparse
+
+LATENCY_METRICS = ('p50', 'p95', 'p99')
+
+def _change(baseline: float | None, current: float | None) -> float | None:
+    if not baseline or current is None:
+        return None
+    return (current - baseline) / baseline * 100
+
+def compare(baseline: dict, current: dict, threshold: float = 10) -> list[dict]:
+    '''One row per metric of every scenario and concurrency in both runs, with the % change and whether it regressed.'''
+    baseline_results = {(result['scenario'], result['concurrency']): result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = baseline_results.get((result['scenario'], result['concurrency']))
+        if before is None:
+            continue
+        metrics = [(f'latency {name} ms', before['latency_ms'][name], result['latency_ms'][name], True) for name in LATENCY_METRICS]
+        metrics.append(('requests/sec', before['requests_per_second'], result['requests_per_second'], False))
+        for name, old, new, lower_is_better in metrics:
+            change = _change(old, new)
+            regressed = change is not None and (change > threshold if lower_is_better else change < -threshold)
+            rows.append({
+                'scenario': result['scenario'],
+                'concurrency': result['concurrency'],
+                'metric': name,
+                'baseline': old,
+                'current': new,
+                'change_percent': None if change is None else round(change, 1),
+                'regressed': regressed
+            })
+    return rows
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description = 'Compare two benchmark results')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type = float, default = 10, help = 'Percent change counted as a regression')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        change = 'n/a' if row['change_percent'] is None else f"{row['change_percent']:+.1f}%"
+        flag = '  REGRESSION' if row['regressed'] else ''
+        print(f"{row['scenario']} x{row['concurrency']} {row['metric']}: {row['baseline']} -> {row['current']} ({change}){flag}")
+    return 1 if any(row['regressed'] for row in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+'''
+    Server-side measurements taken while a benchmark runs in the same process as the app.
+'''
+import time
+import asyncio
+
+class EventLoopLagProbe:
+    '''
+        Sleeps `interval` seconds in a loop and records how late it wakes up.
+        Lag means something blocked the event loop (sync I/O, CPU work) and every in-flight request waited for it.
+    '''
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self.lags = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> list[float]:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        return self.lags
+
+class PoolWaitProbe:
+    '''
+        Times every connection checkout from a SQLAlchemy pool, i.e. how long requests waited for a DB connection.
+        SQLAlchemy has no event for the start of a checkout, so the pool's _do_get is wrapped for the probe's lifetime.
+    '''
+    def __init__(self, pool):
+        self.pool = pool
+        self.waits: list[float] = []
+        self._do_get = None
+
+    def start(self):
+        self.waits = []
+        self._do_get = self.pool._do_get
+
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return self._do_get()
+            finally:
+                self.waits.append(time.perf_counter() - start)
+        self.pool._do_get = timed_do_get
+
+    def stop(self) -> list[float]:
+        if self._do_get is not None:
+            self.pool._do_get = self._do_get
+            self._do_get = None
+        return self.waits
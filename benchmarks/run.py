@@ -0,0 +1,161 @@
+'''
+    End-to-end benchmark of the API.
+    The app runs in this process (lifespan included) and is driven through httpx's ASGI transport. The LLM is the offline
+    fake provider (see llms/fake_provider.py), the database is whatever DB_* points at (a local Postgres, migrated).
+    Each scenario is run closed-loop at every concurrency: that many clients each send their next request as soon as
+    the previous one returns, after a warmup that isn't measured.
+
+    python -m benchmarks.run --scenario content_enrichment --concurrency 1 8 32 --requests 500 --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+    Recorded per scenario and concurrency: latency p50/p95/p99, requests/sec, status codes, event loop lag and the time
+    requests waited for a DB connection (sync and async pools).
+'''
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+# Must be set before settings is imported, the app reads it at import time
+os.environ.setdefault('LLM_PROVIDER', 'fake')
+
+import httpx
+
+from benchmarks.stats import summarize
+from benchmarks.probes import EventLoopLagProbe, PoolWaitProbe
+
+def content_enrichment_request(i: int) -> dict:
+    return {
+        'metadata': {'block_id': f'benchmark-{i}'},
+        'output_format': 'html',
+        # A unique prompt per request, so the response cache doesn't serve the run
+        'polish': {'existing_text': f'Benchmark paragraph {i}: the hotel was lovely and the staff were helpful.'}
+    }
+
+def summaries_request(i: int) -> dict:
+    return {
+        'entity_id': str(uuid.uuid4()),
+        'entity_name': f'Benchmark Hotel {i}',
+        'source_type': 'client_supplier_reviews',
+        'sources': [{'id': str(uuid.uuid4()), 'review': f'Review {j} of hotel {i}: great stay, friendly staff.'} for j in range(5)]
+    }
+
+# Scenario name: (path, request body builder)
+SCENARIOS = {
+    'content_enrichment': ('/v1/content-enrichment/', content_enrichment_request),
+    # Only enqueues the job, generation happens in the summaries worker
+    'summaries': ('/v1/summaries/', summaries_request)
+}
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, concurrency: int, requests: int, warmup: int) -> dict:
+    from db.base import engine, async_engine
+
+    path, build_request = SCENARIOS[scenario]
+    latencies, statuses = [], {}
+
+    async def worker(indices, measured: bool):
+        # The clients share `indices`, so together they send each request once
+        for i in indices:
+            start = time.perf_counter()
+            try:
+                status = (await client.post(path, json = build_request(i))).status_code
+            except Exception as e:
+                status = type(e).__name__
+            if measured:
+                latencies.append(time.perf_counter() - start)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    if warmup:
+        warmup_indices = iter(range(warmup))
+        await asyncio.gather(*(worker(warmup_indices, False) for _ in range(concurrency)))
+
+    lag_probe = EventLoopLagProbe()
+    pool_probes = {'sync': PoolWaitProbe(engine.pool), 'async': PoolWaitProbe(async_engine.sync_engine.pool)}
+    lag_probe.start()
+    for probe in pool_probes.values():
+        probe.start()
+    indices = iter(range(warmup, warmup + requests))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(indices, True) for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+    lags = await lag_probe.stop()
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith('2'))
+    return {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': statuses,
+        'duration_seconds': round(duration, 3),
+        'requests_per_second': round(len(latencies) / duration, 2) if duration else None,
+        'latency_ms': summarize(latencies),
+        'event_loop_lag_ms': summarize(lags),
+        'db_pool_wait_ms': {name: summarize(probe.stop()) for name, probe in pool_probes.items()}
+    }
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output = True, text = True, check = True).stdout.strip()
+    except Exception:
+        return None
+
+async def main(args) -> dict:
+    from app.main import app
+    from settings import API_KEY, LLM_PROVIDER, FAKE_LLM_LATENCY_DISTRIBUTION, FAKE_LLM_LATENCY_SECONDS, FAKE_LLM_LATENCY_SPREAD
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app = app)
+        headers = {'Authorization': f'Bearer {API_KEY}'}
+        async with httpx.AsyncClient(transport = transport, base_url = 'http://benchmark', headers = headers, timeout = None) as client:
+            for scenario in args.scenario:
+                for concurrency in args.concurrency:
+                    result = await run_scenario(client, scenario, concurrency, args.requests, args.warmup)
+                    print(
+                        f"{scenario} x{concurrency}: {result['requests_per_second']} req/s, "
+                        f"p50 {result['latency_ms']['p50']}ms, p99 {result['latency_ms']['p99']}ms, {result['errors']} errors",
+                        file = sys.stderr
+                    )
+                    results.append(result)
+
+    return {
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'config': {
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'llm_provider': LLM_PROVIDER,
+            'fake_llm_latency': {
+                'distribution': FAKE_LLM_LATENCY_DISTRIBUTION,
+                'seconds': FAKE_LLM_LATENCY_SECONDS,
+                'spread': FAKE_LLM_LATENCY_SPREAD
+            }
+        },
+        'results': results
+    }
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark the API end to end against the fake LLM provider')
+    parser.add_argument('--scenario', nargs = '+', choices = sorted(SCENARIOS), default = sorted(SCENARIOS))
+    parser.add_argument('--concurrency', nargs = '+', type = int, default = [1, 8, 32])
+    parser.add_argument('--requests', type = int, default = 200, help = 'Measured requests per scenario and concurrency')
+    parser.add_argument('--warmup', type = int, default = 20)
+    parser.add_argument('--output', help = 'Write the JSON results here (stdout if not given)')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent = 2)
+    else:
+        print(json.dumps(report, indent = 2))
@@ -0,0 +1,25 @@
+'''
+    Latency statistics shared by the benchmark runner and the comparison.
+'''
+import math
+
+def percentile(values: list[float], p: float) -> float | None:
+    '''Nearest-rank percentile (p in 0-100), None for no values.'''
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize(values: list[float], scale: float = 1000) -> dict:
+    '''p50/p95/p99/max/mean of `values` (seconds), reported in ms by default.'''
+    if not values:
+        return {'count': 0, 'p50': None, 'p95': None, 'p99': None, 'max': None, 'mean': None}
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50) * scale, 3),
+        'p95': round(percentile(values, 95) * scale, 3),
+        'p99': round(percentile(values, 99) * scale, 3),
+        'max': round(max(values) * scale, 3),
+        'mean': round(sum(values) / len(values) * scale, 3)
+    }
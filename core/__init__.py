@@ -3,8 +3,8 @@ from core.content_enrichment.models import (
     Function,
     OutputFormat,
 )
-from core.summaries.models import Summaries
-from core.summaries.types import Source_Type
+from core.summaries.models import Summaries, Summary_Jobs, Summary_Publish_Outbox
+from core.summaries.types import Source_Type, Job_Status
 
 '''
     The following list of models are exported for use through Alembic.
@@ -22,7 +22,10 @@ content_enrichment_models = [
 
 summaries_models = [
     Summaries,
-    Source_Type
+    Summary_Jobs,
+    Summary_Publish_Outbox,
+    Source_Type,
+    Job_Status
 ]
 
 __all__ = [
@@ -1,28 +1,102 @@
+import logging
+from decimal import Decimal
+
 from llms.factory import LLMFetcher
+from llms.rate_limiter import Priority
+from llms.retry import deadline_in
+from settings import CONTENT_ENRICHMENT_DEADLINE_SECONDS, CONTENT_HEDGE_ENABLED
 from .prompts import (
     BASE_INSTRUCTIONS_MAP, MARKDOWN_INSTRUCTIONS, 
     make_rewrite_prompt, make_generate_prompt
     )
 from utils.usage_tracker import UsageTracker, TokenUsage
+from utils.latency_tracker import StageTimer
 from .serializers import ContentEnrichmentRequest
 from .models import Function, OutputFormat
+from .cache import get_response_cache, make_cache_key
+from .hedging import hedged, hedge_delay
+from .constants import FUNCTION_MODELS
+
+logger = logging.getLogger(__name__)
 
 class ContentGenerator:
-    def __init__(self, request: ContentEnrichmentRequest):
+    def __init__(self, request: ContentEnrichmentRequest, timer: StageTimer | None = None):
         self.function_key, self.context = request.get_function_data()
         self.output_format = request.output_format
-        self.LLMFetcher = LLMFetcher(
-            model='gpt-4.1-mini',
-            provider='openai'
-        )
-        self.usage_tracker = UsageTracker()
+        model, *self.fallback_models = FUNCTION_MODELS[self.function_key]
+        self.LLMFetcher = LLMFetcher(model=model)
+        self.usage_tracker = UsageTracker(function=Function(self.function_key).value)
+        self.bypass_cache = request.bypass_cache
+        self.cache = get_response_cache()
+        self.cache_hit = False
+        # Set once stream() has finished: (response_text, model, cost)
+        self.result = None
+        self.hedge_enabled = CONTENT_HEDGE_ENABLED
+        # Server-side details about the generation, stored with the request's metadata
+        self.metadata = {}
+        # Stages: prompt, cache, llm_queue (rate limiter wait), llm_ttft (streaming only), llm (model calls, queue excluded)
+        self.timer = timer or StageTimer()
 
     async def generate(self):
-        instructions = self._compile_instructions()
-        input_prompt = self._compile_prompt()
+        with self.timer.stage('prompt'):
+            instructions = self._compile_instructions()
+            input_prompt = self._compile_prompt()
+            cache_key = make_cache_key(self.LLMFetcher.model, instructions, input_prompt, self.output_format.value)
+
+        with self.timer.stage('cache'):
+            cached = await self._get_cached(cache_key)
+        if cached:
+            # Served from cache: no tokens were spent on this request
+            self.cache_hit = True
+            return cached['text'], cached['model'], Decimal('0')
+
         response, model, cost = await self._call_llm(instructions, input_prompt)
+        await self._set_cached(cache_key, response, model)
         return response, model, cost
 
+    async def stream(self):
+        '''
+            Streaming variant of generate(): yields text deltas as the model produces them.
+            Once the stream is exhausted, self.result holds the same (response, model, cost) tuple generate() returns.
+        '''
+        with self.timer.stage('prompt'):
+            instructions = self._compile_instructions()
+            input_prompt = self._compile_prompt()
+            cache_key = make_cache_key(self.LLMFetcher.model, instructions, input_prompt, self.output_format.value)
+
+        with self.timer.stage('cache'):
+            cached = await self._get_cached(cache_key)
+        if cached:
+            self.cache_hit = True
+            self.result = (cached['text'], cached['model'], Decimal('0'))
+            yield cached['text']
+            return
+
+        async for delta in self._stream_llm(instructions, input_prompt):
+            yield delta
+
+        response, model, _ = self.result
+        await self._set_cached(cache_key, response, model)
+
+    async def _get_cached(self, cache_key: str):
+        '''A cache failure must never fail the request, so errors are treated as a miss.'''
+        if self.cache is None or self.bypass_cache:
+            return None
+        try:
+            return await self.cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            return None
+
+    async def _set_cached(self, cache_key: str, response: str, model: str):
+        # Written even when bypassing, so a forced regeneration refreshes the entry
+        if self.cache is None:
+            return
+        try:
+            await self.cache.set(cache_key, {'text': response, 'model': model})
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
     def _compile_instructions(self):
         base_instructions = []
         if (self.function_key == Function.GENERATE and self.context.existing_text) or self.function_key == Function.CHANGE_MY_TONE:
@@ -61,16 +135,7 @@ class ContentGenerator:
         This calculation is performed for storing the data and cost analysis.
         '''
         try:
-            # Convert the llm's usage class to a dict of our relevant items then unpack
-            usage_dict = {
-                'input_tokens': usage.input_tokens,
-                'output_tokens': usage.output_tokens,
-                'total_tokens': usage.total_tokens,
-                'input_tokens_details': usage.input_tokens_details,
-                'output_tokens_details': usage.output_tokens_details,
-                'model': model
-            }
-            token_usage = TokenUsage(**usage_dict)
+            token_usage = TokenUsage.from_response(model, usage)
             cost = self.usage_tracker.track_usage(token_usage)
             return cost
         except Exception as e:
@@ -81,19 +146,83 @@ class ContentGenerator:
         return text.replace('\n', '<br>')
 
     async def _call_llm(self, instructions, prompt):
-        response = await self.LLMFetcher.async_client.responses.create(
-            model=self.LLMFetcher.model,
-            instructions=instructions,
-            input=prompt
-        )
+        deadline = deadline_in(CONTENT_ENRICHMENT_DEADLINE_SECONDS)
+        async def call():
+            return await self.LLMFetcher.create_response(
+                priority=Priority.INTERACTIVE,
+                deadline=deadline,
+                fallback_models=self.fallback_models,
+                timer=self.timer,
+                model=self.LLMFetcher.model,
+                instructions=instructions,
+                input=prompt
+            )
+
+        # The llm_queue and llm stages are added by LLMFetcher, per call
+        if self.hedge_enabled:
+            delay = hedge_delay(self.LLMFetcher.model)
+            response, winner, loser_response = await hedged(call, delay)
+        else:
+            response, winner, loser_response = await call(), None, None
 
         response_text = response.output_text
 
         try:
             cost = self._calculate_cost(response.usage, response.model)
         except ValueError as e:
-            print(f"Cost calculation failed for model {response.model}: {str(e)} (usage: {response.usage})")
+            logger.warning(f"Cost calculation failed for model {response.model}: {str(e)} (usage: {response.usage})")
             cost = None
+
+        if winner:
+            cost = self._record_hedge(delay, winner, cost, loser_response)
             
         return response_text, response.model, cost
-    
+
+    def _record_hedge(self, delay, winner, cost, loser_response):
+        '''
+            Adds the hedge to self.metadata and returns the request cost including it.
+            A cancelled call's usage is never reported, so its cost is estimated as the winner's.
+        '''
+        hedge_cost, estimated = cost, True
+        if loser_response is not None:
+            try:
+                hedge_cost, estimated = self._calculate_cost(loser_response.usage, loser_response.model), False
+            except ValueError:
+                pass
+        self.metadata['hedge'] = {
+            'delay_seconds': round(delay, 3),
+            'winner': winner,
+            'cost_usd': float(hedge_cost) if hedge_cost is not None else None,
+            'cost_estimated': estimated
+        }
+        if cost is None or hedge_cost is None:
+            return cost
+        return cost + hedge_cost
+
+    async def _stream_llm(self, instructions, prompt):
+        stream = self.LLMFetcher.stream_response(
+            priority=Priority.INTERACTIVE,
+            deadline=deadline_in(CONTENT_ENRICHMENT_DEADLINE_SECONDS),
+            fallback_models=self.fallback_models,
+            timer=self.timer,
+            model=self.LLMFetcher.model,
+            instructions=instructions,
+            input=prompt
+        )
+
+        async for event in stream:
+            if event.type == 'response.output_text.delta':
+                yield event.delta
+            elif event.type == 'response.completed':
+                response = event.response
+                try:
+                    cost = self._calculate_cost(response.usage, response.model)
+                except ValueError as e:
+                    logger.warning(f"Cost calculation failed for model {response.model}: {str(e)} (usage: {response.usage})")
+                    cost = None
+                self.result = (response.output_text, response.model, cost)
+            elif event.type in ('response.failed', 'error'):
+                raise RuntimeError(f"LLM stream failed: {event}")
+
+        if self.result is None:
+            raise RuntimeError("LLM stream ended without a completed response")
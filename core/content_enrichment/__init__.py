@@ -2,23 +2,40 @@
 Content Enrichment package
 """
 
-from .models import Function, OutputFormat, ContentEnrichmentResponse
-from .serializers import ContentEnrichmentRequest, ParsedContentEnrichmentResponse, GenerateContext, RewriteContext
+from .models import Function, OutputFormat, ContentEnrichmentResponse, ContentEnrichmentRollup, RollupWatermark
+from .serializers import (
+    ContentEnrichmentRequest, ParsedContentEnrichmentResponse, GenerateContext, RewriteContext,
+    ContentEnrichmentBatchRequest, ContentEnrichmentBatchItemResult, ParsedContentEnrichmentBatchResponse,
+    StatsBucket, StatsDimension, ContentEnrichmentStatsRow, ParsedContentEnrichmentStatsResponse
+)
 from .prompts import BASE_INSTRUCTIONS_MAP, CHANGE_MY_TONE_INSTRUCTIONS_MAP, make_generate_prompt, make_rewrite_prompt
 from .ContentGenerator import ContentGenerator
+from .rollup import refresh_rollup, refresh_rollup_if_stale, query_stats
 
 
 __all__ = [
     'Function',
     'OutputFormat',
     'ContentEnrichmentResponse',
+    'ContentEnrichmentRollup',
+    'RollupWatermark',
     'ContentEnrichmentRequest',
     'ParsedContentEnrichmentResponse',
     'GenerateContext',
     'RewriteContext',
+    'ContentEnrichmentBatchRequest',
+    'ContentEnrichmentBatchItemResult',
+    'ParsedContentEnrichmentBatchResponse',
+    'StatsBucket',
+    'StatsDimension',
+    'ContentEnrichmentStatsRow',
+    'ParsedContentEnrichmentStatsResponse',
     'BASE_INSTRUCTIONS_MAP',
     'CHANGE_MY_TONE_INSTRUCTIONS_MAP',
     'make_generate_prompt',
     'make_rewrite_prompt',
     'ContentGenerator',
+    'refresh_rollup',
+    'refresh_rollup_if_stale',
+    'query_stats',
 ] 
\ No newline at end of file
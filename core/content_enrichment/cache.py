@@ -0,0 +1,125 @@
+'''
+    Exact-match response cache for content enrichment.
+    Entries are keyed on a hash of everything that determines the LLM output
+    (model, compiled instructions, compiled prompt and output format), so a repeated
+    "polish" or "shorten" on identical text is served without calling the model.
+'''
+import json
+import time
+import hashlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from settings import (
+    CONTENT_CACHE_BACKEND, CONTENT_CACHE_TTL_SECONDS,
+    CONTENT_CACHE_MAX_ENTRIES, CONTENT_CACHE_REDIS_URL
+)
+
+def make_cache_key(model: str, instructions: str, prompt: str, output_format: str) -> str:
+    '''Stable hash of the inputs that fully determine a generation.'''
+    payload = json.dumps([model, instructions, prompt, str(output_format)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache(ABC):
+    '''
+        Interface for response cache backends.
+        Values are plain JSON-serializable dicts so every backend can store them.
+    '''
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+class InMemoryResponseCache(ResponseCache):
+    '''
+        Per-process cache with a TTL and LRU eviction once max_entries is reached.
+        Reads move the entry to the end of the OrderedDict, so the first entry is always the least recently used.
+    '''
+
+    def __init__(self, ttl_seconds: int = CONTENT_CACHE_TTL_SECONDS, max_entries: int = CONTENT_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisResponseCache(ResponseCache):
+    '''
+        Shared cache backend so every worker and pod sees the same entries.
+        Accepts any client with the redis.asyncio interface (get / set with `ex` / scan_iter / delete).
+        Eviction is left to Redis (TTL per key, plus the server's maxmemory-policy for LRU).
+    '''
+
+    def __init__(self, client, ttl_seconds: int = CONTENT_CACHE_TTL_SECONDS, prefix: str = 'content_enrichment:'):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: dict) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl_seconds)
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=f'{self.prefix}*'):
+            await self.client.delete(key)
+
+_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> Optional[ResponseCache]:
+    '''
+        Process-wide cache selected by CONTENT_CACHE_BACKEND ('memory', 'redis' or 'none').
+        Built lazily on first use so importing this module never needs a Redis connection.
+    '''
+    global _response_cache
+    if _response_cache is not None or CONTENT_CACHE_BACKEND == 'none':
+        return _response_cache
+
+    if CONTENT_CACHE_BACKEND == 'redis':
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ValueError("CONTENT_CACHE_BACKEND is 'redis' but the redis package is not installed") from e
+        if not CONTENT_CACHE_REDIS_URL:
+            raise ValueError("CONTENT_CACHE_BACKEND is 'redis' but CONTENT_CACHE_REDIS_URL is not set")
+        _response_cache = RedisResponseCache(redis.from_url(CONTENT_CACHE_REDIS_URL))
+    else:
+        _response_cache = InMemoryResponseCache()
+    return _response_cache
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    '''Plug in a different backend (e.g. a shared one built at startup).'''
+    global _response_cache
+    _response_cache = cache
@@ -0,0 +1,10 @@
+from .models import Function
+
+# Model for each function followed by its fallbacks, tried in order when it errors or its circuit is open (see llms/circuit_breaker.py)
+FUNCTION_MODELS = {
+    Function.GENERATE: ['gpt-4.1-mini', 'gpt-4o-mini', 'gpt-4.1'],
+    Function.SHORTEN: ['gpt-4.1-mini', 'gpt-4o-mini', 'gpt-4.1-nano'],
+    Function.ELABORATE: ['gpt-4.1-mini', 'gpt-4o-mini', 'gpt-4.1'],
+    Function.POLISH: ['gpt-4.1-mini', 'gpt-4o-mini', 'gpt-4.1-nano'],
+    Function.CHANGE_MY_TONE: ['gpt-4.1-mini', 'gpt-4o-mini', 'gpt-4.1']
+}
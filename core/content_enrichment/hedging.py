@@ -0,0 +1,48 @@
+'''
+    Hedged requests for content enrichment.
+    The call is started once; if it has not finished after the hedge delay (a high percentile of recent
+    latencies for the model), an identical second call is started and whichever finishes first is used.
+    The other one is cancelled. Tail latency drops at the price of paying for some duplicate calls.
+'''
+import asyncio
+
+from utils.latency_tracker import get_latency_window
+from settings import CONTENT_HEDGE_PERCENTILE, CONTENT_HEDGE_MIN_DELAY_SECONDS, CONTENT_HEDGE_DEFAULT_DELAY_SECONDS
+
+def hedge_delay(model: str) -> float:
+    observed = get_latency_window(model).percentile(CONTENT_HEDGE_PERCENTILE)
+    if observed is None:
+        return CONTENT_HEDGE_DEFAULT_DELAY_SECONDS
+    return max(CONTENT_HEDGE_MIN_DELAY_SECONDS, observed)
+
+async def hedged(call, delay: float):
+    '''
+        Run call() and, if it is still running after `delay` seconds, a second call() alongside it.
+        Returns (result, winner, loser_result):
+            winner: None when no hedge was fired, otherwise 'primary' or 'hedge'
+            loser_result: the other call's result when it also finished successfully (so its real cost is known), else None
+        Raises the primary call's error only when every call failed.
+    '''
+    primary = asyncio.create_task(call())
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result(), None, None
+
+        hedge = asyncio.create_task(call())
+        names = {primary: 'primary', hedge: 'hedge'}
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in (primary, hedge) if task in done and task.exception() is None]
+            if succeeded:
+                winner = succeeded[0]
+                loser = hedge if winner is primary else primary
+                loser_result = loser.result() if loser.done() and not loser.cancelled() and loser.exception() is None else None
+                return winner.result(), names[winner], loser_result
+        raise primary.exception()
+    finally:
+        # Also reached when the caller is cancelled while waiting, so no call outlives it
+        for task in pending:
+            task.cancel()
@@ -1,9 +1,9 @@
 # app/models/generated_content.py
 import enum, uuid
 from sqlalchemy import (
-    Column, Text, DateTime, Boolean, Integer, Numeric, Enum, JSON
+    Column, Text, DateTime, Boolean, Integer, BigInteger, Numeric, Enum, JSON, Index
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.sql import func
 from db.base import Base
 
@@ -101,7 +101,15 @@ class Tone(str, enum.Enum):
 
 class ContentEnrichmentResponse(Base):
     __tablename__ = "content_enrichment_response"
-    __table_args__ = {"schema": "ai"}
+    # Range-partitioned by month on created_at in the database (see partitions.py), where the primary key is
+    # (id, created_at) since it has to include the partition key. id alone is unique and identifies a row here.
+    __table_args__ = (
+        # Time range scans for reporting, and the rows the rollup refresh has to pick up (see rollup.py)
+        Index("ix_content_enrichment_response_created_at", "created_at"),
+        Index("ix_content_enrichment_response_function_created_at", "function", "created_at"),
+        Index("ix_content_enrichment_response_updated_at", "updated_at"),
+        {"schema": "ai"}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     content_metadata = Column("metadata", JSON) # SQLAlchemy has a built in 'metadata' field that we can't override or use, forcing us to name the member 'content_metadata' however the column in the db will be as 'metadata'
@@ -118,4 +126,36 @@ class ContentEnrichmentResponse(Base):
     failed = Column(Boolean, nullable=False, default=False)
     ai_model = Column(Text)
     latency_ms = Column(Integer)
-    cost_usd = Column(Numeric(10, 4))
\ No newline at end of file
+    cost_usd = Column(Numeric(10, 4))
+
+class ContentEnrichmentRollup(Base):
+    """
+    Hourly aggregates of content_enrichment_response per function, tone and model, maintained by
+    core/content_enrichment/rollup.py. A missing tone or model is stored as '' so it can be part of the key.
+    latency_histogram[i] counts the rows whose latency falls in bucket i of rollup.LATENCY_BUCKETS_MS.
+    """
+    __tablename__ = "content_enrichment_rollup"
+    __table_args__ = {"schema": "ai"}
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    function = Column(Text, primary_key=True)
+    tone = Column(Text, primary_key=True, server_default="")
+    ai_model = Column(Text, primary_key=True, server_default="")
+    requests = Column(Integer, nullable=False)
+    accepted = Column(Integer, nullable=False)
+    failed = Column(Integer, nullable=False)
+    latency_count = Column(Integer, nullable=False)
+    latency_sum_ms = Column(BigInteger, nullable=False)
+    cost_usd = Column(Numeric(14, 4), nullable=False)
+    latency_histogram = Column(ARRAY(Integer), nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class RollupWatermark(Base):
+    """How far (in updated_at) each rollup has consumed its source table."""
+    __tablename__ = "rollup_watermarks"
+    __table_args__ = {"schema": "ai"}
+
+    name = Column(Text, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(),
+        onupdate=func.now(), nullable=False)
@@ -0,0 +1,150 @@
+'''
+    Monthly partitions of ai.content_enrichment_response.
+    The table is range-partitioned on created_at: one partition per calendar month (UTC), plus
+    content_enrichment_response_legacy holding every row from before the table was partitioned.
+    A row can only be inserted once its month has a partition, so this job keeps CONTENT_PARTITION_MONTHS_AHEAD
+    months created ahead of the current one. Partitions whose rows are all older than CONTENT_PARTITION_RETENTION_MONTHS
+    are detached and renamed <name>_archived: plain tables, out of every query on the parent, left to be exported
+    (pg_dump -t) and dropped (--drop-archived). The stats rollup (rollup.py) keeps the aggregates of detached months.
+
+    python -m core.content_enrichment.partitions                    # create upcoming partitions, detach expired ones
+    python -m core.content_enrichment.partitions --no-detach        # only create upcoming ones (run on every deploy)
+    python -m core.content_enrichment.partitions --drop-archived
+
+    Lookups by id alone (BaseDBOperations.get) can't be pruned to one partition, but every partition's primary key
+    (id, created_at) serves them, so they cost one index probe per partition, and retention bounds the count.
+'''
+import re
+import sys
+import logging
+import argparse
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from settings import (
+    CONTENT_PARTITION_MONTHS_AHEAD, CONTENT_PARTITION_RETENTION_MONTHS, CONTENT_PARTITION_LOCK_TIMEOUT_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'content_enrichment_response'
+ARCHIVED_SUFFIX = '_archived'
+
+_PARTITIONS_SQL = '''
+    SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+    WHERE ns.nspname = 'ai' AND parent.relname = :table
+'''
+_ARCHIVED_SQL = "SELECT tablename FROM pg_tables WHERE schemaname = 'ai' AND tablename LIKE :pattern"
+# pg_get_expr renders a range bound as FOR VALUES FROM (...) TO ('2025-09-01 00:00:00+00')
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+Partition = Tuple[str, Optional[date]]
+
+def add_months(month: date, months: int) -> date:
+    '''First day of the month `months` after (or before) the month of `month`.'''
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f'{TABLE}_p{month:%Y_%m}'
+
+def upper_bound(bound_expression: str) -> Optional[date]:
+    '''Exclusive upper bound (UTC) of a partition, None for MAXVALUE.'''
+    match = _UPPER_BOUND.search(bound_expression)
+    return datetime.fromisoformat(match.group(1)).astimezone(timezone.utc).date() if match else None
+
+def months_to_create(partitions: List[Partition], today: date, months_ahead: int) -> List[date]:
+    '''Months after the last partition, through `months_ahead` months after the current one.'''
+    this_month = date(today.year, today.month, 1)
+    bounds = [bound for _, bound in partitions if bound is not None]
+    month = max(bounds) if bounds else this_month
+    months = []
+    while month < add_months(this_month, months_ahead + 1):
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+def partitions_to_detach(partitions: List[Partition], today: date, retention_months: int) -> List[str]:
+    '''Partitions whose rows are all older than the `retention_months` full months before the current one.'''
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(today, -retention_months)
+    return [name for name, bound in partitions if bound is not None and bound <= cutoff]
+
+def list_partitions(connection) -> List[Partition]:
+    rows = connection.execute(text(_PARTITIONS_SQL), {'table': TABLE}).all()
+    return [(name, upper_bound(expression)) for name, expression in rows]
+
+def _run_ddl(engine, *statements: str):
+    # Each change in its own short transaction, giving up rather than blocking inserts behind a long query's lock
+    with engine.begin() as connection:
+        connection.execute(text(f"SET LOCAL lock_timeout = '{int(CONTENT_PARTITION_LOCK_TIMEOUT_SECONDS * 1000)}ms'"))
+        for statement in statements:
+            connection.execute(text(statement))
+
+def create_partitions(engine, months_ahead: int = CONTENT_PARTITION_MONTHS_AHEAD, today: Optional[date] = None) -> List[str]:
+    today = today or datetime.now(timezone.utc).date()
+    with engine.connect() as connection:
+        partitions = list_partitions(connection)
+    created = []
+    for month in months_to_create(partitions, today, months_ahead):
+        name = partition_name(month)
+        _run_ddl(engine, (
+            f'CREATE TABLE IF NOT EXISTS ai.{name} PARTITION OF ai.{TABLE} '
+            f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{add_months(month, 1)} 00:00:00+00')"
+        ))
+        logger.info(f'Created partition ai.{name}')
+        created.append(name)
+    return created
+
+def detach_expired_partitions(engine, retention_months: int = CONTENT_PARTITION_RETENTION_MONTHS, today: Optional[date] = None) -> List[str]:
+    today = today or datetime.now(timezone.utc).date()
+    with engine.connect() as connection:
+        partitions = list_partitions(connection)
+    archived = []
+    for name in partitions_to_detach(partitions, today, retention_months):
+        _run_ddl(
+            engine,
+            f'ALTER TABLE ai.{TABLE} DETACH PARTITION ai.{name}',
+            f'ALTER TABLE ai.{name} RENAME TO {name}{ARCHIVED_SUFFIX}'
+        )
+        logger.info(f'Detached partition ai.{name} as ai.{name}{ARCHIVED_SUFFIX}')
+        archived.append(f'{name}{ARCHIVED_SUFFIX}')
+    return archived
+
+def drop_archived_partitions(engine) -> List[str]:
+    with engine.connect() as connection:
+        names = connection.execute(text(_ARCHIVED_SQL), {'pattern': f'{TABLE}%{ARCHIVED_SUFFIX}'}).scalars().all()
+    for name in names:
+        _run_ddl(engine, f'DROP TABLE ai.{name}')
+        logger.info(f'Dropped archived partition ai.{name}')
+    return list(names)
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='Maintain the monthly partitions of ai.content_enrichment_response')
+    parser.add_argument('--months-ahead', type=int, default=CONTENT_PARTITION_MONTHS_AHEAD)
+    parser.add_argument('--retention-months', type=int, default=CONTENT_PARTITION_RETENTION_MONTHS, help='0 keeps every partition')
+    parser.add_argument('--no-detach', action='store_true', help='Only create upcoming partitions')
+    parser.add_argument('--drop-archived', action='store_true', help='Drop the partitions detached earlier')
+    args = parser.parse_args(argv)
+
+    from db.base import engine
+
+    for name in create_partitions(engine, args.months_ahead):
+        print(f'Created ai.{name}')
+    if not args.no_detach:
+        for name in detach_expired_partitions(engine, args.retention_months):
+            print(f'Detached ai.{name}')
+    if args.drop_archived:
+        for name in drop_archived_partitions(engine):
+            print(f'Dropped ai.{name}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+'''
+    Hourly rollup of ai.content_enrichment_response, behind GET /v1/content-enrichment/stats.
+    ai.content_enrichment_rollup holds one row per hour, function, tone and model with the counts, sums and a
+    latency histogram of that hour's rows, so stats over any range and coarser bucket are a small GROUP BY over
+    the rollup instead of a scan of the response table.
+
+    The refresh is incremental: it finds the hours that have rows written or updated (accepted) since the last
+    refresh, using updated_at and the watermark in ai.rollup_watermarks, and recomputes only those hours.
+    Rows updated in the last CONTENT_STATS_REFRESH_LAG_SECONDS are left for the next refresh, so a transaction
+    that commits late can't slip behind the watermark.
+    The stats endpoint refreshes a rollup older than CONTENT_STATS_REFRESH_INTERVAL_SECONDS before reading it, which
+    only recomputes the hours written since. It never backfills an empty rollup, which would scan the whole response
+    table inside a request: run `python -m core.content_enrichment.rollup` once after the migration, or from cron.
+'''
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text, select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.content_enrichment.models import RollupWatermark
+from settings import CONTENT_STATS_REFRESH_INTERVAL_SECONDS, CONTENT_STATS_REFRESH_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'content_enrichment_rollup'
+# Only has to differ from any other advisory lock taken on this database
+ROLLUP_LOCK_KEY = 4402117
+# Lower bounds of the latency histogram buckets: slot 0 is [0, 100), slot i is [bound i-1, bound i), the last is open-ended
+LATENCY_BUCKETS_MS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 5000, 7500, 10000, 15000, 20000, 30000, 60000)
+HISTOGRAM_SIZE = len(LATENCY_BUCKETS_MS) + 1
+
+STATS_BUCKETS = ('hour', 'day', 'week', 'month')
+# Stats dimension to rollup column
+STATS_DIMENSIONS = {'function': 'function', 'tone': 'tone', 'model': 'ai_model'}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_BOUNDS_SQL = f"ARRAY[{', '.join(str(bound) for bound in LATENCY_BUCKETS_MS)}]"
+
+_DIRTY_HOURS_SQL = '''
+    SELECT DISTINCT date_trunc('hour', created_at)
+    FROM ai.content_enrichment_response
+    WHERE updated_at >= :since AND updated_at < :until
+'''
+
+_DELETE_HOURS_SQL = 'DELETE FROM ai.content_enrichment_rollup WHERE bucket = ANY(CAST(:buckets AS timestamptz[]))'
+
+_INSERT_HOURS_SQL = f'''
+    INSERT INTO ai.content_enrichment_rollup (
+        bucket, function, tone, ai_model, requests, accepted, failed,
+        latency_count, latency_sum_ms, cost_usd, latency_histogram
+    )
+    SELECT
+        hours.bucket, r.function::text, coalesce(r.tone, ''), coalesce(r.ai_model, ''),
+        count(*), count(r.accepted_at), count(*) FILTER (WHERE r.failed),
+        count(r.latency_ms), coalesce(sum(r.latency_ms), 0), coalesce(sum(r.cost_usd), 0),
+        ARRAY[{', '.join(f'count(*) FILTER (WHERE r.latency_slot = {slot})' for slot in range(HISTOGRAM_SIZE))}]
+    FROM unnest(CAST(:buckets AS timestamptz[])) AS hours(bucket)
+    CROSS JOIN LATERAL (
+        SELECT function, tone, ai_model, accepted_at, failed, latency_ms, cost_usd,
+            width_bucket(latency_ms, {_BOUNDS_SQL}) AS latency_slot
+        FROM ai.content_enrichment_response
+        WHERE created_at >= hours.bucket AND created_at < hours.bucket + interval '1 hour'
+    ) r
+    GROUP BY hours.bucket, r.function, coalesce(r.tone, ''), coalesce(r.ai_model, '')
+'''
+
+async def get_watermark(db: AsyncSession) -> Optional[datetime]:
+    return await db.scalar(select(RollupWatermark.watermark).where(RollupWatermark.name == ROLLUP_NAME))
+
+async def refresh_rollup(db: AsyncSession, lag_seconds: Optional[float] = None) -> Optional[datetime]:
+    '''
+        Recomputes every hour with rows written or updated since the watermark, up to `lag_seconds`
+        (CONTENT_STATS_REFRESH_LAG_SECONDS by default) ago, and moves the watermark there, all in one transaction.
+        Returns the new watermark, or None when another refresh is already running.
+    '''
+    lag_seconds = CONTENT_STATS_REFRESH_LAG_SECONDS if lag_seconds is None else lag_seconds
+    try:
+        if not await db.scalar(text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': ROLLUP_LOCK_KEY}):
+            await db.rollback()
+            return None
+
+        watermark = await get_watermark(db)
+        until = await db.scalar(text('SELECT now()')) - timedelta(seconds=lag_seconds)
+        if watermark is not None and until <= watermark:
+            await db.rollback()
+            return watermark
+
+        hours = list((await db.scalars(text(_DIRTY_HOURS_SQL), {'since': watermark or _EPOCH, 'until': until})).all())
+        if hours:
+            await db.execute(text(_DELETE_HOURS_SQL), {'buckets': hours})
+            await db.execute(text(_INSERT_HOURS_SQL), {'buckets': hours})
+        await db.execute(
+            insert(RollupWatermark)
+            .values(name=ROLLUP_NAME, watermark=until)
+            .on_conflict_do_update(index_elements=['name'], set_={'watermark': until, 'updated_at': func.now()})
+        )
+        await db.commit()
+        logger.info(f'Refreshed {ROLLUP_NAME}: {len(hours)} hours recomputed, watermark {until.isoformat()}')
+        return until
+    except Exception:
+        await db.rollback()
+        raise
+
+async def refresh_rollup_if_stale(db: AsyncSession, max_age_seconds: Optional[float] = None) -> Optional[datetime]:
+    '''
+        Refreshes the rollup when its watermark is more than `max_age_seconds` (CONTENT_STATS_REFRESH_INTERVAL_SECONDS
+        by default, plus the refresh lag) old, and returns the watermark the stats can be read at.
+        A rollup that was never refreshed is left to the CLI and None returned: its first refresh is a backfill.
+        A failed refresh is logged and the rollup served as is.
+    '''
+    max_age_seconds = CONTENT_STATS_REFRESH_INTERVAL_SECONDS if max_age_seconds is None else max_age_seconds
+    watermark = await get_watermark(db)
+    await db.rollback()
+    if watermark is None:
+        logger.warning(f'{ROLLUP_NAME} has never been refreshed, run `python -m core.content_enrichment.rollup` to backfill it')
+        return None
+    if (datetime.now(timezone.utc) - watermark).total_seconds() - CONTENT_STATS_REFRESH_LAG_SECONDS <= max_age_seconds:
+        return watermark
+    try:
+        return await refresh_rollup(db) or watermark
+    except Exception as e:
+        logger.exception(f'Error refreshing {ROLLUP_NAME}, serving it as of {watermark}: {str(e)}')
+        return watermark
+
+def histogram_percentile(counts: List[int], p: float) -> Optional[float]:
+    '''
+        Estimated p-th percentile (0-100) of a latency histogram, interpolated linearly inside the bucket it falls in
+        (as Prometheus' histogram_quantile does). The open-ended last bucket is reported at its lower bound.
+    '''
+    total = sum(counts)
+    if not total:
+        return None
+    rank = p / 100 * total
+    seen = 0
+    for slot, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if slot == len(LATENCY_BUCKETS_MS):
+                return float(LATENCY_BUCKETS_MS[-1])
+            lower = LATENCY_BUCKETS_MS[slot - 1] if slot else 0
+            upper = LATENCY_BUCKETS_MS[slot]
+            return round(lower + (upper - lower) * (rank - seen) / count, 1)
+        seen += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+def build_stats_query(bucket: str, group_by: List[str], function: Optional[str] = None) -> str:
+    '''Aggregates of the rollup per `bucket` (UTC) and `group_by` dimensions, for hours in [:since, :until).'''
+    if bucket not in STATS_BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(STATS_BUCKETS)}")
+    unknown = [name for name in group_by if name not in STATS_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"group_by must be among: {', '.join(STATS_DIMENSIONS)}")
+
+    keys = [f"date_trunc('{bucket}', bucket AT TIME ZONE 'UTC') AS period"]
+    keys += [f'{STATS_DIMENSIONS[name]} AS {name}' for name in group_by]
+    positions = ', '.join(str(position) for position in range(1, len(keys) + 1))
+    histogram = ', '.join(f'sum(latency_histogram[{slot + 1}])' for slot in range(HISTOGRAM_SIZE))
+    return f'''
+        SELECT
+            {', '.join(keys)},
+            sum(requests) AS requests, sum(accepted) AS accepted, sum(failed) AS failed,
+            sum(latency_count) AS latency_count, sum(latency_sum_ms) AS latency_sum_ms,
+            sum(cost_usd) AS cost_usd, ARRAY[{histogram}] AS latency_histogram
+        FROM ai.content_enrichment_rollup
+        WHERE bucket >= :since AND bucket < :until{' AND function = :function' if function else ''}
+        GROUP BY {positions}
+        ORDER BY {positions}
+    '''
+
+def _stats_row(row, group_by: List[str]) -> dict:
+    histogram = [int(count) for count in row.latency_histogram]
+    return {
+        'period': row.period.replace(tzinfo=timezone.utc),
+        # '' is how the rollup keys a missing tone or model
+        **{name: getattr(row, name) or None for name in group_by},
+        'requests': int(row.requests),
+        'accepted': int(row.accepted),
+        'failed': int(row.failed),
+        'acceptance_rate': round(row.accepted / row.requests, 4) if row.requests else None,
+        'latency_ms_mean': round(float(row.latency_sum_ms) / row.latency_count, 1) if row.latency_count else None,
+        'latency_ms_p50': histogram_percentile(histogram, 50),
+        'latency_ms_p95': histogram_percentile(histogram, 95),
+        'cost_usd': float(row.cost_usd)
+    }
+
+async def query_stats(
+    db: AsyncSession,
+    since: datetime,
+    until: datetime,
+    bucket: str = 'day',
+    group_by: Optional[List[str]] = None,
+    function: Optional[str] = None
+) -> List[dict]:
+    '''One dict per period and group, see _stats_row. Ranges are applied at hour granularity.'''
+    group_by = ['function'] if group_by is None else group_by
+    params = {'since': since, 'until': until, **({'function': function} if function else {})}
+    result = await db.execute(text(build_stats_query(bucket, group_by, function)), params)
+    return [_stats_row(row, group_by) for row in result]
+
+async def _main(lag_seconds: Optional[float]):
+    from db import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        watermark = await refresh_rollup(db, lag_seconds)
+    print(f'{ROLLUP_NAME} watermark: {watermark}' if watermark else 'Another refresh is running')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Refresh the content enrichment stats rollup')
+    parser.add_argument('--lag-seconds', type=float, default=None, help='CONTENT_STATS_REFRESH_LAG_SECONDS by default')
+    asyncio.run(_main(parser.parse_args().lag_seconds))
@@ -1,6 +1,11 @@
 from pydantic import BaseModel, Field, model_validator
-from typing import Dict, Literal, Optional, Tuple, Any, Union
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Tuple, Any, Union
 from core.content_enrichment.models import Function, OutputFormat, Tone
+from settings import CONTENT_BATCH_MAX_ITEMS
+
+# Request fields that are options rather than function keys
+NON_FUNCTION_FIELDS = ('metadata', 'output_format', 'bypass_cache')
 
 class BaseContext(BaseModel):
     tone: Optional[Tone] = None
@@ -21,6 +26,7 @@ class ContentEnrichmentRequest(BaseModel):
     polish: Optional[RewriteContext] = Field(None, description="Polish function data")
     shorten: Optional[RewriteContext] = Field(None, description="Shorten function data")
     change_my_tone: Optional[RewriteContext] = Field(None, description="Change tone function data")
+    bypass_cache: bool = Field(False, description="Skip the response cache and always call the model")
 
     class Config:
         # This allows both enum values and string values
@@ -30,7 +36,7 @@ class ContentEnrichmentRequest(BaseModel):
     def validate_request(self):
         # First validate that exactly one function is present
         function_values = [f.value for f in Function]
-        valid_function_keys = [k for k in self.model_dump() if k != 'metadata' and k != 'output_format']
+        valid_function_keys = [k for k in self.model_dump() if k not in NON_FUNCTION_FIELDS]
         function_keys = [k for k in self.model_dump() if k in function_values and getattr(self, k) is not None]
         if len(function_keys) != 1:
             raise ValueError(f"Request must have exactly one function key from {valid_function_keys}")
@@ -74,3 +80,40 @@ class ContentEnrichmentRequest(BaseModel):
 class ParsedContentEnrichmentResponse(BaseModel):
     id: str
     text: str
+
+class ContentEnrichmentBatchRequest(BaseModel):
+    items: List[ContentEnrichmentRequest] = Field(..., min_length=1, max_length=CONTENT_BATCH_MAX_ITEMS, description="Content enrichment requests, processed concurrently")
+
+class ContentEnrichmentBatchItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    text: Optional[str] = None
+    error: Optional[str] = None
+
+class ParsedContentEnrichmentBatchResponse(BaseModel):
+    results: List[ContentEnrichmentBatchItemResult]
+
+StatsBucket = Literal["hour", "day", "week", "month"]
+StatsDimension = Literal["function", "tone", "model"]
+
+class ContentEnrichmentStatsRow(BaseModel):
+    period: datetime
+    function: Optional[str] = None
+    tone: Optional[str] = None
+    model: Optional[str] = None
+    requests: int
+    accepted: int
+    failed: int
+    acceptance_rate: Optional[float] = None
+    latency_ms_mean: Optional[float] = None
+    latency_ms_p50: Optional[float] = None
+    latency_ms_p95: Optional[float] = None
+    cost_usd: float
+
+class ParsedContentEnrichmentStatsResponse(BaseModel):
+    bucket: StatsBucket
+    group_by: List[StatsDimension]
+    since: datetime
+    until: datetime
+    refreshed_through: Optional[datetime] = Field(None, description="Rows written or accepted after this are not counted yet")
+    rows: List[ContentEnrichmentStatsRow]
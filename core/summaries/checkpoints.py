@@ -0,0 +1,51 @@
+'''
+    Per-step checkpoints of a summary generation, backed by ai.summary_checkpoints.
+    Keyed by entity, review-set fingerprint and step, so a retried job for the same reviews picks up every step
+    that already completed, and a changed review set never reuses stale outputs.
+    Checkpoints are cleared once the summary is stored or its job has failed for good; the worker deletes the ones
+    left behind (abandoned jobs, a failed clear) after SUMMARY_CHECKPOINT_TTL_SECONDS.
+'''
+from uuid import UUID
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.summaries.models import Summary_Checkpoints as Summary_Checkpoints_Model
+
+class Summary_Checkpoints:
+    async def load(self, db: AsyncSession, entity_id: UUID, fingerprint: str) -> dict[str, Summary_Checkpoints_Model]:
+        '''Every completed step for the entity and review set, by step.'''
+        result = await db.execute(
+            select(Summary_Checkpoints_Model).filter_by(entity_id = entity_id, fingerprint = fingerprint)
+        )
+        return {checkpoint.step: checkpoint for checkpoint in result.scalars().all()}
+
+    async def save(self, db: AsyncSession, entity_id: UUID, fingerprint: str, step: str, output, usage: dict, latency: float, model: str) -> None:
+        '''usage: the step's UsageTracker.track_response breakdown.'''
+        # A concurrent attempt may have saved the step already, either output is as good
+        await db.execute(
+            insert(Summary_Checkpoints_Model)
+            .values(
+                entity_id = entity_id, fingerprint = fingerprint, step = step, output = output,
+                cost = usage.get('cost') or 0, usage = usage, latency = latency, model = model
+            )
+            .on_conflict_do_nothing(constraint = 'uq_summary_checkpoints_entity_fingerprint_step')
+        )
+        await db.commit()
+
+    async def clear(self, db: AsyncSession, entity_id: UUID, fingerprint: str) -> None:
+        await db.execute(
+            delete(Summary_Checkpoints_Model).filter_by(entity_id = entity_id, fingerprint = fingerprint)
+        )
+        await db.commit()
+
+    async def clear_expired(self, db: AsyncSession, ttl_seconds: float) -> int:
+        '''Deletes every checkpoint older than ttl_seconds, returns how many.'''
+        result = await db.execute(
+            delete(Summary_Checkpoints_Model)
+            .where(Summary_Checkpoints_Model.created_at < datetime.now(timezone.utc) - timedelta(seconds = ttl_seconds))
+        )
+        await db.commit()
+        return result.rowcount
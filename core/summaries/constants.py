@@ -1,26 +1,65 @@
-from core.summaries.prompts import SYSTEM_MESSAGE_SUMMARY_STEP_1, SYSTEM_MESSAGE_SUMMARY_STEP_2, SYSTEM_MESSAGE_POSITIVE_TAGS, SYSTEM_MESSAGE_NEGATIVE_TAGS, SYSTEM_MESSAGE_TAGS
+from core.summaries.types import Summary_Pipeline
+from core.summaries.prompts import SYSTEM_MESSAGE_SUMMARY_STEP_1, SYSTEM_MESSAGE_SUMMARY_STEP_2, SYSTEM_MESSAGE_POSITIVE_TAGS, SYSTEM_MESSAGE_NEGATIVE_TAGS, SYSTEM_MESSAGE_TAGS, SYSTEM_MESSAGE_SUMMARY_WITH_TAGS, SYSTEM_MESSAGE_SUMMARY_MAP, SYSTEM_MESSAGE_SUMMARY_REDUCE, SYSTEM_MESSAGE_SUMMARY_UPDATE
 
 MIN_SOURCES_FOR_SUMMARY = 3
 
+# Which pipeline _generate_summary runs, see Summary_Pipeline
+SUMMARY_PIPELINE = Summary_Pipeline.MULTI_STEP
+
+# Update the latest summary of an entity from only its new reviews, instead of regenerating from every review
+SUMMARY_INCREMENTAL = True
+
+# fallback_models: tried in order when the step's model errors or its circuit is open, see llms/circuit_breaker.py
 SUMMARY_CONFIG = {
     'step_1': {
         'model': 'gpt-4.1-mini',
+        'fallback_models': ['gpt-4o-mini'],
         'system_message': SYSTEM_MESSAGE_SUMMARY_STEP_1
     },
     'step_2': {
         'model': 'gpt-4.1',
+        'fallback_models': ['gpt-4o', 'gpt-4.1-mini'],
         'system_message': SYSTEM_MESSAGE_SUMMARY_STEP_2
     },
     'positive_tags': {
         'model': 'gpt-4.1',
+        'fallback_models': ['gpt-4o', 'gpt-4.1-mini'],
         'system_message': SYSTEM_MESSAGE_POSITIVE_TAGS
     },
     'negative_tags': {
         'model': 'gpt-4.1',
+        'fallback_models': ['gpt-4o', 'gpt-4.1-mini'],
         'system_message': SYSTEM_MESSAGE_NEGATIVE_TAGS
     },
     'tags': {
         'model': 'gpt-4.1-mini',
+        'fallback_models': ['gpt-4o-mini'],
         'system_message': SYSTEM_MESSAGE_TAGS
+    },
+    'single_call': {
+        'model': 'gpt-4.1',
+        'fallback_models': ['gpt-4o', 'gpt-4.1-mini'],
+        'system_message': SYSTEM_MESSAGE_SUMMARY_WITH_TAGS
+    },
+    # Map-reduce is used instead of SUMMARY_PIPELINE once the reviews exceed threshold_tokens (estimated)
+    'map': {
+        'model': 'gpt-4.1-mini',
+        'fallback_models': ['gpt-4o-mini'],
+        'system_message': SYSTEM_MESSAGE_SUMMARY_MAP,
+        'threshold_tokens': 30000,
+        'chunk_tokens': 12000,
+        'max_concurrency': 4
+    },
+    'reduce': {
+        'model': 'gpt-4.1',
+        'fallback_models': ['gpt-4o', 'gpt-4.1-mini'],
+        'system_message': SYSTEM_MESSAGE_SUMMARY_REDUCE
+    },
+    # Falls back to full regeneration when new reviews are more than max_churn of all the reviews, or when any were removed
+    'incremental': {
+        'model': 'gpt-4.1',
+        'fallback_models': ['gpt-4o', 'gpt-4.1-mini'],
+        'system_message': SYSTEM_MESSAGE_SUMMARY_UPDATE,
+        'max_churn': 0.2
     }
 }
@@ -0,0 +1,71 @@
+'''
+    Drains the public-schema publish outbox (ai.summary_publish_outbox).
+    Runs next to the summaries worker; up to SUMMARY_OUTBOX_CONCURRENCY records are published at once, or with a batching
+    publisher (SUMMARY_PUBLISH_BATCHED) up to its max_batch_size, so a claim fills a whole batch request.
+    Failed publishes are retried with backoff without regenerating the summary.
+'''
+import asyncio
+import aiohttp
+import logfire
+
+from db import AsyncSessionLocal
+from core.summaries.types import Job_Status
+from core.summaries.outbox import Summary_Outbox
+from core.summaries.models import Summary_Publish_Outbox
+from core.summaries.publisher import Summary_Publisher, publish_summary
+from settings import SUMMARY_OUTBOX_CONCURRENCY, SUMMARY_WORKER_POLL_INTERVAL_SECONDS
+
+class Summary_Outbox_Dispatcher:
+    def __init__(
+        self,
+        concurrency: int = SUMMARY_OUTBOX_CONCURRENCY,
+        poll_interval: float = SUMMARY_WORKER_POLL_INTERVAL_SECONDS,
+        http_session: aiohttp.ClientSession | None = None,
+        publisher: Summary_Publisher | None = None
+    ):
+        # A batching publisher holds every record until its batch is posted, so a claim smaller than the batch would cap it
+        self.concurrency = max(concurrency, publisher.max_batch_size) if publisher else concurrency
+        self.poll_interval = poll_interval
+        self.http_session = http_session
+        self.publisher = publisher
+        self.outbox = Summary_Outbox()
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self):
+        logfire.info(f'Summaries outbox dispatcher started with concurrency {self.concurrency}')
+        while not self._stopping.is_set():
+            records = []
+            try:
+                async with AsyncSessionLocal() as db:
+                    records = await self.outbox.claim(db, self.concurrency)
+            except Exception as e:
+                logfire.error(f'Error in {self.__class__.__name__}.{self.run.__name__} claiming outbox records: {e}')
+
+            if records:
+                await asyncio.gather(*(self.dispatch(record) for record in records))
+            else:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout = self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logfire.info('Summaries outbox dispatcher stopped')
+
+    async def dispatch(self, record: Summary_Publish_Outbox) -> Job_Status:
+        try:
+            await publish_summary(record.source_type, record.payload, self.http_session, self.publisher)
+            async with AsyncSessionLocal() as db:
+                await self.outbox.mark_published(db, record)
+            logfire.info(f'Published summary {record.summary_id} for supplier: {record.entity_id} on attempt {record.attempts}')
+            return Job_Status.SUCCEEDED
+        except Exception as e:
+            logfire.error(f'Publishing summary {record.summary_id} for supplier: {record.entity_id} failed on attempt {record.attempts}: {e}')
+            try:
+                async with AsyncSessionLocal() as db:
+                    return await self.outbox.mark_failed(db, record, str(e))
+            except Exception as db_error:
+                # The record keeps its lock and is reclaimed once the lock times out
+                logfire.error(f'Error in {self.__class__.__name__}.{self.dispatch.__name__} recording failure of {record.id}: {db_error}')
+                return Job_Status.RUNNING
@@ -1,4 +1,7 @@
 import os
+import json
+import math
+import hashlib
 from uuid import UUID
 
 from core.summaries.types import Source, Source_Type
@@ -8,8 +11,46 @@ def extract_source_data(sources: list[Source]) -> tuple[list[UUID], list[str]]:
     reviews = [source.review for source in sources]
     return ids, reviews
 
+def fingerprint_sources(sources: list[Source]) -> str:
+    '''sha256 of the (id, review) pairs sorted by id, so the same review set in any order has the same fingerprint.'''
+    pairs = sorted([str(source.id), source.review] for source in sources)
+    return hashlib.sha256(json.dumps(pairs).encode('utf-8')).hexdigest()
+
+def format_reviews(reviews: list[str]) -> str:
+    '''One numbered review per line, instead of the repr of a Python list.'''
+    return '\n'.join(f'{index}. {review}' for index, review in enumerate(reviews, start = 1))
+
+# Rough average for English text with OpenAI tokenizers; good enough to size chunks without a tokenizer dependency
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def chunk_reviews(reviews: list[str], max_tokens: int) -> list[list[str]]:
+    '''
+        Greedily pack reviews, in order, into chunks of at most max_tokens (estimated).
+        A single review larger than max_tokens gets a chunk of its own rather than being split.
+    '''
+    chunks, current, current_tokens = [], [], 0
+    for review in reviews:
+        review_tokens = estimate_tokens(review)
+        if current and current_tokens + review_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(review)
+        current_tokens += review_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
 def get_backend_write_endpoint(entity_id: str, source_type: Source_Type):
     if (source_type == Source_Type.CLIENT_SUPPLIER_REVIEWS):
         return f'{os.environ.get("RESTRICTED_BASE_URL")}/v1/suppliers/{entity_id}/client-reviews/summary/'
     else:
         raise KeyError(f'{source_type} is not a valid source type.')
+
+def get_backend_batch_write_endpoint(source_type: Source_Type):
+    if (source_type == Source_Type.CLIENT_SUPPLIER_REVIEWS):
+        return f'{os.environ.get("RESTRICTED_BASE_URL")}/v1/suppliers/client-reviews/summary/batch/'
+    else:
+        raise KeyError(f'{source_type} is not a valid source type.')
@@ -0,0 +1,145 @@
+'''
+    Durable job queue for summary generation, backed by ai.summary_jobs.
+    Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers can drain the queue
+    without claiming the same job twice. A job whose worker died is reclaimed once its lock is older than
+    SUMMARY_JOB_LOCK_TIMEOUT_SECONDS, unless that was its last attempt: it is then marked failed, since a job
+    that kills its worker (OOM, segfault) never reaches mark_failed and would otherwise be retried forever.
+'''
+import logfire
+from uuid import UUID
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import AsyncBaseDBOperations
+from core.summaries.types import Job_Status
+from core.summaries.models import Summary_Jobs
+from core.summaries.serializers import Summaries_Request
+from settings import (
+    SUMMARY_JOB_MAX_ATTEMPTS, SUMMARY_JOB_RETRY_BACKOFF_SECONDS,
+    SUMMARY_JOB_LOCK_TIMEOUT_SECONDS
+)
+
+def retry_after(attempts: int, backoff_seconds: float, max_backoff_seconds: float | None = None) -> datetime:
+    '''When to retry after the given number of failed attempts: backoff_seconds doubled per attempt, optionally capped.'''
+    backoff = backoff_seconds * 2 ** (attempts - 1)
+    if max_backoff_seconds is not None:
+        backoff = min(backoff, max_backoff_seconds)
+    return datetime.now(timezone.utc) + timedelta(seconds = backoff)
+
+ABANDONED_ERROR = 'Lock expired on the last attempt, the worker running it died'
+
+async def fail_abandoned(db: AsyncSession, model, lock_timeout_seconds: float) -> int:
+    '''
+        Mark failed the running rows of a queue table whose lock expired on their last attempt, so they are not
+        reclaimed (and paid for) again. Not committed, returns how many rows were marked.
+    '''
+    result = await db.execute(
+        update(model)
+        .where(
+            model.status == Job_Status.RUNNING,
+            model.locked_at < func.now() - timedelta(seconds = lock_timeout_seconds),
+            model.attempts >= model.max_attempts
+        )
+        .values(status = Job_Status.FAILED, last_error = ABANDONED_ERROR, locked_at = None)
+        .execution_options(synchronize_session = False)
+    )
+    if result.rowcount:
+        logfire.warning(f'Marked {result.rowcount} abandoned {model.__tablename__} rows as failed after their last attempt')
+    return result.rowcount
+
+async def claim_runnable(db: AsyncSession, model, limit: int, lock_timeout_seconds: float) -> list:
+    '''
+        Atomically mark up to `limit` runnable rows of a queue table (status, run_after, locked_at, attempts, max_attempts) as running and return them.
+        Runnable: pending and past run_after, or running with a lock older than the lock timeout and attempts left.
+    '''
+    await fail_abandoned(db, model, lock_timeout_seconds)
+    claimable = (
+        select(model.id)
+        .where(or_(
+            and_(model.status == Job_Status.PENDING, model.run_after <= func.now()),
+            and_(
+                model.status == Job_Status.RUNNING,
+                model.locked_at < func.now() - timedelta(seconds = lock_timeout_seconds),
+                model.attempts < model.max_attempts
+            )
+        ))
+        .order_by(model.run_after)
+        .limit(limit)
+        .with_for_update(skip_locked = True)
+    )
+    result = await db.execute(
+        update(model)
+        .where(model.id.in_(claimable.scalar_subquery()))
+        .values(
+            status = Job_Status.RUNNING,
+            locked_at = func.now(),
+            attempts = model.attempts + 1
+        )
+        .returning(model)
+        .execution_options(synchronize_session = False)
+    )
+    rows = list(result.scalars().all())
+    await db.commit()
+    return rows
+
+class Summary_Job_Queue:
+    def __init__(self):
+        self.db = AsyncBaseDBOperations(Summary_Jobs)
+
+    async def enqueue(self, db: AsyncSession, request: Summaries_Request) -> Summary_Jobs:
+        return await self.db.create(db, {
+            'entity_id': request.entity_id,
+            'request': request.model_dump(mode = 'json'),
+            'max_attempts': SUMMARY_JOB_MAX_ATTEMPTS
+        })
+
+    async def get(self, db: AsyncSession, job_id: UUID) -> Optional[Summary_Jobs]:
+        return await self.db.get(db, job_id)
+
+    async def count_pending(self, db: AsyncSession) -> int:
+        result = await db.execute(
+            select(func.count()).select_from(Summary_Jobs).where(Summary_Jobs.status == Job_Status.PENDING)
+        )
+        return result.scalar_one()
+
+    async def claim(self, db: AsyncSession, limit: int) -> list[Summary_Jobs]:
+        return await claim_runnable(db, Summary_Jobs, limit, SUMMARY_JOB_LOCK_TIMEOUT_SECONDS)
+
+    async def mark_succeeded(self, db: AsyncSession, job: Summary_Jobs, summary_id: Optional[str]) -> None:
+        await self._update(db, job.id, {
+            'status': Job_Status.SUCCEEDED,
+            'summary_id': summary_id,
+            'last_error': None,
+            'locked_at': None
+        })
+
+    async def mark_failed(self, db: AsyncSession, job: Summary_Jobs, error: str) -> Job_Status:
+        '''
+            Record a failed attempt. The job goes back to pending with exponential backoff,
+            or is marked failed once it has used up max_attempts.
+        '''
+        if (job.attempts >= job.max_attempts):
+            status = Job_Status.FAILED
+            run_after = job.run_after
+        else:
+            status = Job_Status.PENDING
+            run_after = retry_after(job.attempts, SUMMARY_JOB_RETRY_BACKOFF_SECONDS)
+        await self._update(db, job.id, {
+            'status': status,
+            'last_error': error,
+            'run_after': run_after,
+            'locked_at': None
+        })
+        return status
+
+    async def _update(self, db: AsyncSession, job_id: UUID, values: dict) -> None:
+        await db.execute(
+            update(Summary_Jobs)
+            .where(Summary_Jobs.id == job_id)
+            .values(**values)
+            .execution_options(synchronize_session = False)
+        )
+        await db.commit()
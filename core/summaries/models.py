@@ -1,10 +1,10 @@
 import uuid
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
-from sqlalchemy import Column, Text, DateTime, Enum, JSON
+from sqlalchemy import Column, Text, String, DateTime, Enum, JSON, Integer, Float, Index, UniqueConstraint
 
 from db.base import Base
-from core.summaries.types import Source_Type
+from core.summaries.types import Source_Type, Job_Status
 
 class Summaries(Base):
     '''
@@ -20,11 +20,15 @@ class Summaries(Base):
             positive_tags: [ARRAY(Text)] - The positive tags of the summary
             negative_tags: [ARRAY(Text)] - The negative tags of the sumamry
             content_metadata: [JSON] - Other metadata (cost, latency, etc.)
+            fingerprint: [String] - sha256 of the sorted source ids and reviews, used to skip regenerating an unchanged review set
             created_at: [DateTime]
             updated_at: [DateTime]
     '''
     __tablename__ = 'summaries'
-    __table_args__ = {'schema': 'ai'}
+    __table_args__ = (
+        Index('ix_summaries_entity_source_fingerprint', 'entity_id', 'source_type', 'fingerprint'),
+        {'schema': 'ai'}
+    )
 
     id = Column(UUID(as_uuid = True), primary_key = True, default = uuid.uuid4)
     entity_id = Column(UUID(as_uuid = True), nullable = False)
@@ -42,5 +46,145 @@ class Summaries(Base):
     positive_tags = Column(ARRAY(Text))
     negative_tags = Column(ARRAY(Text))
     content_metadata = Column('metadata', JSON)
+    fingerprint = Column(String(64))
+    created_at = Column(DateTime(timezone = True), server_default = func.now(), nullable = False)
+    updated_at = Column(DateTime(timezone = True), server_default = func.now(), onupdate = func.now(), nullable = False)
+
+class Summary_Jobs(Base):
+    '''
+        Durable queue of summary generation jobs, drained by the summaries worker (core/summaries/worker.py).
+        Table name: summary_jobs
+        Schema: ai
+        Columns:
+            id: [UUID] - Primary key, returned to the caller to poll the job status
+            entity_id: [UUID] - The id of the entity that the summary is for
+            request: [JSON] - The Summaries_Request payload
+            status: [Enum] - pending, running, succeeded or failed
+            attempts: [Integer] - Number of times the job has been claimed
+            max_attempts: [Integer] - The job is marked failed once attempts reaches this
+            last_error: [Text] - Error from the most recent failed attempt
+            summary_id: [UUID] - The generated row in ai.summaries, once succeeded
+            run_after: [DateTime] - The job is not claimed before this time (used for retry backoff)
+            locked_at: [DateTime] - When a worker claimed the job; stale locks are reclaimed
+            created_at: [DateTime]
+            updated_at: [DateTime]
+    '''
+    __tablename__ = 'summary_jobs'
+    __table_args__ = (
+        Index('ix_summary_jobs_status_run_after', 'status', 'run_after'),
+        {'schema': 'ai'}
+    )
+
+    id = Column(UUID(as_uuid = True), primary_key = True, default = uuid.uuid4)
+    entity_id = Column(UUID(as_uuid = True), nullable = False)
+    request = Column(JSON, nullable = False)
+    status = Column(Enum(
+            Job_Status,
+            name = 'job_status',
+            schema = 'ai',
+            values_callable = lambda obj: [e.value for e in obj]
+        ),
+        nullable = False,
+        default = Job_Status.PENDING
+    )
+    attempts = Column(Integer, nullable = False, default = 0)
+    max_attempts = Column(Integer, nullable = False)
+    last_error = Column(Text)
+    summary_id = Column(UUID(as_uuid = True))
+    run_after = Column(DateTime(timezone = True), server_default = func.now(), nullable = False)
+    locked_at = Column(DateTime(timezone = True))
+    created_at = Column(DateTime(timezone = True), server_default = func.now(), nullable = False)
+    updated_at = Column(DateTime(timezone = True), server_default = func.now(), onupdate = func.now(), nullable = False)
+
+class Summary_Publish_Outbox(Base):
+    '''
+        Transactional outbox of summaries to publish to the public schema.
+        A record is written in the same transaction as its ai.summaries row, and drained by the outbox dispatcher
+        (core/summaries/dispatcher.py), so a failed publish is retried on its own instead of regenerating the summary.
+        Table name: summary_publish_outbox
+        Schema: ai
+        Columns:
+            id: [UUID] - Primary key
+            summary_id: [UUID] - The row in ai.summaries being published
+            entity_id: [UUID] - The id of the entity that the summary is for
+            source_type: [Enum] - Decides the backend endpoint
+            payload: [JSON] - The body posted to the backend
+            status: [Enum] - pending, running, succeeded (published) or failed (gave up)
+            attempts: [Integer] - Number of publish attempts
+            max_attempts: [Integer] - The record is marked failed once attempts reaches this
+            last_error: [Text] - Error from the most recent failed attempt
+            run_after: [DateTime] - The record is not claimed before this time (used for retry backoff)
+            locked_at: [DateTime] - When a dispatcher claimed the record; stale locks are reclaimed
+            created_at: [DateTime]
+            updated_at: [DateTime]
+    '''
+    __tablename__ = 'summary_publish_outbox'
+    __table_args__ = (
+        Index('ix_summary_publish_outbox_status_run_after', 'status', 'run_after'),
+        {'schema': 'ai'}
+    )
+
+    id = Column(UUID(as_uuid = True), primary_key = True, default = uuid.uuid4)
+    summary_id = Column(UUID(as_uuid = True), nullable = False)
+    entity_id = Column(UUID(as_uuid = True), nullable = False)
+    source_type = Column(Enum(
+            Source_Type,
+            name = 'source_type',
+            schema = 'ai',
+            values_callable = lambda obj: [e.value for e in obj]
+        ),
+        nullable = False
+    )
+    payload = Column(JSON, nullable = False)
+    status = Column(Enum(
+            Job_Status,
+            name = 'job_status',
+            schema = 'ai',
+            values_callable = lambda obj: [e.value for e in obj]
+        ),
+        nullable = False,
+        default = Job_Status.PENDING
+    )
+    attempts = Column(Integer, nullable = False, default = 0)
+    max_attempts = Column(Integer, nullable = False)
+    last_error = Column(Text)
+    run_after = Column(DateTime(timezone = True), server_default = func.now(), nullable = False)
+    locked_at = Column(DateTime(timezone = True))
     created_at = Column(DateTime(timezone = True), server_default = func.now(), nullable = False)
     updated_at = Column(DateTime(timezone = True), server_default = func.now(), onupdate = func.now(), nullable = False)
+
+class Summary_Checkpoints(Base):
+    '''
+        Outputs of the completed steps of a summary generation, so a retried job resumes from the last completed step
+        instead of paying for every LLM call again. Rows are deleted once the summary is stored or the job has failed
+        for good, and after SUMMARY_CHECKPOINT_TTL_SECONDS otherwise.
+        Table name: summary_checkpoints
+        Schema: ai
+        Columns:
+            id: [UUID] - Primary key
+            entity_id: [UUID] - The id of the entity that the summary is for
+            fingerprint: [String] - Fingerprint of the review set (see Summaries.fingerprint), a changed review set starts over
+            step: [String] - Pipeline step, e.g. multi_step.step_1 or map_reduce.map.3
+            output: [JSON] - The step's output, text or the structured output as a dict
+            cost: [Float] - Cost of the step in USD
+            usage: [JSON] - Input, cached input, output and reasoning tokens and cost of the step
+            latency: [Float] - Latency of the step in seconds
+            model: [Text] - The model that answered
+            created_at: [DateTime]
+    '''
+    __tablename__ = 'summary_checkpoints'
+    __table_args__ = (
+        UniqueConstraint('entity_id', 'fingerprint', 'step', name = 'uq_summary_checkpoints_entity_fingerprint_step'),
+        {'schema': 'ai'}
+    )
+
+    id = Column(UUID(as_uuid = True), primary_key = True, default = uuid.uuid4)
+    entity_id = Column(UUID(as_uuid = True), nullable = False)
+    fingerprint = Column(String(64), nullable = False)
+    step = Column(String, nullable = False)
+    output = Column(JSON, nullable = False)
+    cost = Column(Float, nullable = False, default = 0)
+    usage = Column(JSON)
+    latency = Column(Float)
+    model = Column(Text)
+    created_at = Column(DateTime(timezone = True), server_default = func.now(), nullable = False)
@@ -0,0 +1,74 @@
+'''
+    Transactional outbox for public-schema writes, backed by ai.summary_publish_outbox.
+    add() runs inside the transaction that inserts the ai.summaries row, so every stored summary has a pending
+    publish record; the dispatcher claims records the same way the job queue claims jobs.
+'''
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import AsyncBaseDBOperations
+from core.summaries.types import Job_Status, Source_Type
+from core.summaries.models import Summary_Publish_Outbox
+from core.summaries.jobs import claim_runnable, retry_after
+from settings import (
+    SUMMARY_OUTBOX_MAX_ATTEMPTS, SUMMARY_OUTBOX_RETRY_BACKOFF_SECONDS,
+    SUMMARY_OUTBOX_MAX_BACKOFF_SECONDS, SUMMARY_JOB_LOCK_TIMEOUT_SECONDS
+)
+
+class Summary_Outbox:
+    def __init__(self):
+        self.async_db = AsyncBaseDBOperations(Summary_Publish_Outbox)
+
+    async def add(self, db: AsyncSession, summary_id: UUID, entity_id: str, source_type: Source_Type, payload: dict) -> Summary_Publish_Outbox:
+        '''Adds the record without committing; the caller commits it with the summary.'''
+        return await self.async_db.add(db, self._record(summary_id, entity_id, source_type, payload))
+
+    async def enqueue(self, db: AsyncSession, summary_id: UUID, entity_id: str, source_type: Source_Type, payload: dict) -> Summary_Publish_Outbox:
+        '''Adds and commits a record for a summary that is already stored, e.g. one re-published unchanged.'''
+        return await self.async_db.create(db, self._record(summary_id, entity_id, source_type, payload))
+
+    def _record(self, summary_id: UUID, entity_id: str, source_type: Source_Type, payload: dict) -> dict:
+        return {
+            'summary_id': summary_id,
+            'entity_id': entity_id,
+            'source_type': source_type,
+            'payload': payload,
+            'max_attempts': SUMMARY_OUTBOX_MAX_ATTEMPTS
+        }
+
+    async def claim(self, db: AsyncSession, limit: int) -> list[Summary_Publish_Outbox]:
+        return await claim_runnable(db, Summary_Publish_Outbox, limit, SUMMARY_JOB_LOCK_TIMEOUT_SECONDS)
+
+    async def mark_published(self, db: AsyncSession, record: Summary_Publish_Outbox) -> None:
+        await self._update(db, record.id, {
+            'status': Job_Status.SUCCEEDED,
+            'last_error': None,
+            'locked_at': None
+        })
+
+    async def mark_failed(self, db: AsyncSession, record: Summary_Publish_Outbox, error: str) -> Job_Status:
+        '''Back to pending with capped exponential backoff, or failed once max_attempts is used up.'''
+        if (record.attempts >= record.max_attempts):
+            status = Job_Status.FAILED
+            run_after = record.run_after
+        else:
+            status = Job_Status.PENDING
+            run_after = retry_after(record.attempts, SUMMARY_OUTBOX_RETRY_BACKOFF_SECONDS, SUMMARY_OUTBOX_MAX_BACKOFF_SECONDS)
+        await self._update(db, record.id, {
+            'status': status,
+            'last_error': error,
+            'run_after': run_after,
+            'locked_at': None
+        })
+        return status
+
+    async def _update(self, db: AsyncSession, record_id: UUID, values: dict) -> None:
+        await db.execute(
+            update(Summary_Publish_Outbox)
+            .where(Summary_Publish_Outbox.id == record_id)
+            .values(**values)
+            .execution_options(synchronize_session = False)
+        )
+        await db.commit()
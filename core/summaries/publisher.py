@@ -0,0 +1,112 @@
+'''
+    Buffers summaries for the public schema and publishes them to the backend batch endpoint,
+    so a backfill of thousands of suppliers takes a handful of requests instead of one per supplier.
+    A buffer is flushed once it holds max_batch_size summaries, or every flush_interval seconds.
+'''
+import os
+import asyncio
+import aiohttp
+import logfire
+from collections import defaultdict
+
+from core.summaries.types import Source_Type
+from core.summaries.helper import get_backend_write_endpoint, get_backend_batch_write_endpoint
+from settings import SUMMARY_PUBLISH_BATCH_SIZE, SUMMARY_PUBLISH_FLUSH_INTERVAL_SECONDS
+
+class Summary_Publisher:
+    def __init__(
+        self,
+        http_session: aiohttp.ClientSession,
+        max_batch_size: int = SUMMARY_PUBLISH_BATCH_SIZE,
+        flush_interval: float = SUMMARY_PUBLISH_FLUSH_INTERVAL_SECONDS
+    ):
+        self.http_session = http_session
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        # One buffer per source type, since each has its own endpoint
+        self.buffers: dict[Source_Type, list[tuple[dict, asyncio.Future]]] = defaultdict(list)
+        self._flusher: asyncio.Task | None = None
+
+    async def publish(self, source_type: Source_Type, payload: dict):
+        '''Buffer a summary payload and wait until the batch containing it has been published. Raises if the batch failed.'''
+        get_backend_batch_write_endpoint(source_type)  # Fail fast on unsupported source types
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+        future = asyncio.get_running_loop().create_future()
+        self.buffers[source_type].append((payload, future))
+        if len(self.buffers[source_type]) >= self.max_batch_size:
+            await self._flush_source_type(source_type)
+        await future
+
+    async def flush(self):
+        await asyncio.gather(*(self._flush_source_type(source_type) for source_type in list(self.buffers)))
+
+    async def close(self):
+        '''Stop the periodic flush and publish whatever is still buffered.'''
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions = True)
+            self._flusher = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logfire.error(f'Error in {self.__class__.__name__}.{self._flush_periodically.__name__}: {e}')
+
+    async def _flush_source_type(self, source_type: Source_Type):
+        batch = self.buffers.pop(source_type, [])
+        if not batch:
+            return
+        try:
+            async with self.http_session.post(
+                url = get_backend_batch_write_endpoint(source_type),
+                json = {'summaries': [payload for payload, _ in batch]},
+                headers = {
+                    'Content-Type': 'application/json',
+                    'XAPIKEY': os.environ.get('FORA_PORTAL_BE_API_KEY')
+                }
+            ) as response:
+                response.raise_for_status()
+            logfire.info(f'Published {len(batch)} {source_type.value} summaries to public schema. Status: {response.status}')
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self._flush_source_type.__name__} publishing {len(batch)} summaries: {e}')
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+async def publish_summary(
+    source_type: Source_Type,
+    payload: dict,
+    http_session: aiohttp.ClientSession | None = None,
+    publisher: Summary_Publisher | None = None
+):
+    '''
+        Publish one summary payload to the public schema: through the publisher's batches when given,
+        otherwise posted on its own with the shared http_session (or a new session for this call).
+    '''
+    if publisher:
+        await publisher.publish(source_type, payload)
+        return
+    url = get_backend_write_endpoint(payload['supplier_id'], source_type)
+    session = http_session or aiohttp.ClientSession()
+    try:
+        async with session.post(
+            url = url,
+            json = payload,
+            headers = {
+                'Content-Type': 'application/json',
+                'XAPIKEY': os.environ.get('FORA_PORTAL_BE_API_KEY')
+            },
+            timeout = aiohttp.ClientTimeout(total = 30)
+        ) as response:
+            response.raise_for_status()
+    finally:
+        if session is not http_session:
+            await session.close()
@@ -1,10 +1,12 @@
 import os
 import logfire
 from uuid import UUID
+from typing import Optional
+from datetime import datetime
 from pydantic import BaseModel, model_validator, field_validator
 
 from core.summaries.types import Source
-from core.summaries.types import Source_Type
+from core.summaries.types import Source_Type, Job_Status
 from core.summaries.constants import MIN_SOURCES_FOR_SUMMARY
 
 class Summaries_Request(BaseModel):
@@ -29,3 +31,14 @@ class Summaries_Request(BaseModel):
             logfire.error(f'At least {MIN_SOURCES_FOR_SUMMARY} sources are required for {self.entity_id}, but only {len(self.sources)} were provided')
             raise ValueError(f'At least {MIN_SOURCES_FOR_SUMMARY} sources are required for {self.entity_id}, but only {len(self.sources)} were provided')
         return self
+
+class Summary_Job_Response(BaseModel):
+    id: UUID
+    entity_id: UUID
+    status: Job_Status
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+    summary_id: Optional[UUID] = None
+    created_at: datetime
+    updated_at: datetime
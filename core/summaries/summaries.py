@@ -1,8 +1,8 @@
 import os
 import sys
+import time
 import uuid
 import asyncio
-import aiohttp
 import logfire
 
 from pathlib import Path
@@ -10,23 +10,38 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from utils import track_latency
 from llms.factory import LLMFetcher
-from db import get_db, BaseDBOperations
-from utils.usage_tracker import UsageTracker
-from core.summaries.helper import extract_source_data, get_backend_write_endpoint
+from llms.rate_limiter import Priority
+from llms.retry import deadline_in
+from db import AsyncBaseDBOperations, AsyncSessionLocal
+from utils.usage_tracker import UsageTracker, sum_usage
+from core.summaries.helper import extract_source_data, fingerprint_sources, format_reviews, estimate_tokens, chunk_reviews
 
-from core.summaries.constants import SUMMARY_CONFIG
+from core.summaries.prompts import SYSTEM_MESSAGE_REVIEWS_CONTEXT
+from core.summaries.constants import SUMMARY_CONFIG, SUMMARY_PIPELINE, SUMMARY_INCREMENTAL
 from core.summaries.serializers import Summaries_Request
-from core.summaries.types import Source_Type, Tags, All_Tags
+from core.summaries.types import Source_Type, Tags, All_Tags, Summary_Pipeline, Summary_With_Tags
 from core.summaries.models import Summaries as Summaries_Model
+from core.summaries.outbox import Summary_Outbox
+from core.summaries.checkpoints import Summary_Checkpoints
+from settings import SUMMARY_DEADLINE_SECONDS
 
 class Summaries:
     SESSION_ID = str(uuid.uuid4())[:5]
     def __init__(self):
         logfire.configure(token = os.environ.get('LOGFIRE_API_KEY'), service_name = self.SESSION_ID)
         logfire.instrument_openai()
-        self.llm = LLMFetcher(provider = 'openai').async_client
-        self.usage_tracker = UsageTracker()
-        self.db = BaseDBOperations(Summaries_Model)
+        self.llm = LLMFetcher()
+        self.usage_tracker = UsageTracker(function = 'summaries')
+        self.async_db = AsyncBaseDBOperations(Summaries_Model)
+        self.outbox = Summary_Outbox()
+        self.deadline = None
+        # Models that actually answered (fallbacks included), stored with the summary
+        self.models_used = set()
+        self.checkpoints = Summary_Checkpoints()
+        # Steps completed by an earlier attempt at the same review set, by step name
+        self.completed_steps = {}
+        # Output, usage, latency and model of every step of this generation; cost, latency and model are stored with the summary
+        self.steps = {}
     
     @logfire.instrument(f'AI summary | {SESSION_ID}')
     async def generate(self, request: Summaries_Request) -> str | None:
@@ -35,12 +50,26 @@ class Summaries:
             self.entity_name = request.entity_name
             self.source_type = request.source_type
             self.source_ids, self.source_reviews = extract_source_data(request.sources)
+            self.fingerprint = fingerprint_sources(request.sources)
+            # Every LLM call for this summary, retries included, has to finish by this deadline
+            self.deadline = deadline_in(SUMMARY_DEADLINE_SECONDS)
+            self.models_used = set()
+
+            existing_summary = await self._get_latest_summary(self.fingerprint)
+            if existing_summary:
+                logfire.info(f'Reviews for supplier: {self.entity_id} unchanged since summary {existing_summary.id}, re-publishing it')
+                await self._republish_summary(existing_summary)
+                return str(existing_summary.id)
+            self.previous_summary = await self._get_latest_summary() if SUMMARY_INCREMENTAL else None
+            self.completed_steps = await self._load_checkpoints()
+            self.steps = {}
             
             logfire.info(f'Initializing summary generation for supplier: {self.entity_id}, with {len(self.source_reviews)} reviews')
             summary, latency = await self._generate_summary()
             if summary:
+                # Publishing to the public schema goes through the outbox written with the summary (see core/summaries/dispatcher.py)
                 summary_id = await self._write_summary_to_ai_schema(self.entity_id, self.source_type, self.source_ids, summary, latency)
-                await self._write_summary_to_public_schema(self.entity_id, summary)
+                await self._clear_checkpoints()
                 return summary_id
             else:
                 logfire.warning(f'No summary generated for supplier: {self.entity_id}')
@@ -49,48 +78,191 @@ class Summaries:
             logfire.error(f'Error in {self.__class__.__name__}.{self.generate.__name__}: {e}')
             raise e
     
-    async def _response(self, model: str, system_message: str, user_message: str) -> tuple[str, float]:
+    def _input(self, system_message: str, user_message: str, shared_prefix: bool = False) -> list[dict]:
+        '''
+            Messages for a single call.
+            With shared_prefix, every call starts with the same reviews context (identical across steps) and the
+            task-specific instructions come last, so the provider's prompt cache can reuse the reviews tokens.
+        '''
+        messages = [
+            {'role': 'system', 'content': system_message},
+            {'role': 'user', 'content': user_message}
+        ]
+        if not shared_prefix:
+            return messages
+        return [
+            {'role': 'system', 'content': SYSTEM_MESSAGE_REVIEWS_CONTEXT},
+            {'role': 'user', 'content': f'Hotel name: {self.entity_name}\nReviews:\n{format_reviews(self.source_reviews)}'},
+            *messages
+        ]
+
+    async def _response(
+        self,
+        model: str,
+        system_message: str,
+        user_message: str,
+        shared_prefix: bool = False,
+        fallback_models: list[str] = (),
+        step: str | None = None
+    ) -> tuple[str, float]:
         try:
-            response = await self.llm.responses.create(
+            return await self._run_step(step, lambda: self.llm.create_response(
+                priority = Priority.BACKGROUND,
+                deadline = self.deadline,
+                fallback_models = fallback_models,
                 model = model,
-                input = [
-                    {'role': 'system', 'content': system_message},
-                    {'role': 'user', 'content': user_message}
-                ]
-            )
-            return response.output_text, self.usage_tracker.get_responses_cost_simple(model, response.usage)
+                input = self._input(system_message, user_message, shared_prefix)
+            ))
         except Exception as e:
             logfire.error(f'Error in {self.__class__.__name__}.{self._response.__name__}: {e}')
             raise e
     
-    async def _response_structured_output(self, model: str, system_message: str, user_message: str, text_format) -> tuple[object, float]:
+    async def _response_structured_output(
+        self,
+        model: str,
+        system_message: str,
+        user_message: str,
+        text_format,
+        shared_prefix: bool = False,
+        fallback_models: list[str] = (),
+        step: str | None = None
+    ) -> tuple[object, float]:
         try:
-            response = await self.llm.responses.parse(
+            return await self._run_step(step, lambda: self.llm.parse_response(
+                priority = Priority.BACKGROUND,
+                deadline = self.deadline,
+                fallback_models = fallback_models,
                 model = model,
-                input = [
-                    {'role': 'system', 'content': system_message},
-                    {'role': 'user', 'content': user_message}
-                ],
+                input = self._input(system_message, user_message, shared_prefix),
                 text_format = text_format
-            )
-            return response.output_parsed, self.usage_tracker.get_responses_cost_simple(model, response.usage)
+            ), text_format)
         except Exception as e:
             logfire.error(f'Error in {self.__class__.__name__}.{self._response_structured_output.__name__}: {e}')
             raise e
+
+    async def _run_step(self, step: str | None, call, text_format = None) -> tuple[object, float]:
+        '''
+            (output, cost) of a pipeline step: from its checkpoint when an earlier attempt completed it, otherwise from call(),
+            checkpointed. text_format: the structured output model, None for text.
+        '''
+        checkpoint = self.completed_steps.get(step) if step else None
+        if checkpoint is not None:
+            logfire.info(f'Resuming step {step} for supplier: {self.entity_id} from its checkpoint')
+            self.models_used.add(checkpoint.model)
+            self.steps[step] = {
+                'output': checkpoint.output,
+                'latency': checkpoint.latency,
+                'model': checkpoint.model,
+                'resumed': True,
+                **(checkpoint.usage or {'cost': checkpoint.cost})
+            }
+            return (text_format.model_validate(checkpoint.output) if text_format else checkpoint.output), checkpoint.cost
+
+        start_time = time.monotonic()
+        response = await call()
+        latency = round(time.monotonic() - start_time, 4)
+        self.models_used.add(response.model)
+        usage = self.usage_tracker.track_response(response.model, response.usage)
+        cost = usage['cost'] or 0
+        output = response.output_parsed if text_format else response.output_text
+        if step:
+            stored_output = output.model_dump() if text_format else output
+            self.steps[step] = {'output': stored_output, 'latency': latency, 'model': response.model, 'resumed': False, **usage}
+            await self._save_checkpoint(step, stored_output, usage, latency, response.model)
+        return output, cost
+
+    async def _load_checkpoints(self) -> dict:
+        '''Checkpoints are an optimization: if they can't be read, the summary is generated from scratch.'''
+        try:
+            async with AsyncSessionLocal() as db:
+                return await self.checkpoints.load(db, self.entity_id, self.fingerprint)
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self._load_checkpoints.__name__}: {e}')
+            return {}
+
+    async def _save_checkpoint(self, step: str, output, usage: dict, latency: float, model: str):
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.checkpoints.save(db, self.entity_id, self.fingerprint, step, output, usage, latency, model)
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self._save_checkpoint.__name__}: {e}')
+
+    async def _clear_checkpoints(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.checkpoints.clear(db, self.entity_id, self.fingerprint)
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self._clear_checkpoints.__name__}: {e}')
     
+    async def _get_latest_summary(self, fingerprint: str | None = None) -> Summaries_Model | None:
+        '''Latest summary for the entity and source type, optionally only one generated from the review set with this fingerprint.'''
+        filters = {'entity_id': self.entity_id, 'source_type': self.source_type}
+        if fingerprint:
+            filters['fingerprint'] = fingerprint
+        try:
+            async with AsyncSessionLocal() as db:
+                return await self.async_db.get_latest(db, filters)
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self._get_latest_summary.__name__}: {e}')
+            raise e
+
+    def _new_reviews(self) -> list[str] | None:
+        '''
+            Reviews added since self.previous_summary, or None when the summary should be regenerated from scratch:
+            no previous summary, nothing new, reviews removed (their content is baked into the previous summary),
+            or more than max_churn of the reviews are new.
+        '''
+        previous = getattr(self, 'previous_summary', None)
+        if previous is None:
+            return None
+        previous_ids = set(previous.sources or [])
+        current_ids = set(self.source_ids)
+        if previous_ids - current_ids:
+            return None
+        new_reviews = [review for source_id, review in zip(self.source_ids, self.source_reviews) if source_id not in previous_ids]
+        if not new_reviews or len(new_reviews) / len(self.source_reviews) > SUMMARY_CONFIG['incremental']['max_churn']:
+            return None
+        return new_reviews
+
     @track_latency
     async def _generate_summary(self):
+        new_reviews = self._new_reviews()
+        if new_reviews:
+            # The incremental prompt carries the previous summary and every new review, it gets the same limit as a full run
+            update_tokens = estimate_tokens(self.previous_summary.summary or '') + sum(estimate_tokens(review) for review in new_reviews)
+            if (update_tokens <= SUMMARY_CONFIG['map']['threshold_tokens']):
+                logfire.info(f'Updating summary {self.previous_summary.id} for supplier: {self.entity_id} with {len(new_reviews)} new reviews')
+                return await self._generate_summary_incremental(new_reviews)
+            logfire.info(f'Update of summary {self.previous_summary.id} for supplier: {self.entity_id} is ~{update_tokens} tokens, regenerating it')
+        review_tokens = sum(estimate_tokens(review) for review in self.source_reviews)
+        if (review_tokens > SUMMARY_CONFIG['map']['threshold_tokens']):
+            logfire.info(f'Reviews for supplier: {self.entity_id} are ~{review_tokens} tokens, using map-reduce')
+            return await self._generate_summary_map_reduce()
+        if (SUMMARY_PIPELINE == Summary_Pipeline.SINGLE_CALL):
+            return await self._generate_summary_single_call()
+        return await self._generate_summary_multi_step(shared_prefix = SUMMARY_PIPELINE == Summary_Pipeline.SHARED_PREFIX)
+
+    async def _generate_summary_multi_step(self, shared_prefix: bool = False):
+        # With a shared prefix the reviews are already in the prefix, so the user message only carries the step-specific input
+        reviews_message = 'Use the reviews above.' if shared_prefix else f'Hotel name: {self.entity_name}, reviews: {self.source_reviews}'
+
         async def _generate_summary_content():
             try:
                 response_step_1, cost_step_1 = await self._response(
                     SUMMARY_CONFIG['step_1']['model'],
                     SUMMARY_CONFIG['step_1']['system_message'], 
-                    f'Hotel name: {self.entity_name}, reviews: {self.source_reviews}'
+                    reviews_message,
+                    shared_prefix,
+                    fallback_models = SUMMARY_CONFIG['step_1']['fallback_models'],
+                    step = 'multi_step.step_1'
                 )
                 response_step_2, cost_step_2 = await self._response(
                     SUMMARY_CONFIG['step_2']['model'],
                     SUMMARY_CONFIG['step_2']['system_message'], 
-                    f'Hotel name: {self.entity_name}, reviews: {self.source_reviews}, summary: {response_step_1}'
+                    f'Summary: {response_step_1}' if shared_prefix else f'{reviews_message}, summary: {response_step_1}',
+                    shared_prefix,
+                    fallback_models = SUMMARY_CONFIG['step_2']['fallback_models'],
+                    step = 'multi_step.step_2'
                 )
                 return response_step_2, cost_step_1 + cost_step_2
             except Exception as e:
@@ -102,14 +274,20 @@ class Summaries:
                 positive_tags_task = self._response_structured_output(
                     SUMMARY_CONFIG['positive_tags']['model'],
                     SUMMARY_CONFIG['positive_tags']['system_message'],
-                    f'Hotel name: {self.entity_name}, reviews: {self.source_reviews}',
-                    Tags
+                    reviews_message,
+                    Tags,
+                    shared_prefix,
+                    fallback_models = SUMMARY_CONFIG['positive_tags']['fallback_models'],
+                    step = 'multi_step.positive_tags'
                 )
                 negative_tags_task = self._response_structured_output(
                     SUMMARY_CONFIG['negative_tags']['model'],
                     SUMMARY_CONFIG['negative_tags']['system_message'],
-                    f'Hotel name: {self.entity_name}, reviews: {self.source_reviews}',
-                    Tags
+                    reviews_message,
+                    Tags,
+                    shared_prefix,
+                    fallback_models = SUMMARY_CONFIG['negative_tags']['fallback_models'],
+                    step = 'multi_step.negative_tags'
                 )
                 (positive_tags, cost_positive), (negative_tags, cost_negative) = await asyncio.gather(
                     positive_tags_task,
@@ -119,7 +297,9 @@ class Summaries:
                     SUMMARY_CONFIG['tags']['model'],
                     SUMMARY_CONFIG['tags']['system_message'],
                     f'Positive tags: {positive_tags.tags}, Negative tags: {negative_tags.tags}',
-                    All_Tags
+                    All_Tags,
+                    fallback_models = SUMMARY_CONFIG['tags']['fallback_models'],
+                    step = 'multi_step.tags'
                 )
                 return combined_tags, cost_positive + cost_negative + cost_combined
             except Exception as e:
@@ -144,51 +324,154 @@ class Summaries:
             logfire.error(f'Error in {self.__class__.__name__}.{self._generate_summary.__name__}: {e}')
             raise e
 
+    async def _generate_summary_single_call(self):
+        try:
+            result, cost = await self._response_structured_output(
+                SUMMARY_CONFIG['single_call']['model'],
+                SUMMARY_CONFIG['single_call']['system_message'],
+                'Use the reviews above.',
+                Summary_With_Tags,
+                shared_prefix = True,
+                fallback_models = SUMMARY_CONFIG['single_call']['fallback_models'],
+                step = 'single_call'
+            )
+            return {
+                'summary': result.summary,
+                'positive_tags': result.positive_tags,
+                'negative_tags': result.negative_tags,
+                'cost': round(cost, 4)
+            }
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self._generate_summary_single_call.__name__}: {e}')
+            raise e
+
+    async def _generate_summary_map_reduce(self):
+        '''
+            For review sets too large for a single prompt.
+            Map: the reviews are split into chunks of ~chunk_tokens, and each chunk is summarized (with tags) concurrently,
+            at most max_concurrency calls at a time.
+            Reduce: the partial summaries are combined into the final summary, and the partial tags are merged with the tags step.
+        '''
+        chunks = chunk_reviews(self.source_reviews, SUMMARY_CONFIG['map']['chunk_tokens'])
+        semaphore = asyncio.Semaphore(SUMMARY_CONFIG['map']['max_concurrency'])
+
+        async def _map_chunk(index: int, chunk: list[str]):
+            async with semaphore:
+                return await self._response_structured_output(
+                    SUMMARY_CONFIG['map']['model'],
+                    SUMMARY_CONFIG['map']['system_message'],
+                    f'Hotel name: {self.entity_name}\nReviews:\n{format_reviews(chunk)}',
+                    Summary_With_Tags,
+                    fallback_models = SUMMARY_CONFIG['map']['fallback_models'],
+                    step = f'map_reduce.map.{index}'
+                )
+        try:
+            logfire.info(f'Map step for supplier: {self.entity_id} over {len(chunks)} chunks')
+            partials = await asyncio.gather(*(_map_chunk(index, chunk) for index, chunk in enumerate(chunks)))
+            map_cost = sum(cost for _, cost in partials)
+
+            summary_task = self._response(
+                SUMMARY_CONFIG['reduce']['model'],
+                SUMMARY_CONFIG['reduce']['system_message'],
+                f'Hotel name: {self.entity_name}\nPartial summaries:\n{format_reviews([partial.summary for partial, _ in partials])}',
+                fallback_models = SUMMARY_CONFIG['reduce']['fallback_models'],
+                step = 'map_reduce.reduce'
+            )
+            tags_task = self._response_structured_output(
+                SUMMARY_CONFIG['tags']['model'],
+                SUMMARY_CONFIG['tags']['system_message'],
+                f'Positive tags: {[tag for partial, _ in partials for tag in partial.positive_tags]}, '
+                f'Negative tags: {[tag for partial, _ in partials for tag in partial.negative_tags]}',
+                All_Tags,
+                fallback_models = SUMMARY_CONFIG['tags']['fallback_models'],
+                step = 'map_reduce.tags'
+            )
+            (summary, summary_cost), (tags, tags_cost) = await asyncio.gather(summary_task, tags_task)
+
+            return {
+                'summary': summary,
+                'positive_tags': tags.positive_tags,
+                'negative_tags': tags.negative_tags,
+                'cost': round(map_cost + summary_cost + tags_cost, 4)
+            }
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self._generate_summary_map_reduce.__name__}: {e}')
+            raise e
+
+    async def _generate_summary_incremental(self, new_reviews: list[str]):
+        previous = self.previous_summary
+        try:
+            result, cost = await self._response_structured_output(
+                SUMMARY_CONFIG['incremental']['model'],
+                SUMMARY_CONFIG['incremental']['system_message'],
+                f'Hotel name: {self.entity_name}\n'
+                f'Current summary (from {len(self.source_reviews) - len(new_reviews)} reviews): {previous.summary}\n'
+                f'Current positive tags: {previous.positive_tags}, Current negative tags: {previous.negative_tags}\n'
+                f'New reviews ({len(new_reviews)}):\n{format_reviews(new_reviews)}',
+                Summary_With_Tags,
+                fallback_models = SUMMARY_CONFIG['incremental']['fallback_models'],
+                step = f'incremental.{previous.id}'
+            )
+            return {
+                'summary': result.summary,
+                'positive_tags': result.positive_tags,
+                'negative_tags': result.negative_tags,
+                'cost': round(cost, 4),
+                'updated_from': str(previous.id)
+            }
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self._generate_summary_incremental.__name__}: {e}')
+            raise e
+
     async def _write_summary_to_ai_schema(self, entity_id: str, source_type: Source_Type, sources: list[str], summary: dict, latency: float) -> str:
         try:
-            with next(get_db()) as db:
-                stored_content = self.db.create(db, {
+            async with AsyncSessionLocal() as db:
+                stored_content = await self.async_db.add(db, {
                     'entity_id': entity_id,
                     'source_type': source_type.value,
                     'sources': sources,
                     'summary': summary['summary'],
                     'positive_tags': summary['positive_tags'],
                     'negative_tags': summary['negative_tags'],
+                    'fingerprint': getattr(self, 'fingerprint', None),
                     'content_metadata': {
                         'logfire_session_id': self.SESSION_ID,
                         'cost': summary['cost'],
-                        'latency': latency
+                        'latency': latency,
+                        'models': sorted(self.models_used),
+                        # The outputs stay in ai.summary_checkpoints until cleared, map partials would make this row huge
+                        'steps': {step: {'cost': details['cost'], 'latency': details['latency'], 'model': details['model']} for step, details in self.steps.items()},
+                        # Tokens and cost over every step (resumed ones included), see UsageTracker.track_response
+                        'usage': sum_usage(list(self.steps.values())),
+                        **({'updated_from': summary['updated_from']} if 'updated_from' in summary else {})
                     }
                 })
+                await self.outbox.add(db, stored_content.id, entity_id, source_type, self._public_schema_payload(entity_id, summary))
+                await db.commit()
                 logfire.info(f'Successfully wrote summary for supplier: {entity_id} to ai schema. Summary ID: {stored_content.id}')
                 return str(stored_content.id)
         except Exception as e:
             logfire.error(f'Error in {self.__class__.__name__}.{self._write_summary_to_ai_schema.__name__}: {e}')
             raise e
 
-    async def _write_summary_to_public_schema(self, entity_id: str, summary: dict):
+    async def _republish_summary(self, summary: Summaries_Model):
+        '''Publishes a stored summary again through the outbox, like a newly written one (see core/summaries/dispatcher.py).'''
         try:
-            payload = {
-                'supplier_id': str(entity_id),
-                'summary': summary['summary'],
-                'positive_tags': summary['positive_tags'],
-                'negative_tags': summary['negative_tags']
-            }
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url = get_backend_write_endpoint(entity_id, self.source_type),
-                    json = payload,
-                    headers = {
-                        'Content-Type': 'application/json',
-                        'XAPIKEY': os.environ.get("FORA_PORTAL_BE_API_KEY")
-                    },
-                    timeout = aiohttp.ClientTimeout(total = 30)
-                ) as response:
-                    response.raise_for_status()
-                    logfire.info(f'Successfully wrote summary for supplier: {entity_id} to public schema. Status: {response.status}')
-        except KeyError as e:
-            logfire.error(f'Invalid source type {self.source_type} in {self.__class__.__name__}.{self._write_summary_to_public_schema.__name__}: {e}')
-            raise e
+            async with AsyncSessionLocal() as db:
+                record = await self.outbox.enqueue(db, summary.id, self.entity_id, self.source_type, self._public_schema_payload(self.entity_id, {
+                    'summary': summary.summary,
+                    'positive_tags': summary.positive_tags,
+                    'negative_tags': summary.negative_tags
+                }))
+            logfire.info(f'Queued summary {summary.id} for supplier: {self.entity_id} for publishing. Outbox record ID: {record.id}')
         except Exception as e:
-            logfire.error(f'Error in {self.__class__.__name__}.{self._write_summary_to_public_schema.__name__}: {e}')
+            logfire.error(f'Error in {self.__class__.__name__}.{self._republish_summary.__name__}: {e}')
             raise e
+
+    def _public_schema_payload(self, entity_id: str, summary: dict) -> dict:
+        return {
+            'supplier_id': str(entity_id),
+            'summary': summary['summary'],
+            'positive_tags': summary['positive_tags'],
+            'negative_tags': summary['negative_tags']
+        }
@@ -13,6 +13,17 @@ class Source_Type(Enum):
     ADVISOR_REVIEWS = 'advisor_reviews'
     ADVISOR_BRAND_REVIEWS = 'advisor_brand_reviews'
 
+class Summary_Pipeline(Enum):
+    MULTI_STEP = 'multi_step'          # Each step gets its own system message followed by the reviews
+    SHARED_PREFIX = 'shared_prefix'    # Same steps, but every call starts with the identical reviews prefix so provider prompt caching applies
+    SINGLE_CALL = 'single_call'        # One structured-output call returns the summary and both tag lists
+
+class Job_Status(Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
 class Summary(BaseModel):
     summary: str = Field(description = 'The summary')
     tags: List[str] = Field(default_factory = list, description = 'List of tags for the summary')
@@ -23,3 +34,8 @@ class Tags(BaseModel):
 class All_Tags(BaseModel):
     positive_tags: List[str] = Field(default_factory = list, description = 'List of positive tags for the summary')
     negative_tags: List[str] = Field(default_factory = list, description = 'List of negative tags for the summary')
+
+class Summary_With_Tags(BaseModel):
+    summary: str = Field(description = 'The summary')
+    positive_tags: List[str] = Field(default_factory = list, description = 'List of positive tags for the summary')
+    negative_tags: List[str] = Field(default_factory = list, description = 'List of negative tags for the summary')
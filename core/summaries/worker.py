@@ -0,0 +1,173 @@
+'''
+    Worker process that drains the summaries job queue (ai.summary_jobs).
+    Run it with `python -m core.summaries.worker` (or `entrypoint.sh worker` in Docker).
+    At most SUMMARY_WORKER_CONCURRENCY jobs run at once; failed jobs are retried with backoff by the queue.
+    The process also runs the outbox dispatcher, which publishes the generated summaries to the public schema.
+    Checkpoints of jobs that failed for good are cleared, and ones left behind are swept after SUMMARY_CHECKPOINT_TTL_SECONDS.
+    Its LLM calls are limited to SUMMARY_WORKER_LLM_RATE_LIMIT_SHARE of the account limits, the rest is left to the API.
+    Its metrics are served on GET /metrics at SUMMARY_WORKER_METRICS_PORT, with the API's key.
+'''
+import os
+import time
+import signal
+import asyncio
+import logfire
+from aiohttp import web
+
+from db import AsyncSessionLocal
+from utils import create_http_session
+from utils.metrics import REGISTRY
+from llms.rate_limiter import RateLimiter, set_rate_limiter
+from core.summaries.summaries import Summaries
+from core.summaries.jobs import Summary_Job_Queue
+from core.summaries.helper import fingerprint_sources
+from core.summaries.checkpoints import Summary_Checkpoints
+from core.summaries.publisher import Summary_Publisher
+from core.summaries.dispatcher import Summary_Outbox_Dispatcher
+from core.summaries.types import Job_Status
+from core.summaries.models import Summary_Jobs
+from core.summaries.serializers import Summaries_Request
+from settings import (
+    API_KEY, SUMMARY_WORKER_METRICS_PORT, SUMMARY_WORKER_CONCURRENCY, SUMMARY_WORKER_POLL_INTERVAL_SECONDS, SUMMARY_PUBLISH_BATCHED, SUMMARY_WORKER_LLM_RATE_LIMIT_SHARE,
+    SUMMARY_CHECKPOINT_TTL_SECONDS, SUMMARY_CHECKPOINT_SWEEP_INTERVAL_SECONDS
+)
+
+class Summary_Worker:
+    def __init__(
+        self,
+        concurrency: int = SUMMARY_WORKER_CONCURRENCY,
+        poll_interval: float = SUMMARY_WORKER_POLL_INTERVAL_SECONDS
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.queue = Summary_Job_Queue()
+        self.checkpoints = Summary_Checkpoints()
+        self._next_sweep = time.monotonic()
+        self.running: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        '''Stop claiming new jobs; run() returns once in-flight jobs have finished.'''
+        self._stopping.set()
+
+    async def run(self):
+        logfire.info(f'Summaries worker started with concurrency {self.concurrency}')
+        while not self._stopping.is_set():
+            if time.monotonic() >= self._next_sweep:
+                await self.sweep_checkpoints()
+            free_slots = self.concurrency - len(self.running)
+            jobs = []
+            if free_slots > 0:
+                try:
+                    async with AsyncSessionLocal() as db:
+                        jobs = await self.queue.claim(db, free_slots)
+                except Exception as e:
+                    logfire.error(f'Error in {self.__class__.__name__}.{self.run.__name__} claiming jobs: {e}')
+
+            for job in jobs:
+                task = asyncio.create_task(self.run_job(job))
+                self.running.add(task)
+                task.add_done_callback(self.running.discard)
+
+            if not jobs or len(self.running) >= self.concurrency:
+                await self._wait_for_work()
+
+        if self.running:
+            await asyncio.gather(*self.running, return_exceptions = True)
+        logfire.info('Summaries worker stopped')
+
+    async def _wait_for_work(self):
+        '''Sleep until the poll interval elapses, a running job finishes or stop() is called.'''
+        waiters = [asyncio.create_task(self._stopping.wait()), *self.running]
+        try:
+            await asyncio.wait(waiters, timeout = self.poll_interval, return_when = asyncio.FIRST_COMPLETED)
+        finally:
+            waiters[0].cancel()
+
+    async def run_job(self, job: Summary_Jobs) -> Job_Status:
+        try:
+            request = Summaries_Request.model_validate(job.request)
+            summary_id = await Summaries().generate(request)
+            async with AsyncSessionLocal() as db:
+                await self.queue.mark_succeeded(db, job, summary_id)
+            logfire.info(f'Summary job {job.id} for supplier: {job.entity_id} succeeded on attempt {job.attempts}')
+            return Job_Status.SUCCEEDED
+        except Exception as e:
+            logfire.error(f'Summary job {job.id} for supplier: {job.entity_id} failed on attempt {job.attempts}: {e}')
+            try:
+                async with AsyncSessionLocal() as db:
+                    status = await self.queue.mark_failed(db, job, str(e))
+                if status == Job_Status.FAILED:
+                    await self.clear_checkpoints(job)
+                return status
+            except Exception as db_error:
+                # The job keeps its lock and is reclaimed once the lock times out
+                logfire.error(f'Error in {self.__class__.__name__}.{self.run_job.__name__} recording failure of job {job.id}: {db_error}')
+                return Job_Status.RUNNING
+
+    async def clear_checkpoints(self, job: Summary_Jobs):
+        '''A job that won't be retried has no use for its checkpoints.'''
+        try:
+            request = Summaries_Request.model_validate(job.request)
+            async with AsyncSessionLocal() as db:
+                await self.checkpoints.clear(db, request.entity_id, fingerprint_sources(request.sources))
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self.clear_checkpoints.__name__} for job {job.id}: {e}')
+
+    async def sweep_checkpoints(self):
+        '''Deletes checkpoints older than SUMMARY_CHECKPOINT_TTL_SECONDS: abandoned jobs and clears that failed.'''
+        self._next_sweep = time.monotonic() + SUMMARY_CHECKPOINT_SWEEP_INTERVAL_SECONDS
+        try:
+            async with AsyncSessionLocal() as db:
+                deleted = await self.checkpoints.clear_expired(db, SUMMARY_CHECKPOINT_TTL_SECONDS)
+            if deleted:
+                logfire.info(f'Deleted {deleted} expired summary checkpoints')
+        except Exception as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self.sweep_checkpoints.__name__}: {e}')
+
+async def run_until_signalled(*services):
+    '''Runs the services (anything with run() and stop()) until they return; SIGINT or SIGTERM stops every one of them.'''
+    loop = asyncio.get_running_loop()
+    signals = (signal.SIGINT, signal.SIGTERM)
+    # One handler per signal: registering another for the same signal replaces the first
+    for sig in signals:
+        loop.add_signal_handler(sig, lambda: [service.stop() for service in services])
+    try:
+        await asyncio.gather(*(service.run() for service in services))
+    finally:
+        for sig in signals:
+            loop.remove_signal_handler(sig)
+
+async def serve_metrics(port: int = SUMMARY_WORKER_METRICS_PORT) -> web.AppRunner:
+    '''Serves the process' metrics like the API's GET /metrics, on their own port since the worker has no API. Returns the runner to clean up.'''
+    async def metrics(request: web.Request) -> web.Response:
+        if request.headers.get('Authorization') != f'Bearer {API_KEY}':
+            return web.json_response({'detail': 'Invalid API key'}, status = 401)
+        return web.Response(body = REGISTRY.render().encode(), headers = {'Content-Type': 'text/plain; version=0.0.4'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics)
+    runner = web.AppRunner(app, access_log = None)
+    await runner.setup()
+    await web.TCPSite(runner, port = port).start()
+    logfire.info(f'Summaries worker metrics served on port {port}')
+    return runner
+
+async def main():
+    logfire.configure(token = os.environ.get('LOGFIRE_API_KEY'), service_name = 'summaries-worker')
+    set_rate_limiter(RateLimiter(share = SUMMARY_WORKER_LLM_RATE_LIMIT_SHARE))
+    metrics_runner = await serve_metrics() if SUMMARY_WORKER_METRICS_PORT else None
+    try:
+        async with create_http_session() as http_session:
+            publisher = Summary_Publisher(http_session) if SUMMARY_PUBLISH_BATCHED else None
+            worker = Summary_Worker()
+            dispatcher = Summary_Outbox_Dispatcher(http_session = http_session, publisher = publisher)
+            await run_until_signalled(worker, dispatcher)
+            if publisher:
+                await publisher.close()
+    finally:
+        if metrics_runner:
+            await metrics_runner.cleanup()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -3,13 +3,16 @@
     This package contains all database-related operations and utilities.
 '''
 
-from .base import Base, get_db, DATABASE_URL
-from .base_operations import BaseDBOperations
+from .base import Base, get_db, get_async_db, DATABASE_URL, AsyncSessionLocal
+from .base_operations import BaseDBOperations, AsyncBaseDBOperations
 
 
 __all__ = [
     'Base',
     'get_db',
+    'get_async_db',
     'DATABASE_URL',
+    'AsyncSessionLocal',
     'BaseDBOperations',
+    'AsyncBaseDBOperations',
 ]
@@ -5,6 +5,7 @@ import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from settings import (
     DB_USER, DB_PASSWORD, DB_HOST, 
     DB_PORT, DB
@@ -16,6 +17,10 @@ DATABASE_URL = (
     f'postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB}'
 )
 
+ASYNC_DATABASE_URL = (
+    f'postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB}'
+)
+
 '''
     Database Configuration Parameters:
 
@@ -30,6 +35,11 @@ DATABASE_URL = (
     autocommit=False:
     - Forces us to use explicit transactions (this means changes are only commited when you call db.commit())
     - Also allows for rolling back changes if errors occur during processing
+
+    expire_on_commit=False (async only):
+    - Keeps attribute values loaded after commit
+    - Without it, reading e.g. `stored_content.id` after a commit would trigger an implicit
+      refresh, which is not allowed outside of an awaited call in an AsyncSession
 '''
 
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
@@ -37,9 +47,20 @@ SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 Base = declarative_base()
 
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    '''
+        Async counterpart of get_db, for use as a FastAPI dependency in async routes.
+        Queries and commits are awaited on asyncpg, so they never block the event loop.
+    '''
+    async with AsyncSessionLocal() as db:
+        yield db
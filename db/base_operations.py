@@ -3,7 +3,9 @@
     This class provides basic database operations (CRUD) that can be used with any model.
 '''
 from typing import Generic, TypeVar, Type, Optional, List
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .base import Base
 
 # This tells Python that ModelType must be a class that inherits from Base
@@ -117,3 +119,161 @@ class BaseDBOperations(Generic[ModelType]):
             db.commit()
             return True
         return False
+
+
+class AsyncBaseDBOperations(Generic[ModelType]):
+    '''
+        Async variant of BaseDBOperations, for use with an AsyncSession (see get_async_db).
+        Every method is a coroutine, so database round-trips don't block the event loop.
+
+        Example usage:
+        ```python
+        user_ops = AsyncBaseDBOperations(User)
+        new_user = await user_ops.create(db, {'name': 'John'})
+        ```
+    '''
+
+    def __init__(self, model: Type[ModelType]):
+        '''
+            Initialize with the model class you want to work with.
+
+            Args:
+                model: The SQLAlchemy model class (must inherit from Base)
+        '''
+        self.model = model
+
+    async def get(self, db: AsyncSession, id: str) -> Optional[ModelType]:
+        '''
+            Get a single record by its ID.
+
+            Args:
+                db: Async database session
+                id: The ID of the record to find
+
+            Returns:
+                The found record or None if not found
+        '''
+        result = await db.execute(select(self.model).filter(self.model.id == id))
+        return result.scalars().first()
+
+    async def get_all(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[ModelType]:
+        '''
+            Get multiple records with pagination.
+
+            Args:
+                db: Async database session
+                skip: Number of records to skip (for pagination)
+                limit: Maximum number of records to return
+
+            Returns:
+                List of records
+        '''
+        result = await db.execute(select(self.model).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def get_latest(self, db: AsyncSession, filters: dict) -> Optional[ModelType]:
+        '''
+            Get the most recently created record matching the filters.
+            The model must have a created_at column.
+
+            Args:
+                db: Async database session
+                filters: Column name to value, all must match
+                
+            Returns:
+                The latest record or None if nothing matches
+        '''
+        result = await db.execute(
+            select(self.model).filter_by(**filters).order_by(self.model.created_at.desc()).limit(1)
+        )
+        return result.scalars().first()
+
+    async def create(self, db: AsyncSession, data: dict) -> ModelType:
+        '''
+            Create a new record in the database.
+
+            Args:
+                db: Async database session
+                data: Dictionary containing the data for the new record
+
+            Returns:
+                The newly created record
+        '''
+        db_obj = self.model(**data)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def add(self, db: AsyncSession, data: dict) -> ModelType:
+        '''
+            Add a new record without committing it, so the caller can commit it together with other writes in one transaction.
+            The record is flushed, so its defaults (e.g. the id) are set.
+
+            Args:
+                db: Async database session
+                data: Dictionary containing the data for the new record
+
+            Returns:
+                The newly added record
+        '''
+        db_obj = self.model(**data)
+        db.add(db_obj)
+        await db.flush()
+        return db_obj
+
+    async def create_many(self, db: AsyncSession, data: List[dict]) -> List[ModelType]:
+        '''
+            Create several records in a single transaction.
+            SQLAlchemy batches the INSERTs into one multi-row statement, so this costs one round-trip and one commit.
+            Records are not refreshed, so only client-side values (e.g. the default id) are populated, not server defaults.
+
+            Args:
+                db: Async database session
+                data: List of dictionaries, one per record
+
+            Returns:
+                The newly created records, in the same order as data
+        '''
+        db_objs = [self.model(**item) for item in data]
+        db.add_all(db_objs)
+        await db.commit()
+        return db_objs
+
+    async def update(self, db: AsyncSession, id: str, data: dict) -> Optional[ModelType]:
+        '''
+            Update an existing record.
+
+            Args:
+                db: Async database session
+                id: ID of the record to update
+                data: Dictionary containing the new data
+
+            Returns:
+                The updated record or None if not found
+        '''
+        db_obj = await self.get(db, id)
+        if db_obj:
+            for key, value in data.items():
+                setattr(db_obj, key, value)
+            await db.commit()
+            await db.refresh(db_obj)
+        return db_obj
+
+    async def delete(self, db: AsyncSession, id: str) -> bool:
+        '''
+            Delete a record from the database.
+
+            Args:
+                db: Async database session
+                id: ID of the record to delete
+
+            Returns:
+                True if the record was deleted, False if not found
+        '''
+        db_obj = await self.get(db, id)
+        if db_obj:
+            await db.delete(db_obj)
+            await db.commit()
+            return True
+        return False
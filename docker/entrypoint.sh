@@ -6,9 +6,18 @@ case "$1" in
     uvicorn)
         uvicorn app.main:app --host 0.0.0.0 --port 8000
         ;;
+    worker)
+        # Drains the summaries job queue (ai.summary_jobs), serves GET /metrics on SUMMARY_WORKER_METRICS_PORT
+        python -m core.summaries.worker
+        ;;
+    partitions)
+        # Creates upcoming monthly partitions of ai.content_enrichment_response and detaches expired ones (cron)
+        python -m core.content_enrichment.partitions
+        ;;
     upgrade)
         # Entrypoint used for upgrades in Kubernetes
         echo "Run upgrade commands"
         alembic upgrade head
+        python -m core.content_enrichment.partitions --no-detach
         ;;
 esac
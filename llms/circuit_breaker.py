@@ -0,0 +1,88 @@
+'''
+    Per-model circuit breaker.
+    Every call's outcome and latency is kept in a rolling window. When enough of the window failed, or was slower than
+    LLM_BREAKER_SLOW_CALL_SECONDS, the circuit opens and the model is skipped (the next model of the fallback chain is used)
+    for LLM_BREAKER_COOLDOWN_SECONDS. After that a single probe call is let through: success closes the circuit, failure re-opens it.
+'''
+import time
+from enum import Enum
+from collections import deque
+
+from settings import (
+    LLM_BREAKER_WINDOW_SIZE, LLM_BREAKER_MIN_CALLS, LLM_BREAKER_FAILURE_RATE,
+    LLM_BREAKER_SLOW_CALL_SECONDS, LLM_BREAKER_SLOW_CALL_RATE, LLM_BREAKER_COOLDOWN_SECONDS
+)
+
+class CircuitState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window_size: int = LLM_BREAKER_WINDOW_SIZE,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        failure_rate: float = LLM_BREAKER_FAILURE_RATE,
+        slow_call_seconds: float = LLM_BREAKER_SLOW_CALL_SECONDS,
+        slow_call_rate: float = LLM_BREAKER_SLOW_CALL_RATE,
+        cooldown_seconds: float = LLM_BREAKER_COOLDOWN_SECONDS
+    ):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.outcomes: deque[tuple[bool, float]] = deque(maxlen = window_size)  # (succeeded, latency seconds)
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        '''Whether a call may be sent to this model now.'''
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            self.state = CircuitState.HALF_OPEN
+            self._probing = False
+        if self.state == CircuitState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, succeeded: bool, latency: float) -> None:
+        if self.state == CircuitState.HALF_OPEN:
+            if succeeded and latency < self.slow_call_seconds:
+                self.state = CircuitState.CLOSED
+                self.outcomes.clear()
+            else:
+                self._open()
+            return
+        self.outcomes.append((succeeded, latency))
+        if self.state == CircuitState.CLOSED and self._unhealthy():
+            self._open()
+
+    def release(self) -> None:
+        '''The call allowed by allow() ended without an outcome (it was cancelled), so a half-open circuit can probe again.'''
+        if self.state == CircuitState.HALF_OPEN:
+            self._probing = False
+
+    def _unhealthy(self) -> bool:
+        calls = len(self.outcomes)
+        if calls < self.min_calls:
+            return False
+        failures = sum(1 for succeeded, _ in self.outcomes if not succeeded)
+        slow_calls = sum(1 for _, latency in self.outcomes if latency >= self.slow_call_seconds)
+        return failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate
+
+    def _open(self):
+        self.state = CircuitState.OPEN
+        self.opened_at = time.monotonic()
+        self._probing = False
+
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+
+def get_circuit_breaker(model: str) -> CircuitBreaker:
+    if model not in _circuit_breakers:
+        _circuit_breakers[model] = CircuitBreaker()
+    return _circuit_breakers[model]
@@ -1,19 +1,214 @@
+import time
+
+import logfire
+import openai
 from dotenv import load_dotenv
-from openai import OpenAI, AsyncOpenAI
+
+from settings import LLM_PROVIDER
+from llms.providers import get_provider
+from utils.latency_tracker import StageTimer, get_latency_window
+from utils.metrics import LLM_REQUEST_DURATION, LLM_REQUESTS_IN_FLIGHT
+from llms.retry import RetryPolicy, is_retryable
+from llms.circuit_breaker import get_circuit_breaker
+from llms.rate_limiter import Priority, get_rate_limiter, estimate_request_tokens
 
 load_dotenv()
 
-openai_client = OpenAI()
-openai_async_client = AsyncOpenAI()
+def should_fall_back(error: Exception) -> bool:
+    '''Errors that say the model is unavailable, rather than that the request is bad: another model may still answer.'''
+    return is_retryable(error) or isinstance(error, openai.NotFoundError)
 
 class LLMFetcher:
-    def __init__(self, provider, model = 'gpt-4.1-mini'):
+    def __init__(self, provider: str = LLM_PROVIDER, model = 'gpt-4.1-mini'):
         self.model = model
-        self._set_client(provider)
-
-    def _set_client(self, provider):
-        if (provider == 'openai'):
-            self.client = openai_client
-            self.async_client = openai_async_client
-        else:
-            raise Exception(detail = 'You must pass \'openai\' as a provider.')
+        self.limiter = get_rate_limiter()
+        self.retry_policy = RetryPolicy()
+        self.provider = get_provider(provider)
+        # Set only to replace the provider's client for this fetcher
+        self._client = None
+        self._async_client = None
+
+    @property
+    def client(self):
+        '''The provider's client, created on first use (see llms/providers.py).'''
+        return self._client or self.provider.client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @property
+    def async_client(self):
+        return self._async_client or self.provider.async_client
+
+    @async_client.setter
+    def async_client(self, async_client):
+        self._async_client = async_client
+
+    async def create_response(
+        self,
+        priority: Priority = Priority.BACKGROUND,
+        deadline: float | None = None,
+        fallback_models: list[str] = (),
+        timer: StageTimer | None = None,
+        **kwargs
+    ):
+        '''
+            responses.create through the shared rate limiter, retried on transient errors.
+            deadline: absolute time.monotonic() the call (waiting and retries included) must finish by, see llms.retry.deadline_in
+            fallback_models: tried in order when kwargs['model'] fails or its circuit is open, see _with_fallback
+            timer: if given, time spent waiting on the rate limiter is added to its llm_queue stage, and time in model calls to its llm stage
+            kwargs are passed to the API as is; response.model is the model that actually answered.
+        '''
+        return await self._with_fallback(
+            lambda request: self.async_client.responses.create(**request), priority, deadline, fallback_models, timer, kwargs
+        )
+
+    async def parse_response(
+        self,
+        priority: Priority = Priority.BACKGROUND,
+        deadline: float | None = None,
+        fallback_models: list[str] = (),
+        timer: StageTimer | None = None,
+        **kwargs
+    ):
+        '''responses.parse (structured output) through the shared rate limiter, retried on transient errors, with fallback models.'''
+        return await self._with_fallback(
+            lambda request: self.async_client.responses.parse(**request), priority, deadline, fallback_models, timer, kwargs
+        )
+
+    async def stream_response(
+        self,
+        priority: Priority = Priority.BACKGROUND,
+        deadline: float | None = None,
+        fallback_models: list[str] = (),
+        timer: StageTimer | None = None,
+        **kwargs
+    ):
+        '''
+            Streaming responses.create; the limiter slot is held until the stream is exhausted or closed.
+            Only opening the stream is retried (and falls back), once text has been yielded a failure is final.
+            timer: as for create_response; the time to the first text delta is also added to its llm_ttft stage.
+        '''
+        last_error = None
+        for model in self._model_chain(kwargs['model'], fallback_models):
+            request = {**kwargs, 'model': model}
+            breaker = get_circuit_breaker(model)
+            queued_at = time.monotonic()
+            async with self.limiter.acquire(model, estimate_request_tokens(request), priority) as lease:
+                start_time = time.monotonic()
+                if timer:
+                    timer.add('llm_queue', start_time - queued_at)
+                try:
+                    stream = await self.retry_policy.call(
+                        lambda: self.async_client.responses.create(stream = True, **request),
+                        deadline
+                    )
+                except Exception as e:
+                    breaker.record(not should_fall_back(e), time.monotonic() - start_time)
+                    LLM_REQUEST_DURATION.observe(time.monotonic() - start_time, model = model, outcome = 'error')
+                    if not should_fall_back(e):
+                        raise
+                    logfire.warn(f'{model} failed to open a stream, falling back: {e}')
+                    last_error = e
+                    continue
+                except BaseException:
+                    breaker.release()
+                    raise
+                breaker.record(True, time.monotonic() - start_time)
+                LLM_REQUESTS_IN_FLIGHT.inc(model = model)
+                first_token = True
+                try:
+                    async for event in stream:
+                        if event.type == 'response.output_text.delta' and first_token:
+                            if timer:
+                                timer.add('llm_ttft', time.monotonic() - start_time)
+                            first_token = False
+                        elif event.type == 'response.completed':
+                            lease.record_usage(event.response.usage)
+                        yield event
+                finally:
+                    LLM_REQUESTS_IN_FLIGHT.dec(model = model)
+                    # The whole stream, until the last event or until the consumer stopped reading
+                    LLM_REQUEST_DURATION.observe(time.monotonic() - start_time, model = model, outcome = 'stream')
+                    if timer:
+                        timer.add('llm', time.monotonic() - start_time)
+                return
+        raise last_error
+
+    async def _with_fallback(
+        self,
+        call,
+        priority: Priority,
+        deadline: float | None,
+        fallback_models: list[str],
+        timer: StageTimer | None,
+        kwargs: dict
+    ):
+        '''
+            call(request) with kwargs['model'], then each fallback model in turn while the error says the model is unavailable
+            (see should_fall_back). Each model gets the full retry policy, all of them share the one deadline.
+        '''
+        last_error = None
+        for model in self._model_chain(kwargs['model'], fallback_models):
+            request = {**kwargs, 'model': model}
+            try:
+                return await self.retry_policy.call(
+                    lambda: self._limited_call(lambda: call(request), priority, request, timer),
+                    deadline
+                )
+            except Exception as e:
+                if not should_fall_back(e):
+                    raise
+                logfire.warn(f'{model} failed, falling back: {e}')
+                last_error = e
+        raise last_error
+
+    def _model_chain(self, model: str, fallback_models: list[str]):
+        '''
+            Yields the models to try, in order, skipping those whose circuit is open.
+            Circuits are checked lazily, so a half-open model's single probe is only taken when that model is actually called.
+            When every circuit is open the primary model is tried anyway, rather than failing without a call.
+        '''
+        chain = list(dict.fromkeys([model, *fallback_models]))
+        tried = False
+        for candidate in chain:
+            if get_circuit_breaker(candidate).allow():
+                tried = True
+                yield candidate
+        if not tried:
+            logfire.warn(f'Every circuit is open for {chain}, trying {model} anyway')
+            yield model
+
+    async def _limited_call(self, call, priority: Priority, request: dict, timer: StageTimer | None = None):
+        breaker = get_circuit_breaker(request['model'])
+        queued_at = time.monotonic()
+        async with self.limiter.acquire(request['model'], estimate_request_tokens(request), priority) as lease:
+            # Latency is measured from when the call is sent, time queued in the limiter is not the model's fault
+            start_time = time.monotonic()
+            if timer:
+                timer.add('llm_queue', start_time - queued_at)
+            LLM_REQUESTS_IN_FLIGHT.inc(model = request['model'])
+            try:
+                response = await call()
+            except Exception as e:
+                # A bad request still means the model answered
+                breaker.record(not should_fall_back(e), time.monotonic() - start_time)
+                LLM_REQUEST_DURATION.observe(time.monotonic() - start_time, model = request['model'], outcome = 'error')
+                raise
+            except BaseException:
+                # Cancelled (deadline, hedging): says nothing about the model's health
+                breaker.release()
+                LLM_REQUEST_DURATION.observe(time.monotonic() - start_time, model = request['model'], outcome = 'cancelled')
+                raise
+            finally:
+                LLM_REQUESTS_IN_FLIGHT.dec(model = request['model'])
+                if timer:
+                    timer.add('llm', time.monotonic() - start_time)
+            latency = time.monotonic() - start_time
+            breaker.record(True, latency)
+            LLM_REQUEST_DURATION.observe(latency, model = request['model'], outcome = 'success')
+            # Hedge delays are taken from these, per model that answered (fallbacks included)
+            get_latency_window(request['model']).add(latency)
+            lease.record_usage(response.usage)
+            return response
@@ -0,0 +1,165 @@
+'''
+    Offline stand-in for the OpenAI Responses API.
+    The text is derived from a hash of the request, so the same request always gets the same answer, and structured
+    output is filled in from the text_format's fields. Latency is sampled from FAKE_LLM_LATENCY_DISTRIBUTION with a
+    seeded generator, and usage is estimated from the request and output lengths, so cost tracking works as with the real API.
+'''
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import typing
+from types import SimpleNamespace
+
+from pydantic import BaseModel
+from openai.types.responses.response_usage import ResponseUsage, InputTokensDetails, OutputTokensDetails
+
+from llms.providers import Provider
+from settings import (
+    FAKE_LLM_LATENCY_DISTRIBUTION, FAKE_LLM_LATENCY_SECONDS, FAKE_LLM_LATENCY_SPREAD,
+    FAKE_LLM_OUTPUT_TOKENS, FAKE_LLM_SEED
+)
+
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_WORDS = 5
+WORDS = (
+    'the stay was comfortable and the staff were friendly helpful attentive room clean quiet spacious view breakfast '
+    'location central walk beach pool spa service excellent value price slightly noisy dated small bathroom modern '
+    'lobby restaurant dinner quick check in late out recommend again family couple business trip'
+).split()
+
+class LatencyModel:
+    '''
+        Seconds a fake call takes.
+        constant: always `seconds`; uniform: seconds ± spread * seconds; lognormal: median `seconds`, sigma `spread` (a long tail, like the real API)
+    '''
+    def __init__(
+        self,
+        distribution: str = FAKE_LLM_LATENCY_DISTRIBUTION,
+        seconds: float = FAKE_LLM_LATENCY_SECONDS,
+        spread: float = FAKE_LLM_LATENCY_SPREAD,
+        seed: int = FAKE_LLM_SEED
+    ):
+        if distribution not in ('constant', 'uniform', 'lognormal'):
+            raise ValueError(f'Unknown latency distribution {distribution!r}')
+        self.distribution = distribution
+        self.seconds = seconds
+        self.spread = spread
+        self.random = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.distribution == 'constant' or self.seconds <= 0:
+            return self.seconds
+        if self.distribution == 'uniform':
+            return max(0.0, self.random.uniform(self.seconds * (1 - self.spread), self.seconds * (1 + self.spread)))
+        return self.random.lognormvariate(0, self.spread) * self.seconds
+
+def _request_seed(kwargs: dict) -> int:
+    key = repr((kwargs.get('model'), kwargs.get('instructions'), kwargs.get('input')))
+    return int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big')
+
+def _fake_text(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+def _fake_value(annotation, rng: random.Random, words: int):
+    '''A deterministic value for a pydantic field: text for strings, a few items for lists, recursing into models.'''
+    origin = typing.get_origin(annotation)
+    if origin in (list, typing.List):
+        (item,) = typing.get_args(annotation) or (str,)
+        return [_fake_value(item, rng, 2) for _ in range(rng.randint(2, 5))]
+    if origin is typing.Union:
+        return _fake_value(next(arg for arg in typing.get_args(annotation) if arg is not type(None)), rng, words)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _fake_parsed(annotation, rng, words)
+    if annotation is bool:
+        return rng.random() < 0.5
+    if annotation is int:
+        return rng.randint(0, 100)
+    if annotation is float:
+        return round(rng.random(), 3)
+    return _fake_text(rng, words)
+
+def _fake_parsed(text_format: type[BaseModel], rng: random.Random, words: int) -> BaseModel:
+    return text_format(**{
+        name: _fake_value(field.annotation, rng, words)
+        for name, field in text_format.model_fields.items()
+    })
+
+def _input_tokens(kwargs: dict) -> int:
+    return max(1, len(f"{kwargs.get('instructions') or ''}{kwargs.get('input') or ''}") // CHARS_PER_TOKEN)
+
+class FakeResponses:
+    def __init__(self, latency: LatencyModel, output_tokens: int):
+        self.latency = latency
+        self.output_tokens = output_tokens
+
+    def _build(self, kwargs: dict, text_format: type[BaseModel] | None = None) -> SimpleNamespace:
+        rng = random.Random(_request_seed(kwargs))
+        words = max(1, self.output_tokens * CHARS_PER_TOKEN // 6)
+        output_parsed = _fake_parsed(text_format, rng, words) if text_format else None
+        output_text = output_parsed.model_dump_json() if output_parsed else _fake_text(rng, words)
+        input_tokens = _input_tokens(kwargs)
+        output_tokens = max(1, len(output_text) // CHARS_PER_TOKEN)
+        return SimpleNamespace(
+            id = f'resp_fake_{uuid.uuid4().hex}',
+            model = kwargs['model'],
+            output_text = output_text,
+            output_parsed = output_parsed,
+            usage = ResponseUsage(
+                input_tokens = input_tokens,
+                input_tokens_details = InputTokensDetails(cached_tokens = 0),
+                output_tokens = output_tokens,
+                output_tokens_details = OutputTokensDetails(reasoning_tokens = 0),
+                total_tokens = input_tokens + output_tokens
+            )
+        )
+
+    async def create(self, stream: bool = False, **kwargs):
+        if stream:
+            return self._stream(kwargs)
+        await asyncio.sleep(self.latency.sample())
+        return self._build(kwargs)
+
+    async def parse(self, text_format: type[BaseModel], **kwargs):
+        await asyncio.sleep(self.latency.sample())
+        return self._build(kwargs, text_format)
+
+    async def _stream(self, kwargs: dict):
+        '''The sampled latency is spread evenly over the deltas, then response.completed carries the full response.'''
+        response = self._build(kwargs)
+        words = response.output_text.split(' ')
+        chunks = [' '.join(words[i:i + STREAM_CHUNK_WORDS]) for i in range(0, len(words), STREAM_CHUNK_WORDS)]
+        delay = self.latency.sample() / len(chunks)
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(delay)
+            yield SimpleNamespace(type = 'response.output_text.delta', delta = chunk if i == 0 else f' {chunk}')
+        yield SimpleNamespace(type = 'response.completed', response = response)
+
+class FakeSyncResponses:
+    def __init__(self, responses: FakeResponses):
+        self.responses = responses
+
+    def create(self, **kwargs):
+        time.sleep(self.responses.latency.sample())
+        return self.responses._build(kwargs)
+
+    def parse(self, text_format: type[BaseModel], **kwargs):
+        time.sleep(self.responses.latency.sample())
+        return self.responses._build(kwargs, text_format)
+
+class FakeProvider(Provider):
+    name = 'fake'
+
+    def __init__(self, latency: LatencyModel | None = None, output_tokens: int = FAKE_LLM_OUTPUT_TOKENS):
+        responses = FakeResponses(latency or LatencyModel(), output_tokens)
+        self._async_client = SimpleNamespace(responses = responses)
+        self._client = SimpleNamespace(responses = FakeSyncResponses(responses))
+
+    @property
+    def client(self):
+        return self._client
+
+    @property
+    def async_client(self):
+        return self._async_client
@@ -0,0 +1,62 @@
+'''
+    LLM providers.
+    A provider hands LLMFetcher an OpenAI-compatible client pair (client.responses.create/parse, sync and async).
+    Clients are created on first use, never at import, so nothing needs an API key or the network until a call is made.
+    LLM_PROVIDER picks the provider when LLMFetcher isn't given one: 'openai', or 'fake' for an offline deterministic
+    stand-in (see llms/fake_provider.py) to load test and benchmark the whole app without network access.
+'''
+from abc import ABC, abstractmethod
+
+from openai import OpenAI, AsyncOpenAI
+
+class Provider(ABC):
+    name: str
+
+    @property
+    @abstractmethod
+    def client(self):
+        ...
+
+    @property
+    @abstractmethod
+    def async_client(self):
+        ...
+
+class OpenAIProvider(Provider):
+    name = 'openai'
+
+    def __init__(self):
+        self._client = None
+        self._async_client = None
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            # Retries are handled by RetryPolicy (with deadlines), so the client's own retries are turned off
+            self._client = OpenAI(max_retries = 0)
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(max_retries = 0)
+        return self._async_client
+
+def _fake_provider():
+    from llms.fake_provider import FakeProvider
+    return FakeProvider()
+
+PROVIDERS = {
+    'openai': OpenAIProvider,
+    'fake': _fake_provider
+}
+
+_providers: dict[str, Provider] = {}
+
+def get_provider(name: str) -> Provider:
+    '''Process-wide provider, so every LLMFetcher shares its clients (and their connection pools).'''
+    if name not in PROVIDERS:
+        raise ValueError(f'Unknown LLM provider {name!r}, expected one of {sorted(PROVIDERS)}')
+    if name not in _providers:
+        _providers[name] = PROVIDERS[name]()
+    return _providers[name]
@@ -0,0 +1,165 @@
+'''
+    Process-wide limiter for LLM calls.
+    - At most LLM_MAX_CONCURRENCY calls are in flight at once.
+    - Each model has a requests-per-minute and a tokens-per-minute token bucket (LLM_DEFAULT_RPM / LLM_DEFAULT_TPM,
+      overridden per model with LLM_RATE_LIMITS). Tokens are estimated up front and corrected with the real usage.
+    - Waiting calls are served in priority order, so interactive requests go ahead of background work in the same process.
+
+    The limiter only sees its own process. The API and the summaries worker run separately against the same account
+    limits, so each takes a share of them: LLM_RATE_LIMIT_SHARE for the API, SUMMARY_WORKER_LLM_RATE_LIMIT_SHARE for
+    the worker (see core/summaries/worker.py). The API's share is the capacity reserved for interactive requests;
+    background work can't use it, however busy the worker is, and the shares should add up to at most 1.
+'''
+import json
+import time
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from contextlib import asynccontextmanager
+
+from settings import (
+    LLM_MAX_CONCURRENCY, LLM_DEFAULT_RPM, LLM_DEFAULT_TPM, LLM_RATE_LIMITS, LLM_RATE_LIMIT_SHARE, LLM_OUTPUT_TOKENS_ESTIMATE
+)
+
+CHARS_PER_TOKEN = 4
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # A user is waiting on the response (content enrichment)
+    BACKGROUND = 1   # Queued work (summaries)
+
+def estimate_request_tokens(request: dict) -> int:
+    '''Rough token count of a Responses API request: instructions and input (text or messages), plus the expected output.'''
+    text = json.dumps([request.get('instructions'), request.get('input')], default = str)
+    return len(text) // CHARS_PER_TOKEN + request.get('max_output_tokens', LLM_OUTPUT_TOKENS_ESTIMATE)
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        '''Seconds until `amount` can be taken. Requests larger than the whole bucket only wait for a full bucket.'''
+        self._refill()
+        needed = min(amount, self.capacity)
+        return 0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def adjust(self, amount: float):
+        '''Take (positive) or give back (negative) tokens after the fact; the level may go negative, which delays later calls.'''
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+class Lease:
+    def __init__(self, tokens_bucket: TokenBucket, estimated_tokens: int):
+        self.tokens_bucket = tokens_bucket
+        self.estimated_tokens = estimated_tokens
+
+    def record_usage(self, usage):
+        '''Correct the tokens-per-minute budget with the tokens the call really used.'''
+        total_tokens = getattr(usage, 'total_tokens', None)
+        if isinstance(total_tokens, int):
+            self.tokens_bucket.adjust(total_tokens - self.estimated_tokens)
+            self.estimated_tokens = total_tokens
+
+class RateLimiter:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        default_rpm: int = LLM_DEFAULT_RPM,
+        default_tpm: int = LLM_DEFAULT_TPM,
+        model_limits: dict | None = None,
+        share: float = LLM_RATE_LIMIT_SHARE
+    ):
+        '''share: fraction of every RPM/TPM limit this process may use.'''
+        self.max_concurrency = max_concurrency
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.model_limits = LLM_RATE_LIMITS if model_limits is None else model_limits
+        self.share = share
+        self.active = 0
+        self._buckets: dict[str, tuple[TokenBucket, TokenBucket]] = {}
+        self._waiters: list = []  # heap of (priority, sequence, model, tokens, future)
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _buckets_for(self, model: str) -> tuple[TokenBucket, TokenBucket]:
+        if model not in self._buckets:
+            limits = self.model_limits.get(model, {})
+            self._buckets[model] = (
+                TokenBucket(max(1, int(limits.get('rpm', self.default_rpm) * self.share))),
+                TokenBucket(max(1, int(limits.get('tpm', self.default_tpm) * self.share)))
+            )
+        return self._buckets[model]
+
+    @asynccontextmanager
+    async def acquire(self, model: str, tokens: int, priority: Priority = Priority.BACKGROUND):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), model, tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: hand the slot back
+                self._release()
+            else:
+                future.cancel()
+            raise
+        try:
+            yield Lease(self._buckets_for(model)[1], tokens)
+        finally:
+            self._release()
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        '''Grant waiters in priority order while there is a free slot and their model has budget left.'''
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        blocked, retry_in = [], None
+        while self._waiters and self.active < self.max_concurrency:
+            waiter = heapq.heappop(self._waiters)
+            _, _, model, tokens, future = waiter
+            if future.done():
+                continue
+            requests_bucket, tokens_bucket = self._buckets_for(model)
+            wait = max(requests_bucket.wait_time(1), tokens_bucket.wait_time(tokens))
+            if wait > 0:
+                blocked.append(waiter)
+                retry_in = wait if retry_in is None else min(retry_in, wait)
+                continue
+            requests_bucket.consume(1)
+            tokens_bucket.consume(tokens)
+            self.active += 1
+            future.set_result(None)
+        for waiter in blocked:
+            heapq.heappush(self._waiters, waiter)
+        if retry_in is not None:
+            self._timer = asyncio.get_running_loop().call_later(retry_in, self._dispatch)
+
+_rate_limiter: RateLimiter | None = None
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+def set_rate_limiter(limiter: RateLimiter):
+    '''Replaces the process-wide limiter, e.g. with the worker's share of the limits. Call it before any LLMFetcher is created.'''
+    global _rate_limiter
+    _rate_limiter = limiter
@@ -0,0 +1,90 @@
+'''
+    Retry policy for LLM calls.
+    Transient errors (rate limits, timeouts, connection errors, 5xx) are retried with full-jitter exponential backoff,
+    waiting as long as the provider's Retry-After asks when it sends one. An optional deadline bounds the whole call,
+    retries included: attempts are cut off at the deadline and no retry is started that could not finish before it.
+'''
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import openai
+
+from settings import LLM_RETRY_MAX_ATTEMPTS, LLM_RETRY_BASE_DELAY_SECONDS, LLM_RETRY_MAX_DELAY_SECONDS
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        # Out of quota is a 429 too, but waiting won't fix it
+        if getattr(error, 'code', None) == 'insufficient_quota':
+            return False
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+def get_retry_after(error: Exception) -> float | None:
+    '''Seconds the provider asked us to wait (retry-after-ms or retry-after, in seconds or as an HTTP date), if any.'''
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        retry_after = headers.get('retry-after')
+        if not retry_after:
+            return None
+        try:
+            return float(retry_after)
+        except ValueError:
+            return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = LLM_RETRY_MAX_ATTEMPTS,
+        base_delay: float = LLM_RETRY_BASE_DELAY_SECONDS,
+        max_delay: float = LLM_RETRY_MAX_DELAY_SECONDS
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        '''Full jitter: anywhere between 0 and the exponential delay for this attempt.'''
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def call(self, func, deadline: float | None = None):
+        '''
+            Await func() until it succeeds, fails with a non-retryable error, runs out of attempts or hits the deadline.
+            func: coroutine function taking no arguments, called once per attempt
+            deadline: absolute time.monotonic() by which the call must be done, or None for no limit
+            The last error is raised as is; a deadline that has already passed raises TimeoutError.
+        '''
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError('LLM call deadline exceeded')
+            try:
+                async with asyncio.timeout(remaining):
+                    return await func()
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+                retry_after = get_retry_after(e)
+                delay = retry_after if retry_after is not None else self.backoff(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                await asyncio.sleep(delay)
+
+def deadline_in(seconds: float | None) -> float | None:
+    '''Absolute deadline for RetryPolicy.call, `seconds` from now.'''
+    return None if seconds is None else time.monotonic() + seconds
@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -15,6 +16,87 @@ DB_PASSWORD=os.getenv('DB_PASSWORD')
 DB_PORT=os.getenv('DB_PORT', '5432')
 DB=os.getenv('DB', 'fora')
 
+# LLM provider ('openai', or 'fake' for the offline stand-in with the latency and usage below, see llms/providers.py)
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')
+FAKE_LLM_LATENCY_DISTRIBUTION = os.getenv('FAKE_LLM_LATENCY_DISTRIBUTION', 'lognormal')  # constant | uniform | lognormal
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv('FAKE_LLM_LATENCY_SECONDS', '1.0'))  # Median latency of a fake call
+FAKE_LLM_LATENCY_SPREAD = float(os.getenv('FAKE_LLM_LATENCY_SPREAD', '0.5'))
+FAKE_LLM_OUTPUT_TOKENS = int(os.getenv('FAKE_LLM_OUTPUT_TOKENS', '200'))
+FAKE_LLM_SEED = int(os.getenv('FAKE_LLM_SEED', '0'))
+
+# LLM call limits (shared by every call in the process, see llms/rate_limiter.py)
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '32'))
+LLM_DEFAULT_RPM = int(os.getenv('LLM_DEFAULT_RPM', '500'))  # Account limits, split between the processes below
+LLM_DEFAULT_TPM = int(os.getenv('LLM_DEFAULT_TPM', '200000'))
+LLM_RATE_LIMITS = json.loads(os.getenv('LLM_RATE_LIMITS', '{}'))  # Per model overrides, e.g. {"gpt-4.1": {"rpm": 500, "tpm": 30000}}
+LLM_RATE_LIMIT_SHARE = float(os.getenv('LLM_RATE_LIMIT_SHARE', '0.7'))  # Share of the RPM/TPM limits the API process uses (1 with SUMMARY_WORKER_IN_PROCESS)
+SUMMARY_WORKER_LLM_RATE_LIMIT_SHARE = float(os.getenv('SUMMARY_WORKER_LLM_RATE_LIMIT_SHARE', '0.3'))  # Share the summaries worker process uses
+LLM_OUTPUT_TOKENS_ESTIMATE = int(os.getenv('LLM_OUTPUT_TOKENS_ESTIMATE', '1000'))
+LLM_RETRY_MAX_ATTEMPTS = int(os.getenv('LLM_RETRY_MAX_ATTEMPTS', '4'))
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv('LLM_RETRY_BASE_DELAY_SECONDS', '0.5'))
+LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv('LLM_RETRY_MAX_DELAY_SECONDS', '8'))
+LLM_BREAKER_WINDOW_SIZE = int(os.getenv('LLM_BREAKER_WINDOW_SIZE', '20'))  # Per model circuit breaker, see llms/circuit_breaker.py
+LLM_BREAKER_MIN_CALLS = int(os.getenv('LLM_BREAKER_MIN_CALLS', '5'))
+LLM_BREAKER_FAILURE_RATE = float(os.getenv('LLM_BREAKER_FAILURE_RATE', '0.5'))
+LLM_BREAKER_SLOW_CALL_SECONDS = float(os.getenv('LLM_BREAKER_SLOW_CALL_SECONDS', '30'))
+LLM_BREAKER_SLOW_CALL_RATE = float(os.getenv('LLM_BREAKER_SLOW_CALL_RATE', '0.5'))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv('LLM_BREAKER_COOLDOWN_SECONDS', '30'))
+CONTENT_ENRICHMENT_DEADLINE_SECONDS = float(os.getenv('CONTENT_ENRICHMENT_DEADLINE_SECONDS', '30'))  # Per request, retries included
+SUMMARY_DEADLINE_SECONDS = float(os.getenv('SUMMARY_DEADLINE_SECONDS', '300'))  # Per summary, every LLM call and retry included
+
+# Content enrichment response cache
+CONTENT_CACHE_BACKEND = os.getenv('CONTENT_CACHE_BACKEND', 'memory')  # memory | redis | none
+CONTENT_CACHE_TTL_SECONDS = int(os.getenv('CONTENT_CACHE_TTL_SECONDS', '3600'))
+CONTENT_CACHE_MAX_ENTRIES = int(os.getenv('CONTENT_CACHE_MAX_ENTRIES', '1024'))
+CONTENT_CACHE_REDIS_URL = os.getenv('CONTENT_CACHE_REDIS_URL')
+
+# Content enrichment batch endpoint
+CONTENT_BATCH_MAX_ITEMS = int(os.getenv('CONTENT_BATCH_MAX_ITEMS', '100'))
+CONTENT_BATCH_CONCURRENCY = int(os.getenv('CONTENT_BATCH_CONCURRENCY', '8'))
+
+# Content enrichment hedged requests (opt-in): a second identical call is fired once the first is slower than usual
+CONTENT_HEDGE_ENABLED = os.getenv('CONTENT_HEDGE_ENABLED', 'false').lower() == 'true'
+CONTENT_HEDGE_PERCENTILE = float(os.getenv('CONTENT_HEDGE_PERCENTILE', '0.95'))  # Hedge after this percentile of recent latencies
+CONTENT_HEDGE_MIN_DELAY_SECONDS = float(os.getenv('CONTENT_HEDGE_MIN_DELAY_SECONDS', '0.5'))
+CONTENT_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv('CONTENT_HEDGE_DEFAULT_DELAY_SECONDS', '5'))  # Until there are enough samples
+CONTENT_HEDGE_MIN_SAMPLES = int(os.getenv('CONTENT_HEDGE_MIN_SAMPLES', '20'))
+CONTENT_HEDGE_WINDOW_SIZE = int(os.getenv('CONTENT_HEDGE_WINDOW_SIZE', '500'))
+
+# Content enrichment stats: hourly rollup of ai.content_enrichment_response, refreshed incrementally
+CONTENT_STATS_REFRESH_INTERVAL_SECONDS = float(os.getenv('CONTENT_STATS_REFRESH_INTERVAL_SECONDS', '300'))  # The stats endpoint refreshes a rollup older than this
+CONTENT_STATS_REFRESH_LAG_SECONDS = float(os.getenv('CONTENT_STATS_REFRESH_LAG_SECONDS', '60'))  # Rows written this recently wait for the next refresh
+CONTENT_STATS_MAX_DAYS = int(os.getenv('CONTENT_STATS_MAX_DAYS', '366'))  # Longest range one stats request may cover
+
+# Monthly partitions of ai.content_enrichment_response, maintained by `python -m core.content_enrichment.partitions`
+CONTENT_PARTITION_MONTHS_AHEAD = int(os.getenv('CONTENT_PARTITION_MONTHS_AHEAD', '3'))  # Partitions kept created ahead of the current month
+CONTENT_PARTITION_RETENTION_MONTHS = int(os.getenv('CONTENT_PARTITION_RETENTION_MONTHS', '12'))  # Older partitions are detached, 0 keeps everything
+CONTENT_PARTITION_LOCK_TIMEOUT_SECONDS = float(os.getenv('CONTENT_PARTITION_LOCK_TIMEOUT_SECONDS', '5'))  # Give up on DDL rather than queue behind long queries
+
+# Summaries job queue / worker
+SUMMARY_WORKER_CONCURRENCY = int(os.getenv('SUMMARY_WORKER_CONCURRENCY', '4'))
+SUMMARY_WORKER_POLL_INTERVAL_SECONDS = float(os.getenv('SUMMARY_WORKER_POLL_INTERVAL_SECONDS', '2'))
+SUMMARY_WORKER_IN_PROCESS = os.getenv('SUMMARY_WORKER_IN_PROCESS', 'false').lower() == 'true'  # Run the worker inside the web app (local dev)
+SUMMARY_WORKER_METRICS_PORT = int(os.getenv('SUMMARY_WORKER_METRICS_PORT', '9100'))  # GET /metrics of the worker process, 0 disables it
+SUMMARY_JOB_MAX_ATTEMPTS = int(os.getenv('SUMMARY_JOB_MAX_ATTEMPTS', '3'))
+SUMMARY_JOB_RETRY_BACKOFF_SECONDS = float(os.getenv('SUMMARY_JOB_RETRY_BACKOFF_SECONDS', '30'))
+SUMMARY_JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv('SUMMARY_JOB_LOCK_TIMEOUT_SECONDS', '900'))
+SUMMARY_QUEUE_MAX_PENDING = int(os.getenv('SUMMARY_QUEUE_MAX_PENDING', '10000'))  # 0 disables the limit
+SUMMARY_CHECKPOINT_TTL_SECONDS = float(os.getenv('SUMMARY_CHECKPOINT_TTL_SECONDS', '86400'))  # Checkpoints of generations that never finished are deleted after this
+SUMMARY_CHECKPOINT_SWEEP_INTERVAL_SECONDS = float(os.getenv('SUMMARY_CHECKPOINT_SWEEP_INTERVAL_SECONDS', '3600'))
+SUMMARY_OUTBOX_CONCURRENCY = int(os.getenv('SUMMARY_OUTBOX_CONCURRENCY', '8'))
+SUMMARY_OUTBOX_MAX_ATTEMPTS = int(os.getenv('SUMMARY_OUTBOX_MAX_ATTEMPTS', '10'))
+SUMMARY_OUTBOX_RETRY_BACKOFF_SECONDS = float(os.getenv('SUMMARY_OUTBOX_RETRY_BACKOFF_SECONDS', '10'))
+SUMMARY_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv('SUMMARY_OUTBOX_MAX_BACKOFF_SECONDS', '3600'))
+SUMMARY_PUBLISH_BATCHED = os.getenv('SUMMARY_PUBLISH_BATCHED', 'false').lower() == 'true'  # Publish to the backend batch endpoint (backfills)
+SUMMARY_PUBLISH_BATCH_SIZE = int(os.getenv('SUMMARY_PUBLISH_BATCH_SIZE', '100'))
+SUMMARY_PUBLISH_FLUSH_INTERVAL_SECONDS = float(os.getenv('SUMMARY_PUBLISH_FLUSH_INTERVAL_SECONDS', '1'))
+
+# Shared outbound HTTP client (public-schema writes)
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', '20'))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv('HTTP_KEEPALIVE_SECONDS', '30'))
+HTTP_TIMEOUT_SECONDS = float(os.getenv('HTTP_TIMEOUT_SECONDS', '30'))
+
 # Test DB settings
 TEST_DB_NAME = 'fora_test_db'
 TEST_DB_USER = os.getenv('TEST_DB_USER', 'fora_test')
@@ -29,9 +111,13 @@ def validate_environment():
     print('FORA_AI_API_KEY configured')
         
     
-    if not OPENAI_API_KEY:
+    # The fake provider makes no OpenAI calls
+    if LLM_PROVIDER == 'fake':
+        print('LLM_PROVIDER is fake, OPENAI_API_KEY not required')
+    elif not OPENAI_API_KEY:
         raise ValueError('Error on startup: OPENAI_API_KEY credential not set.')
-    print('OPENAI_API_KEY configured')
+    else:
+        print('OPENAI_API_KEY configured')
         
     
     if not DB_USER or not DB_HOST or not DB_PASSWORD:
@@ -14,20 +14,24 @@ from unittest.mock import MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from alembic.config import Config
 from alembic import command
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
 from llms.factory import LLMFetcher
+from llms.rate_limiter import RateLimiter
 from core.content_enrichment import (
     ContentEnrichmentRequest, GenerateContext, RewriteContext
 )
+from core.content_enrichment.cache import InMemoryResponseCache
 from settings import (
     API_KEY, TEST_DB_NAME, TEST_DB_USER,
     TEST_DB_PASSWORD, TEST_DB_HOST, TEST_DB_PORT,
     DB_USER, DB_PASSWORD
 )
-from db import get_db
+from db import get_db, get_async_db
 
 
 TEST_DB_URL = (
@@ -35,6 +39,11 @@ TEST_DB_URL = (
     f"@{TEST_DB_HOST}:{TEST_DB_PORT}/{TEST_DB_NAME}"
 )
 
+TEST_ASYNC_DB_URL = (
+    f"postgresql+asyncpg://{TEST_DB_USER}:{TEST_DB_PASSWORD}"
+    f"@{TEST_DB_HOST}:{TEST_DB_PORT}/{TEST_DB_NAME}"
+)
+
 def create_test_db():
     """Create test database if it doesn't exist"""
     # Connect to default database to create test database
@@ -110,6 +119,10 @@ def setup_test_db(request):
 engine = create_engine(TEST_DB_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: the TestClient runs the app on its own event loop, so asyncpg connections must not be reused across loops
+async_engine = create_async_engine(TEST_ASYNC_DB_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="function")
 def test_db():
     """Fixture to provide a test database session"""
@@ -120,6 +133,15 @@ def test_db():
     finally:
         db.close()
 
+@pytest.fixture
+def mock_llm_stream(mock_llm_response):
+    """Mock Responses API stream: two text deltas followed by the completed response"""
+    async def stream(*args, **kwargs):
+        for delta in ["Test generated ", "content"]:
+            yield MagicMock(type="response.output_text.delta", delta=delta)
+        yield MagicMock(type="response.completed", response=mock_llm_response)
+    return stream
+
 @pytest.fixture
 def mock_llm_response():
     """Mock LLM response fixture"""
@@ -144,8 +166,9 @@ def mock_llm_fetcher(mock_llm_response):
     """
     cg_module = sys.modules['core.content_enrichment.ContentGenerator']
     with patch.object(cg_module, 'LLMFetcher') as mock_cls:
-        mock_instance = MagicMock(spec=LLMFetcher)
-        mock_instance.model = 'gpt-4.1-mini'
+        # A real fetcher, so calls still go through the rate limiter, with the OpenAI client mocked out
+        mock_instance = LLMFetcher(provider='openai', model='gpt-4.1-mini')
+        mock_instance.limiter = RateLimiter(default_tpm=10**9)  # The mocked usage is 1M tokens per call
 
         mock_instance.async_client = MagicMock()
         mock_instance.async_client.responses = AsyncMock()
@@ -154,6 +177,16 @@ def mock_llm_fetcher(mock_llm_response):
         mock_cls.return_value = mock_instance
         yield mock_instance
 
+@pytest.fixture(autouse=True)
+def response_cache():
+    """
+    Give every test its own empty in-memory response cache so generations don't leak between tests.
+    """
+    cg_module = sys.modules['core.content_enrichment.ContentGenerator']
+    cache = InMemoryResponseCache()
+    with patch.object(cg_module, 'get_response_cache', return_value=cache):
+        yield cache
+
 @pytest.fixture
 def test_client(test_db):
     """Fixture to provide a test client with test database"""
@@ -163,11 +196,18 @@ def test_client(test_db):
         finally:
             test_db.close()
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     # Create client with default headers including Authorization
     client = TestClient(app, headers={"Authorization": f"Bearer {API_KEY}"})
-    return client
+    # The streaming route opens its own session rather than using the dependency
+    with patch('app.v1.routes.content_enrichment.AsyncSessionLocal', TestingAsyncSessionLocal):
+        yield client
 
 # Test request fixtures
 @pytest.fixture
@@ -6,6 +6,8 @@ from unittest.mock import patch, MagicMock, AsyncMock
 
 from app.main import app
 from settings import API_KEY
+from datetime import datetime, timezone
+from core.summaries.types import Job_Status
 
 @pytest.fixture
 def test_client():
@@ -61,32 +63,24 @@ def mock_http_client():
         mock_session.return_value = mock_session_instance
         yield mock_session_instance
 
-def test__summaries__successful_post_request(test_client):
+@pytest.fixture
+def mock_job_queue():
+    with patch('app.v1.routes.summaries.job_queue') as mock_queue:
+        mock_queue.count_pending = AsyncMock(return_value = 0)
+        mock_queue.enqueue = AsyncMock(return_value = MagicMock(id = uuid.uuid4()))
+        mock_queue.get = AsyncMock(return_value = None)
+        yield mock_queue
+
+def test__summaries__successful_post_request(test_client, mock_job_queue):
     logfire.configure(send_to_logfire = False)
-    mock_response = AsyncMock()
-    mock_response.status = 200
-    mock_response.json = AsyncMock(return_value={'status': 'success'})
-    mock_response.__aenter__ = AsyncMock(return_value=mock_response)
-    mock_response.__aexit__ = AsyncMock(return_value=None)
-    
-    mock_session = AsyncMock()
-    mock_session.post = MagicMock(return_value=mock_response)
+    response = test_client.post('/v1/summaries/', json=VALID_SUMMARIES_REQUEST)
     
-    with patch('aiohttp.ClientSession') as mock_client_session, patch('core.summaries.summaries.logfire'):
-        mock_client_session.return_value.__aenter__ = AsyncMock(return_value=mock_session)
-        mock_client_session.return_value.__aexit__ = AsyncMock(return_value=None)
-        
-        with patch('core.summaries.summaries.Summaries') as mock_summaries_class:
-            mock_summaries_instance = MagicMock()
-            mock_summaries_class.return_value = mock_summaries_instance
-            
-            response = test_client.post('/v1/summaries/', json=VALID_SUMMARIES_REQUEST)
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert 'status' in data
-            assert VALID_SUMMARIES_REQUEST['entity_id'] in data['status']
-            assert 'recieved' in data['status']
+    assert response.status_code == 200
+    data = response.json()
+    assert 'status' in data
+    assert VALID_SUMMARIES_REQUEST['entity_id'] in data['status']
+    assert 'recieved' in data['status']
+    assert data['job_id'] == str(mock_job_queue.enqueue.return_value.id)
 
 
 def test__summaries__invalid_data(test_client):
@@ -97,50 +91,58 @@ def test__summaries__invalid_data(test_client):
     error_detail = response.json()["detail"]
     assert len(error_detail) > 0
 
-@patch('aiohttp.ClientSession')
-def test__summaries_post__exception(mock_client_session, test_client):
+def test__summaries_post__exception(test_client, mock_job_queue):
     logfire.configure(send_to_logfire = False)
-    mock_session = MagicMock()
-    mock_client_session.return_value.__aenter__.return_value = mock_session
-    mock_client_session.return_value.__aexit__.return_value = None
+    mock_job_queue.enqueue.side_effect = Exception('Database connection failed')
     
-    with patch('app.v1.routes.summaries.Summaries') as mock_summaries_class:
-        mock_summaries_class.side_effect = Exception('Database connection failed')
-        
-        response = test_client.post('/v1/summaries/', json=VALID_SUMMARIES_REQUEST)
-        
-        assert response.status_code == 500
-        data = response.json()
-        assert 'detail' in data
-        assert 'Database connection failed' in data['detail']
+    response = test_client.post('/v1/summaries/', json=VALID_SUMMARIES_REQUEST)
+    
+    assert response.status_code == 500
+    data = response.json()
+    assert 'detail' in data
+    assert 'Database connection failed' in data['detail']
 
-@patch('aiohttp.ClientSession')
-@patch('app.v1.routes.summaries.Summaries')
-def test__summaries__background_task_started_successfully(mock_summaries_class, mock_client_session, test_client, monkeypatch):
+def test__summaries__job_enqueued_successfully(test_client, mock_job_queue):
     logfire.configure(send_to_logfire = False)
-    mock_session = MagicMock()
-    mock_client_session.return_value.__aenter__.return_value = mock_session
-    mock_client_session.return_value.__aexit__.return_value = None
-    
-    mock_summaries_instance = MagicMock()
-    mock_summaries_instance.generate = MagicMock()
-    mock_summaries_class.return_value = mock_summaries_instance
-    background_tasks_calls = []
-    from fastapi import BackgroundTasks
-    original_add_task = BackgroundTasks.add_task
-    
-    def track_add_task(self, func, *args, **kwargs):
-        logfire.configure(send_to_logfire = False)
-        background_tasks_calls.append((func, args, kwargs))
-        return None
-    
-    monkeypatch.setattr(BackgroundTasks, 'add_task', track_add_task)
     response = test_client.post('/v1/summaries/', json=VALID_SUMMARIES_REQUEST)
     assert response.status_code == 200
-    mock_summaries_class.assert_called_once()
-    assert len(background_tasks_calls) == 1
-    task_func, task_args, task_kwargs = background_tasks_calls[0]
-    assert task_func == mock_summaries_instance.generate
-    assert len(task_args) == 1
-    request_arg = task_args[0]
+    mock_job_queue.enqueue.assert_called_once()
+    request_arg = mock_job_queue.enqueue.call_args[0][1]
     assert str(request_arg.entity_id) == VALID_SUMMARIES_REQUEST['entity_id']
+    assert len(request_arg.sources) == 3
+
+def test__summaries__queue_full(test_client, mock_job_queue):
+    logfire.configure(send_to_logfire = False)
+    with patch('app.v1.routes.summaries.SUMMARY_QUEUE_MAX_PENDING', 10):
+        mock_job_queue.count_pending.return_value = 10
+        response = test_client.post('/v1/summaries/', json=VALID_SUMMARIES_REQUEST)
+    assert response.status_code == 429
+    mock_job_queue.enqueue.assert_not_called()
+
+def test__summary_job_status__success(test_client, mock_job_queue):
+    logfire.configure(send_to_logfire = False)
+    job = MagicMock(
+        id = uuid.uuid4(),
+        entity_id = uuid.UUID(VALID_SUMMARIES_REQUEST['entity_id']),
+        status = Job_Status.SUCCEEDED,
+        attempts = 1,
+        max_attempts = 3,
+        last_error = None,
+        summary_id = uuid.uuid4(),
+        created_at = datetime.now(timezone.utc),
+        updated_at = datetime.now(timezone.utc)
+    )
+    mock_job_queue.get.return_value = job
+    response = test_client.get(f'/v1/summaries/jobs/{job.id}')
+    assert response.status_code == 200
+    data = response.json()
+    assert data['id'] == str(job.id)
+    assert data['status'] == 'succeeded'
+    assert data['summary_id'] == str(job.summary_id)
+
+def test__summary_job_status__not_found(test_client, mock_job_queue):
+    logfire.configure(send_to_logfire = False)
+    job_id = uuid.uuid4()
+    response = test_client.get(f'/v1/summaries/jobs/{job_id}')
+    assert response.status_code == 404
+    assert str(job_id) in response.json()['detail']
@@ -0,0 +1,99 @@
+import uuid
+import pytest
+import logfire
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core.summaries.types import Job_Status, Source_Type
+from core.summaries.outbox import Summary_Outbox
+from core.summaries.dispatcher import Summary_Outbox_Dispatcher
+
+def make_record(attempts = 1, max_attempts = 10):
+    entity_id = str(uuid.uuid4())
+    return MagicMock(
+        id = uuid.uuid4(),
+        summary_id = uuid.uuid4(),
+        entity_id = entity_id,
+        source_type = Source_Type.CLIENT_SUPPLIER_REVIEWS,
+        payload = {'supplier_id': entity_id, 'summary': 'Summary', 'positive_tags': [], 'negative_tags': []},
+        attempts = attempts,
+        max_attempts = max_attempts,
+        run_after = datetime.now(timezone.utc)
+    )
+
+class Test_Summary_Outbox_Dispatcher:
+    @pytest.fixture
+    def dispatcher(self):
+        logfire.configure(send_to_logfire = False)
+        with patch('core.summaries.dispatcher.AsyncSessionLocal'), \
+             patch('core.summaries.dispatcher.logfire'):
+            dispatcher = Summary_Outbox_Dispatcher(concurrency = 2, poll_interval = 0.01)
+            dispatcher.outbox = MagicMock()
+            dispatcher.outbox.mark_published = AsyncMock()
+            dispatcher.outbox.mark_failed = AsyncMock(return_value = Job_Status.PENDING)
+            yield dispatcher
+
+    @pytest.mark.asyncio
+    async def test__dispatch__success(self, dispatcher):
+        record = make_record()
+        with patch('core.summaries.dispatcher.publish_summary', AsyncMock()) as mock_publish:
+            status = await dispatcher.dispatch(record)
+
+        assert status == Job_Status.SUCCEEDED
+        mock_publish.assert_awaited_once_with(record.source_type, record.payload, None, None)
+        dispatcher.outbox.mark_published.assert_called_once()
+        dispatcher.outbox.mark_failed.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test__dispatch__failure_is_retried_without_regenerating(self, dispatcher):
+        record = make_record()
+        with patch('core.summaries.dispatcher.publish_summary', AsyncMock(side_effect = Exception('Backend down'))):
+            status = await dispatcher.dispatch(record)
+
+        assert status == Job_Status.PENDING
+        assert dispatcher.outbox.mark_failed.call_args[0][1:] == (record, 'Backend down')
+        dispatcher.outbox.mark_published.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test__run__batched_claims_a_full_batch(self):
+        records = [make_record() for _ in range(5)]
+        publisher = MagicMock(max_batch_size = 5, publish = AsyncMock())
+        with patch('core.summaries.dispatcher.AsyncSessionLocal'), \
+             patch('core.summaries.dispatcher.logfire'):
+            dispatcher = Summary_Outbox_Dispatcher(concurrency = 2, poll_interval = 0.01, publisher = publisher)
+            dispatcher.outbox = MagicMock(mark_published = AsyncMock())
+
+            async def claim(db, limit):
+                dispatcher.stop()
+                return records[:limit]
+
+            dispatcher.outbox.claim = AsyncMock(side_effect = claim)
+            await dispatcher.run()
+
+        assert dispatcher.outbox.claim.call_args[0][1] == 5
+        assert publisher.publish.await_count == 5
+
+class Test_Summary_Outbox:
+    @pytest.mark.asyncio
+    async def test__mark_failed__backoff_is_capped(self):
+        outbox = Summary_Outbox()
+        outbox._update = AsyncMock()
+        record = make_record(attempts = 9)
+
+        with patch('core.summaries.outbox.SUMMARY_OUTBOX_RETRY_BACKOFF_SECONDS', 10), \
+             patch('core.summaries.outbox.SUMMARY_OUTBOX_MAX_BACKOFF_SECONDS', 60):
+            before = datetime.now(timezone.utc)
+            status = await outbox.mark_failed(MagicMock(), record, 'boom')
+
+        assert status == Job_Status.PENDING
+        delay = (outbox._update.call_args[0][2]['run_after'] - before).total_seconds()
+        assert 59 <= delay <= 61
+
+    @pytest.mark.asyncio
+    async def test__mark_failed__gives_up_after_max_attempts(self):
+        outbox = Summary_Outbox()
+        outbox._update = AsyncMock()
+
+        status = await outbox.mark_failed(MagicMock(), make_record(attempts = 10), 'boom')
+
+        assert status == Job_Status.FAILED
@@ -1,11 +1,15 @@
 import uuid
 import pytest
 import logfire
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+from llms.factory import LLMFetcher
+from llms.rate_limiter import RateLimiter
 from core.summaries.summaries import Summaries
+from core.summaries.constants import SUMMARY_CONFIG
+from core.summaries.serializers import Summaries_Request
 from core.summaries.helper import extract_source_data
-from core.summaries.types import Source, Source_Type, Tags, All_Tags
+from core.summaries.types import Source, Source_Type, Tags, All_Tags, Summary_Pipeline, Summary_With_Tags
 
 class Test_Summaries_Generation:
     @pytest.fixture
@@ -18,7 +22,10 @@ class Test_Summaries_Generation:
             mock_llm_fetcher.return_value.async_client = mock_client
             
             summaries = Summaries()
-            summaries.llm = mock_client
+            summaries.llm = LLMFetcher(provider = 'openai')
+            summaries.llm.limiter = RateLimiter()
+            summaries.llm.async_client = mock_client
+            summaries.checkpoints = AsyncMock()
 
             summaries.entity_id = uuid.uuid4()
             summaries.entity_name = 'Test Hotel'
@@ -29,6 +36,7 @@ class Test_Summaries_Generation:
                 Source(id = uuid.uuid4(), review='Good value')
             ]
             summaries.source_ids, summaries.source_reviews = extract_source_data(sources)
+            summaries.fingerprint = 'f' * 64
             return summaries
         
     @pytest.mark.asyncio
@@ -53,3 +61,234 @@ class Test_Summaries_Generation:
         assert latency > 0    
         assert summaries._response.call_count == 2
         assert summaries._response_structured_output.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test__generate_summary__shared_prefix(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        summaries.llm.async_client.responses.create = AsyncMock(side_effect = [
+            MagicMock(output_text = 'Initial summary'),
+            MagicMock(output_text = 'Refined summary')
+        ])
+        summaries.llm.async_client.responses.parse = AsyncMock(side_effect = [
+            MagicMock(output_parsed = Tags(tags = ['Location'])),
+            MagicMock(output_parsed = Tags(tags = ['Noise'])),
+            MagicMock(output_parsed = All_Tags(positive_tags = ['Location'], negative_tags = ['Noise']))
+        ])
+
+        with patch('core.summaries.summaries.SUMMARY_PIPELINE', Summary_Pipeline.SHARED_PREFIX):
+            result, _ = await summaries._generate_summary()
+
+        assert result['summary'] == 'Refined summary'
+        review_calls = [*summaries.llm.async_client.responses.create.call_args_list, *summaries.llm.async_client.responses.parse.call_args_list[:2]]
+        prefixes = [call.kwargs['input'][:2] for call in review_calls]
+        # Every call that reads the reviews starts with the identical prefix, with the task instructions after it
+        assert all(prefix == prefixes[0] for prefix in prefixes)
+        assert '1. Great hotel' in prefixes[0][1]['content']
+        assert [call.kwargs['input'][2]['content'] for call in review_calls] == [
+            SUMMARY_CONFIG['step_1']['system_message'],
+            SUMMARY_CONFIG['step_2']['system_message'],
+            SUMMARY_CONFIG['positive_tags']['system_message'],
+            SUMMARY_CONFIG['negative_tags']['system_message']
+        ]
+        # The tags merge step doesn't need the reviews
+        assert len(summaries.llm.async_client.responses.parse.call_args_list[2].kwargs['input']) == 2
+        # Step 2 only gets the first summary, the reviews are in the prefix
+        assert summaries.llm.async_client.responses.create.call_args_list[1].kwargs['input'][-1]['content'] == 'Summary: Initial summary'
+
+    @pytest.mark.asyncio
+    async def test__generate_summary__single_call(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        summaries._response = AsyncMock()
+        summaries._response_structured_output = AsyncMock(return_value = (
+            Summary_With_Tags(summary = 'One pass summary', positive_tags = ['Staff'], negative_tags = ['Parking']),
+            0.002
+        ))
+
+        with patch('core.summaries.summaries.SUMMARY_PIPELINE', Summary_Pipeline.SINGLE_CALL):
+            result, _ = await summaries._generate_summary()
+
+        assert result == {
+            'summary': 'One pass summary',
+            'positive_tags': ['Staff'],
+            'negative_tags': ['Parking'],
+            'cost': 0.002
+        }
+        summaries._response.assert_not_called()
+        assert summaries._response_structured_output.call_count == 1
+        assert summaries._response_structured_output.call_args.kwargs['shared_prefix'] is True
+
+    @pytest.mark.asyncio
+    async def test__generate_summary__map_reduce_over_threshold(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        summaries.source_reviews = ['a' * 40] * 5  # ~10 tokens each
+        summaries._response = AsyncMock(return_value = ('Final summary', 0.002))
+        summaries._response_structured_output = AsyncMock(side_effect = [
+            (Summary_With_Tags(summary = 'Part 1', positive_tags = ['Staff'], negative_tags = ['Noise']), 0.001),
+            (Summary_With_Tags(summary = 'Part 2', positive_tags = ['Pool'], negative_tags = ['Parking']), 0.001),
+            (Summary_With_Tags(summary = 'Part 3', positive_tags = ['Staff'], negative_tags = []), 0.001),
+            (All_Tags(positive_tags = ['Staff', 'Pool'], negative_tags = ['Noise', 'Parking']), 0.001)
+        ])
+        config = {
+            **SUMMARY_CONFIG,
+            'map': {**SUMMARY_CONFIG['map'], 'threshold_tokens': 30, 'chunk_tokens': 20, 'max_concurrency': 2}
+        }
+
+        with patch('core.summaries.summaries.SUMMARY_CONFIG', config):
+            result, _ = await summaries._generate_summary()
+
+        assert result == {
+            'summary': 'Final summary',
+            'positive_tags': ['Staff', 'Pool'],
+            'negative_tags': ['Noise', 'Parking'],
+            'cost': 0.006
+        }
+        map_calls = summaries._response_structured_output.call_args_list[:3]
+        assert all(call.args[0] == SUMMARY_CONFIG['map']['model'] for call in map_calls)
+        assert '1. Part 1\n2. Part 2\n3. Part 3' in summaries._response.call_args.args[2]
+        assert summaries._response_structured_output.call_args.args[3] == All_Tags
+
+    @pytest.mark.asyncio
+    async def test__generate_summary__under_threshold_skips_map_reduce(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        summaries._generate_summary_map_reduce = AsyncMock()
+        summaries._generate_summary_multi_step = AsyncMock(return_value = {'summary': 'Summary'})
+
+        await summaries._generate_summary()
+
+        summaries._generate_summary_map_reduce.assert_not_called()
+        summaries._generate_summary_multi_step.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test__generate_summary__incremental_uses_only_new_reviews(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        new_id = uuid.uuid4()
+        summaries.source_ids = summaries.source_ids + [new_id]
+        summaries.source_reviews = summaries.source_reviews + ['Broken elevator']
+        summaries.previous_summary = MagicMock(
+            id = uuid.uuid4(),
+            sources = summaries.source_ids[:3],
+            summary = 'Previous summary',
+            positive_tags = ['Service'],
+            negative_tags = []
+        )
+        summaries._response_structured_output = AsyncMock(return_value = (
+            Summary_With_Tags(summary = 'Updated summary', positive_tags = ['Service'], negative_tags = ['Elevator']),
+            0.001
+        ))
+        config = {**SUMMARY_CONFIG, 'incremental': {**SUMMARY_CONFIG['incremental'], 'max_churn': 0.5}}
+
+        with patch('core.summaries.summaries.SUMMARY_CONFIG', config):
+            result, _ = await summaries._generate_summary()
+
+        assert result['summary'] == 'Updated summary'
+        assert result['negative_tags'] == ['Elevator']
+        assert result['updated_from'] == str(summaries.previous_summary.id)
+        user_message = summaries._response_structured_output.call_args.args[2]
+        assert 'Previous summary' in user_message
+        assert '1. Broken elevator' in user_message
+        assert 'Great hotel' not in user_message
+
+    @pytest.mark.asyncio
+    async def test__generate_summary__large_update_falls_through_to_map_reduce(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        summaries.source_ids = summaries.source_ids + [uuid.uuid4()]
+        summaries.source_reviews = summaries.source_reviews + ['Broken elevator ' * 200]
+        summaries.previous_summary = MagicMock(id = uuid.uuid4(), sources = summaries.source_ids[:3], summary = 'Previous summary')
+        summaries._generate_summary_incremental = AsyncMock()
+        summaries._generate_summary_map_reduce = AsyncMock(return_value = {'summary': 'Summary'})
+        config = {
+            **SUMMARY_CONFIG,
+            'incremental': {**SUMMARY_CONFIG['incremental'], 'max_churn': 0.5},
+            'map': {**SUMMARY_CONFIG['map'], 'threshold_tokens': 100}
+        }
+
+        with patch('core.summaries.summaries.SUMMARY_CONFIG', config):
+            await summaries._generate_summary()
+
+        summaries._generate_summary_incremental.assert_not_called()
+        summaries._generate_summary_map_reduce.assert_awaited_once()
+
+    @pytest.mark.parametrize('sources', [
+        lambda ids: ids[:1],                # Too many new reviews
+        lambda ids: ids + [uuid.uuid4()],   # A review was removed
+        lambda ids: ids                     # Nothing new
+    ])
+    def test__new_reviews__falls_back_to_full_regeneration(self, mock_summaries_data, sources):
+        summaries = mock_summaries_data
+        summaries.previous_summary = MagicMock(sources = sources(summaries.source_ids))
+        config = {**SUMMARY_CONFIG, 'incremental': {**SUMMARY_CONFIG['incremental'], 'max_churn': 0.5}}
+
+        with patch('core.summaries.summaries.SUMMARY_CONFIG', config):
+            assert summaries._new_reviews() is None
+
+    @pytest.mark.asyncio
+    async def test__generate__unchanged_reviews_republishes_existing_summary(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        request = Summaries_Request(
+            entity_id = uuid.uuid4(),
+            entity_name = 'Test Hotel',
+            source_type = Source_Type.CLIENT_SUPPLIER_REVIEWS,
+            sources = [Source(id = uuid.uuid4(), review = review) for review in ['Great hotel', 'Nice service', 'Good value']]
+        )
+        existing = MagicMock(id = uuid.uuid4(), summary = 'Existing summary', positive_tags = ['Service'], negative_tags = [])
+        summaries._get_latest_summary = AsyncMock(return_value = existing)
+        summaries._generate_summary = AsyncMock()
+        summaries._write_summary_to_ai_schema = AsyncMock()
+        summaries.outbox = MagicMock(enqueue = AsyncMock())
+
+        with patch('core.summaries.summaries.AsyncSessionLocal') as mock_session:
+            summary_id = await summaries.generate(request)
+
+        assert summary_id == str(existing.id)
+        summaries._get_latest_summary.assert_awaited_once_with(summaries.fingerprint)
+        summaries._generate_summary.assert_not_called()
+        summaries._write_summary_to_ai_schema.assert_not_called()
+        # Published by the dispatcher, like a newly written summary
+        summaries.outbox.enqueue.assert_awaited_once_with(
+            mock_session.return_value.__aenter__.return_value,
+            existing.id,
+            request.entity_id,
+            request.source_type,
+            {'supplier_id': str(request.entity_id), 'summary': 'Existing summary', 'positive_tags': ['Service'], 'negative_tags': []}
+        )
+
+    @pytest.mark.asyncio
+    async def test__generate_summary__resumes_from_checkpoints(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        summaries.completed_steps = {
+            'multi_step.step_1': MagicMock(output = 'Initial summary', cost = 0.001, latency = 1.0, model = 'gpt-4.1-mini', usage = {
+                'input_tokens': 1000, 'cached_input_tokens': 0, 'output_tokens': 100, 'reasoning_tokens': 0, 'cost': 0.001
+            }),
+            'multi_step.positive_tags': MagicMock(output = {'tags': ['Location']}, cost = 0.001, latency = 1.0, model = 'gpt-4.1', usage = None),
+            'multi_step.negative_tags': MagicMock(output = {'tags': ['Noise']}, cost = 0.001, latency = 1.0, model = 'gpt-4.1', usage = None)
+        }
+        summaries.llm.async_client.responses.create = AsyncMock(return_value = MagicMock(output_text = 'Refined summary', model = 'gpt-4.1'))
+        summaries.llm.async_client.responses.parse = AsyncMock(return_value = MagicMock(
+            output_parsed = All_Tags(positive_tags = ['Location'], negative_tags = ['Noise']), model = 'gpt-4.1-mini'
+        ))
+
+        result, _ = await summaries._generate_summary()
+
+        assert result['summary'] == 'Refined summary'
+        # Only the steps without a checkpoint are paid for again, and step_2 builds on the checkpointed step_1
+        summaries.llm.async_client.responses.create.assert_awaited_once()
+        assert 'summary: Initial summary' in summaries.llm.async_client.responses.create.call_args.kwargs['input'][1]['content']
+        tags_input = summaries.llm.async_client.responses.parse.call_args.kwargs['input'][1]['content']
+        assert tags_input == "Positive tags: ['Location'], Negative tags: ['Noise']"
+        assert summaries.steps['multi_step.step_1']['resumed'] is True
+        assert summaries.steps['multi_step.step_1']['input_tokens'] == 1000
+        assert summaries.steps['multi_step.positive_tags']['cost'] == 0.001
+        assert summaries.steps['multi_step.step_2']['resumed'] is False
+        saved_steps = [call.args[3] for call in summaries.checkpoints.save.call_args_list]
+        assert sorted(saved_steps) == ['multi_step.step_2', 'multi_step.tags']
+
+    @pytest.mark.asyncio
+    async def test__run_step__checkpoint_failure_does_not_fail_the_step(self, mock_summaries_data):
+        summaries = mock_summaries_data
+        summaries.checkpoints.save.side_effect = Exception('Database unavailable')
+        summaries.llm.async_client.responses.create = AsyncMock(return_value = MagicMock(output_text = 'Summary', model = 'gpt-4.1'))
+
+        output, _ = await summaries._response('gpt-4.1', 'system', 'user', step = 'multi_step.step_2')
+
+        assert output == 'Summary'
+        assert summaries.steps['multi_step.step_2']['output'] == 'Summary'
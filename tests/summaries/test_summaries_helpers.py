@@ -5,7 +5,7 @@ import logfire
 from unittest.mock import patch
 
 from core.summaries.types import Source, Source_Type
-from core.summaries.helper import extract_source_data, get_backend_write_endpoint
+from core.summaries.helper import extract_source_data, fingerprint_sources, format_reviews, estimate_tokens, chunk_reviews, get_backend_write_endpoint
 
 class Test_Summaries_Helpers:
     def test__extract_source_data__valid_sources(self):
@@ -26,6 +26,28 @@ class Test_Summaries_Helpers:
         assert 'Great hotel with excellent service' in reviews
         assert 'Nice location but noisy rooms' in reviews
 
+    def test__fingerprint_sources__order_independent(self):
+        logfire.configure(send_to_logfire = False)
+        first = Source(id = uuid.uuid4(), review = 'Great hotel')
+        second = Source(id = uuid.uuid4(), review = 'Noisy rooms')
+        edited = Source(id = second.id, review = 'Very noisy rooms')
+
+        assert fingerprint_sources([first, second]) == fingerprint_sources([second, first])
+        assert fingerprint_sources([first, second]) != fingerprint_sources([first, edited])
+
+    def test__format_reviews__numbered_lines(self):
+        logfire.configure(send_to_logfire = False)
+        assert format_reviews(['Great hotel', 'Noisy rooms']) == '1. Great hotel\n2. Noisy rooms'
+
+    def test__chunk_reviews__respects_token_budget(self):
+        logfire.configure(send_to_logfire = False)
+        reviews = ['a' * 40, 'b' * 40, 'c' * 40, 'd' * 200]
+
+        chunks = chunk_reviews(reviews, max_tokens = 20)
+
+        assert chunks == [['a' * 40, 'b' * 40], ['c' * 40], ['d' * 200]]
+        assert estimate_tokens('a' * 41) == 11
+
     def test__get_backend_write_endpoint__valid_source_type(self):
         logfire.configure(send_to_logfire = False)
         entity_id = str(uuid.uuid4())
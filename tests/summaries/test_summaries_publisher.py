@@ -0,0 +1,88 @@
+import uuid
+import pytest
+import asyncio
+import pytest_asyncio
+import aiohttp
+import logfire
+from aiohttp import web
+from unittest.mock import patch
+from aiohttp.test_utils import TestServer
+
+from core.summaries.types import Source_Type
+from core.summaries.publisher import Summary_Publisher
+
+def make_payload():
+    return {'supplier_id': str(uuid.uuid4()), 'summary': 'Summary', 'positive_tags': ['Staff'], 'negative_tags': []}
+
+class Test_Summary_Publisher:
+    @pytest_asyncio.fixture
+    async def backend(self):
+        '''Local stand-in for the backend batch endpoint, recording every batch it receives.'''
+        state = {'batches': [], 'status': 201}
+
+        async def batch_write(request):
+            state['batches'].append(await request.json())
+            return web.json_response({}, status = state['status'])
+
+        app = web.Application()
+        app.router.add_post('/v1/suppliers/client-reviews/summary/batch/', batch_write)
+        server = TestServer(app)
+        await server.start_server()
+        with patch.dict('os.environ', {
+            'RESTRICTED_BASE_URL': str(server.make_url('')).rstrip('/'),
+            'FORA_PORTAL_BE_API_KEY': 'test-api-key'
+        }):
+            yield state
+        await server.close()
+
+    @pytest_asyncio.fixture
+    async def http_session(self):
+        logfire.configure(send_to_logfire = False)
+        async with aiohttp.ClientSession() as session:
+            yield session
+
+    @pytest.mark.asyncio
+    async def test__publish__flushes_when_batch_is_full(self, backend, http_session):
+        publisher = Summary_Publisher(http_session, max_batch_size = 3, flush_interval = 60)
+        payloads = [make_payload() for _ in range(6)]
+
+        await asyncio.gather(*(publisher.publish(Source_Type.CLIENT_SUPPLIER_REVIEWS, payload) for payload in payloads))
+        await publisher.close()
+
+        assert [len(batch['summaries']) for batch in backend['batches']] == [3, 3]
+        assert [summary for batch in backend['batches'] for summary in batch['summaries']] == payloads
+
+    @pytest.mark.asyncio
+    async def test__publish__flushes_on_interval(self, backend, http_session):
+        publisher = Summary_Publisher(http_session, max_batch_size = 100, flush_interval = 0.05)
+
+        await asyncio.wait_for(asyncio.gather(
+            publisher.publish(Source_Type.CLIENT_SUPPLIER_REVIEWS, make_payload()),
+            publisher.publish(Source_Type.CLIENT_SUPPLIER_REVIEWS, make_payload())
+        ), timeout = 2)
+        await publisher.close()
+
+        assert len(backend['batches']) == 1
+        assert len(backend['batches'][0]['summaries']) == 2
+
+    @pytest.mark.asyncio
+    async def test__publish__batch_failure_raises_for_every_summary(self, backend, http_session):
+        backend['status'] = 500
+        publisher = Summary_Publisher(http_session, max_batch_size = 2, flush_interval = 60)
+
+        results = await asyncio.gather(
+            publisher.publish(Source_Type.CLIENT_SUPPLIER_REVIEWS, make_payload()),
+            publisher.publish(Source_Type.CLIENT_SUPPLIER_REVIEWS, make_payload()),
+            return_exceptions = True
+        )
+        await publisher.close()
+
+        assert all(isinstance(result, aiohttp.ClientResponseError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test__publish__invalid_source_type(self, http_session):
+        publisher = Summary_Publisher(http_session)
+
+        with pytest.raises(KeyError):
+            await publisher.publish(Source_Type.ADVISOR_REVIEWS, make_payload())
+        assert not publisher.buffers
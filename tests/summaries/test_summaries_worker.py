@@ -0,0 +1,200 @@
+import os
+import uuid
+import signal
+import asyncio
+import pytest
+import aiohttp
+import logfire
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from core.summaries.jobs import Summary_Job_Queue, claim_runnable
+from core.summaries.models import Summary_Jobs
+from core.summaries.types import Job_Status
+from core.summaries.worker import Summary_Worker, run_until_signalled, serve_metrics
+from core.summaries.helper import fingerprint_sources
+from core.summaries.serializers import Summaries_Request
+from core.summaries.dispatcher import Summary_Outbox_Dispatcher
+from settings import API_KEY
+
+REQUEST_PAYLOAD = {
+    'entity_id': str(uuid.uuid4()),
+    'entity_name': 'Test Hotel',
+    'source_type': 'client_supplier_reviews',
+    'sources': [{'id': str(uuid.uuid4()), 'review': f'Review {i}'} for i in range(3)]
+}
+
+def make_job(attempts = 1, max_attempts = 3):
+    return MagicMock(
+        id = uuid.uuid4(),
+        entity_id = REQUEST_PAYLOAD['entity_id'],
+        request = REQUEST_PAYLOAD,
+        attempts = attempts,
+        max_attempts = max_attempts,
+        run_after = datetime.now(timezone.utc)
+    )
+
+class Test_Summary_Worker:
+    @pytest.fixture
+    def worker(self):
+        logfire.configure(send_to_logfire = False)
+        with patch('core.summaries.worker.AsyncSessionLocal'), \
+             patch('core.summaries.worker.logfire'):
+            worker = Summary_Worker(concurrency = 2, poll_interval = 0.01)
+            worker.queue = MagicMock()
+            worker.queue.mark_succeeded = AsyncMock()
+            worker.queue.mark_failed = AsyncMock(side_effect = lambda db, job, error: Job_Status.PENDING)
+            worker.checkpoints = AsyncMock()
+            yield worker
+
+    @pytest.mark.asyncio
+    async def test__run_job__success(self, worker):
+        job = make_job()
+        with patch('core.summaries.worker.Summaries') as mock_summaries_class:
+            mock_summaries_class.return_value.generate = AsyncMock(return_value = 'summary-id')
+            status = await worker.run_job(job)
+
+        assert status == Job_Status.SUCCEEDED
+        mock_summaries_class.assert_called_once_with()
+        request_arg = mock_summaries_class.return_value.generate.call_args[0][0]
+        assert str(request_arg.entity_id) == REQUEST_PAYLOAD['entity_id']
+        worker.queue.mark_succeeded.assert_called_once()
+        assert worker.queue.mark_succeeded.call_args[0][1:] == (job, 'summary-id')
+        worker.queue.mark_failed.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test__run_job__failure_is_recorded(self, worker):
+        job = make_job()
+        with patch('core.summaries.worker.Summaries') as mock_summaries_class:
+            mock_summaries_class.return_value.generate = AsyncMock(side_effect = Exception('LLM unavailable'))
+            status = await worker.run_job(job)
+
+        assert status == Job_Status.PENDING
+        worker.queue.mark_failed.assert_called_once()
+        assert worker.queue.mark_failed.call_args[0][1:] == (job, 'LLM unavailable')
+        worker.queue.mark_succeeded.assert_not_called()
+        # Retried later, so its checkpoints are kept
+        worker.checkpoints.clear.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test__run_job__final_failure_clears_checkpoints(self, worker):
+        job = make_job(attempts = 3, max_attempts = 3)
+        worker.queue.mark_failed = AsyncMock(return_value = Job_Status.FAILED)
+        with patch('core.summaries.worker.Summaries') as mock_summaries_class:
+            mock_summaries_class.return_value.generate = AsyncMock(side_effect = Exception('LLM unavailable'))
+            status = await worker.run_job(job)
+
+        assert status == Job_Status.FAILED
+        request = Summaries_Request.model_validate(REQUEST_PAYLOAD)
+        assert worker.checkpoints.clear.call_args[0][1:] == (request.entity_id, fingerprint_sources(request.sources))
+
+    @pytest.mark.asyncio
+    async def test__run__sweeps_expired_checkpoints(self, worker):
+        async def claim(db, limit):
+            worker.stop()
+            return []
+
+        worker.queue.claim = AsyncMock(side_effect = claim)
+        worker.checkpoints.clear_expired = AsyncMock(return_value = 2)
+        with patch('core.summaries.worker.SUMMARY_CHECKPOINT_TTL_SECONDS', 60):
+            await worker.run()
+
+        assert worker.checkpoints.clear_expired.call_args[0][1] == 60
+
+    @pytest.mark.asyncio
+    async def test__run__respects_concurrency(self, worker):
+        jobs = [make_job() for _ in range(3)]
+        claimed_limits = []
+
+        async def claim(db, limit):
+            claimed_limits.append(limit)
+            if len(claimed_limits) == 1:
+                return jobs[:limit]
+            worker.stop()
+            return []
+
+        worker.queue.claim = AsyncMock(side_effect = claim)
+        worker.run_job = AsyncMock(return_value = Job_Status.SUCCEEDED)
+        await worker.run()
+
+        assert claimed_limits[0] == 2
+        assert worker.run_job.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test__run_until_signalled__sigterm_stops_worker_and_dispatcher(self, worker):
+        worker.queue.claim = AsyncMock(return_value = [])
+        with patch('core.summaries.dispatcher.AsyncSessionLocal'), \
+             patch('core.summaries.dispatcher.logfire'):
+            dispatcher = Summary_Outbox_Dispatcher(poll_interval = 0.01)
+            dispatcher.outbox = MagicMock(claim = AsyncMock(return_value = []))
+            asyncio.get_running_loop().call_later(0.05, os.kill, os.getpid(), signal.SIGTERM)
+
+            await asyncio.wait_for(run_until_signalled(worker, dispatcher), timeout = 2)
+
+        assert worker._stopping.is_set()
+        assert dispatcher._stopping.is_set()
+
+    @pytest.mark.asyncio
+    async def test__serve_metrics__renders_registry(self):
+        runner = await serve_metrics(port = 0)
+        try:
+            # Port 0 binds each address family to its own free port, take the IPv4 one
+            port = next(address[1] for address in runner.addresses if len(address) == 2)
+            url = f'http://127.0.0.1:{port}/metrics'
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as response:
+                    assert response.status == 401
+                async with session.get(url, headers = {'Authorization': f'Bearer {API_KEY}'}) as response:
+                    assert response.status == 200
+                    assert response.headers['Content-Type'].startswith('text/plain')
+                    assert 'llm_tokens_total' in await response.text()
+        finally:
+            await runner.cleanup()
+
+class Test_Summary_Job_Queue:
+    @pytest.mark.asyncio
+    async def test__mark_failed__retries_with_backoff(self):
+        queue = Summary_Job_Queue()
+        queue._update = AsyncMock()
+        job = make_job(attempts = 2, max_attempts = 3)
+
+        with patch('core.summaries.jobs.SUMMARY_JOB_RETRY_BACKOFF_SECONDS', 10):
+            before = datetime.now(timezone.utc)
+            status = await queue.mark_failed(MagicMock(), job, 'boom')
+
+        assert status == Job_Status.PENDING
+        values = queue._update.call_args[0][2]
+        assert values['status'] == Job_Status.PENDING
+        assert values['last_error'] == 'boom'
+        assert (values['run_after'] - before).total_seconds() >= 20
+
+    @pytest.mark.asyncio
+    async def test__mark_failed__gives_up_after_max_attempts(self):
+        queue = Summary_Job_Queue()
+        queue._update = AsyncMock()
+        job = make_job(attempts = 3, max_attempts = 3)
+
+        status = await queue.mark_failed(MagicMock(), job, 'boom')
+
+        assert status == Job_Status.FAILED
+        assert queue._update.call_args[0][2]['status'] == Job_Status.FAILED
+
+    @pytest.mark.asyncio
+    async def test__claim__skips_and_fails_stale_jobs_without_attempts_left(self):
+        db = MagicMock()
+        db.execute = AsyncMock(return_value = MagicMock(rowcount = 1))
+        db.commit = AsyncMock()
+
+        with patch('core.summaries.jobs.logfire'):
+            await claim_runnable(db, Summary_Jobs, 2, 900)
+
+        fail_abandoned, claim = [
+            str(call.args[0].compile(dialect = postgresql.dialect())) for call in db.execute.call_args_list
+        ]
+        # Exhausted stale jobs are marked failed instead of reclaimed
+        assert 'SET status=%(status)s' in fail_abandoned
+        assert 'ai.summary_jobs.attempts >= ai.summary_jobs.max_attempts' in fail_abandoned
+        assert 'ai.summary_jobs.attempts < ai.summary_jobs.max_attempts' in claim
+        db.commit.assert_awaited_once()
@@ -13,31 +13,36 @@ class Test_Summaries_Write_To_AI_DB:
         logfire.configure(send_to_logfire = False)
         with patch('core.summaries.summaries.LLMFetcher') as mock_llm_fetcher, \
             patch('core.summaries.summaries.UsageTracker'), \
-            patch('core.summaries.summaries.BaseDBOperations') as mock_db_ops, \
-            patch('core.summaries.summaries.get_db') as mock_get_db, \
+            patch('core.summaries.summaries.AsyncBaseDBOperations') as mock_db_ops, \
+            patch('core.summaries.summaries.AsyncSessionLocal') as mock_session_local, \
             patch('core.summaries.summaries.logfire'):  # Patch logfire to prevent actual logging
             
             mock_client = AsyncMock()
             mock_llm_fetcher.return_value.async_client = mock_client
             
-            mock_db_session = Mock()
-            mock_get_db.return_value.__next__.return_value = mock_db_session
-            mock_get_db.return_value.__enter__ = Mock(return_value=mock_db_session)
-            mock_get_db.return_value.__exit__ = Mock(return_value=None)
+            mock_db_session = AsyncMock()
+            mock_session_local.return_value.__aenter__.return_value = mock_db_session
             
             mock_db_instance = Mock()
+            mock_db_instance.add = AsyncMock()
             mock_db_ops.return_value = mock_db_instance
             
             summaries = Summaries()
+            summaries.outbox = Mock(add = AsyncMock())
             
             summaries._mock_db_session = mock_db_session
             summaries._mock_db_instance = mock_db_instance
             
-            return summaries
+            yield summaries
         
     @pytest.mark.asyncio
     async def test__write_summary_ai__success(self, mock_summaries_for_write):
         summaries = mock_summaries_for_write
+        summaries.fingerprint = 'a' * 64
+        summaries.steps = {'map_reduce.map.0': {
+            'output': {'summary': 'Partial summary'}, 'latency': 1.2, 'model': 'gpt-4.1-mini', 'resumed': False,
+            'input_tokens': 1000, 'cached_input_tokens': 0, 'output_tokens': 100, 'reasoning_tokens': 0, 'cost': 0.001
+        }}
         
         entity_id = str(uuid.uuid4())
         source_type = Source_Type.CLIENT_SUPPLIER_REVIEWS
@@ -52,7 +57,7 @@ class Test_Summaries_Write_To_AI_DB:
         
         mock_created_record = Mock()
         mock_created_record.id = uuid.uuid4()
-        summaries.db.create.return_value = mock_created_record
+        summaries.async_db.add.return_value = mock_created_record
         
         result = await summaries._write_summary_to_ai_schema(
             entity_id, source_type, sources, summary, latency
@@ -60,8 +65,8 @@ class Test_Summaries_Write_To_AI_DB:
         
         assert result == str(mock_created_record.id)
         
-        summaries.db.create.assert_called_once()
-        call_args = summaries.db.create.call_args
+        summaries.async_db.add.assert_called_once()
+        call_args = summaries.async_db.add.call_args
         
         data = call_args[0][1]
         assert data['entity_id'] == entity_id
@@ -70,9 +75,28 @@ class Test_Summaries_Write_To_AI_DB:
         assert data['summary'] == 'Great hotel with excellent service'
         assert data['positive_tags'] == ['Location', 'Service', 'Cleanliness']
         assert data['negative_tags'] == ['Noise', 'Parking']
+        assert data['fingerprint'] == 'a' * 64
         assert data['content_metadata']['logfire_session_id'] == summaries.SESSION_ID
         assert data['content_metadata']['cost'] == 0.0035
         assert data['content_metadata']['latency'] == 2.5
+        # Step outputs stay in the checkpoints, only their cost, latency and model are kept with the summary
+        assert data['content_metadata']['steps'] == {'map_reduce.map.0': {'cost': 0.001, 'latency': 1.2, 'model': 'gpt-4.1-mini'}}
+        assert data['content_metadata']['usage']['input_tokens'] == 1000
+
+        # The summary and its outbox record are committed together
+        summaries.outbox.add.assert_awaited_once()
+        outbox_db, summary_id, outbox_entity_id, outbox_source_type, payload = summaries.outbox.add.call_args[0]
+        assert outbox_db is call_args[0][0]
+        assert summary_id == mock_created_record.id
+        assert outbox_entity_id == entity_id
+        assert outbox_source_type == source_type
+        assert payload == {
+            'supplier_id': entity_id,
+            'summary': 'Great hotel with excellent service',
+            'positive_tags': ['Location', 'Service', 'Cleanliness'],
+            'negative_tags': ['Noise', 'Parking']
+        }
+        summaries._mock_db_session.commit.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test__write_summary_ai__no_tags(self, mock_summaries_for_write):
@@ -91,7 +115,7 @@ class Test_Summaries_Write_To_AI_DB:
         
         mock_created_record = Mock()
         mock_created_record.id = uuid.uuid4()
-        summaries.db.create.return_value = mock_created_record
+        summaries.async_db.add.return_value = mock_created_record
         
         result = await summaries._write_summary_to_ai_schema(
             entity_id, source_type, sources, summary, latency
@@ -99,8 +123,8 @@ class Test_Summaries_Write_To_AI_DB:
         
         assert result == str(mock_created_record.id)
         
-        summaries.db.create.assert_called_once()
-        call_args = summaries.db.create.call_args
+        summaries.async_db.add.assert_called_once()
+        call_args = summaries.async_db.add.call_args
         
         data = call_args[0][1]
         assert data['entity_id'] == entity_id
@@ -128,11 +152,13 @@ class Test_Summaries_Write_To_AI_DB:
         }
         latency = 1.0
         
-        summaries.db.create.side_effect = Exception('Database connection failed')
+        summaries.async_db.add.side_effect = Exception('Database connection failed')
         
         with pytest.raises(Exception, match = 'Database connection failed'):
             await summaries._write_summary_to_ai_schema(
                 entity_id, source_type, sources, summary, latency
             )
         
-        summaries.db.create.assert_called_once()
+        summaries.async_db.add.assert_called_once()
+        summaries.outbox.add.assert_not_called()
+        summaries._mock_db_session.commit.assert_not_called()
@@ -2,11 +2,13 @@ import uuid
 import pytest
 import aiohttp
 import logfire
-from unittest.mock import patch
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
 from aioresponses import aioresponses
 
-from core.summaries.summaries import Summaries
-from core.summaries.types import Source_Type
+from core.summaries.types import Job_Status, Source_Type
+from core.summaries.publisher import publish_summary
+from core.summaries.dispatcher import Summary_Outbox_Dispatcher
 
 
 class Test_Write_Summary_To_Public_Schema:
@@ -14,112 +16,106 @@ class Test_Write_Summary_To_Public_Schema:
         self.supplier_id = str(uuid.uuid4())
         self.base_url = 'http://test-url'
         self.api_key = 'test-api-key'
-
-    @pytest.fixture
-    def summaries_instance(self):
+        self.expected_url = f'{self.base_url}/v1/suppliers/{self.supplier_id}/client-reviews/summary/'
         logfire.configure(send_to_logfire = False)
-        with patch('core.summaries.summaries.LLMFetcher'), \
-             patch('core.summaries.summaries.UsageTracker'), \
-             patch('core.summaries.summaries.BaseDBOperations'), \
-             patch('core.summaries.summaries.logfire'):
-            return Summaries()
-    
+
     @pytest.fixture
-    def mock_summary_data(self):
+    def mock_payload(self):
         return {
+            'supplier_id': self.supplier_id,
             'summary': 'Test hotel summary with positive and negative aspects',
             'positive_tags': ['clean', 'friendly staff', 'good location'],
             'negative_tags': ['noisy', 'expensive', 'small rooms']
         }
-    
+
+    @pytest.fixture
+    def backend_env(self):
+        with patch.dict('os.environ', {
+            'RESTRICTED_BASE_URL': self.base_url,
+            'FORA_PORTAL_BE_API_KEY': self.api_key
+        }):
+            yield
+
     @pytest.mark.asyncio
-    async def test__write_summary_to_public_schema__success(self, summaries_instance, mock_summary_data):
-        summaries_instance.entity_id = self.supplier_id
-        summaries_instance.source_type = Source_Type.CLIENT_SUPPLIER_REVIEWS
-        
-        expected_url = f'{self.base_url}/v1/suppliers/{self.supplier_id}/client-reviews/summary/'
-        
-        expected_payload = {
-            'supplier_id': self.supplier_id,
-            'summary': mock_summary_data['summary'],
-            'positive_tags': mock_summary_data['positive_tags'],
-            'negative_tags': mock_summary_data['negative_tags']
-        }
-        
+    async def test__publish_summary__success(self, backend_env, mock_payload):
         with aioresponses() as m:
-            m.post(expected_url, status = 201)
-            
-            with patch.dict('os.environ', {
-                'RESTRICTED_BASE_URL': self.base_url,
-                'FORA_PORTAL_BE_API_KEY': self.api_key
-            }):
-                await summaries_instance._write_summary_to_public_schema(self.supplier_id, mock_summary_data)
-        
+            m.post(self.expected_url, status = 201)
+            await publish_summary(Source_Type.CLIENT_SUPPLIER_REVIEWS, mock_payload)
+
         request = list(m.requests.values())[0][0]
-        assert request.kwargs['json'] == expected_payload
+        assert request.kwargs['json'] == mock_payload
         assert request.kwargs['headers']['Content-Type'] == 'application/json'
         assert request.kwargs['headers']['XAPIKEY'] == self.api_key
 
-        payload = request.kwargs['json']
-        assert 'supplier_id' in payload
-        assert 'summary' in payload
-        assert 'positive_tags' in payload
-        assert 'negative_tags' in payload
-        assert payload['supplier_id'] == self.supplier_id
-        assert isinstance(payload['positive_tags'], list)
-        assert isinstance(payload['negative_tags'], list)
-        
     @pytest.mark.asyncio
-    async def test__write_summary_to_public_schema__error(self, summaries_instance, mock_summary_data):
-        summaries_instance.entity_id = self.supplier_id
-        summaries_instance.source_type = Source_Type.CLIENT_SUPPLIER_REVIEWS
-        
-        expected_url = f'{self.base_url}/v1/suppliers/{self.supplier_id}/client-reviews/summary/'
-        
+    async def test__publish_summary__error(self, backend_env, mock_payload):
         with aioresponses() as m:
-            m.post(expected_url, status = 500)
-            
-            with patch.dict('os.environ', {
-                'RESTRICTED_BASE_URL': self.base_url,
-                'FORA_PORTAL_BE_API_KEY': self.api_key
-            }):
-                with pytest.raises(aiohttp.ClientResponseError):
-                    await summaries_instance._write_summary_to_public_schema(self.supplier_id, mock_summary_data)
-    
+            m.post(self.expected_url, status = 500)
+            with pytest.raises(aiohttp.ClientResponseError):
+                await publish_summary(Source_Type.CLIENT_SUPPLIER_REVIEWS, mock_payload)
+
     @pytest.mark.asyncio
-    async def test__write_summary_to_public_schema__missing_env_vars(self, summaries_instance, mock_summary_data):
-        summaries_instance.entity_id = self.supplier_id
-        summaries_instance.source_type = Source_Type.CLIENT_SUPPLIER_REVIEWS
-        
-        expected_url = f'{self.base_url}/v1/suppliers/{self.supplier_id}/client-reviews/summary/'
-        
+    async def test__publish_summary__missing_env_vars(self, mock_payload):
         with patch.dict('os.environ', {}, clear=True):
             with pytest.raises(Exception):
-                await summaries_instance._write_summary_to_public_schema(self.supplier_id, mock_summary_data)
-    
+                await publish_summary(Source_Type.CLIENT_SUPPLIER_REVIEWS, mock_payload)
+
+    @pytest.mark.asyncio
+    async def test__publish_summary__invalid_source_type(self, backend_env, mock_payload):
+        with pytest.raises(KeyError):
+            await publish_summary(Source_Type.ADVISOR_REVIEWS, mock_payload)
+
     @pytest.mark.asyncio
-    async def test__write_summary_to_public_schema__empty_tags(self, summaries_instance):
-        summaries_instance.entity_id = self.supplier_id
-        summaries_instance.source_type = Source_Type.CLIENT_SUPPLIER_REVIEWS
-        
-        summary_data_empty_tags = {
+    async def test__publish_summary__empty_tags(self, backend_env):
+        payload = {
+            'supplier_id': self.supplier_id,
             'summary': 'Test summary with no tags',
             'positive_tags': [],
             'negative_tags': None
         }
-        
-        expected_url = f'{self.base_url}/v1/suppliers/{self.supplier_id}/client-reviews/summary/'
-        
+
         with aioresponses() as m:
-            m.post(expected_url, status=200)
-            
-            with patch.dict('os.environ', {
-                'RESTRICTED_BASE_URL': self.base_url,
-                'FORA_PORTAL_BE_API_KEY': self.api_key
-            }):
-                await summaries_instance._write_summary_to_public_schema(self.supplier_id, summary_data_empty_tags)
-        
-        request = list(m.requests.values())[0][0]
-        payload = request.kwargs['json']
+            m.post(self.expected_url, status=200)
+            await publish_summary(Source_Type.CLIENT_SUPPLIER_REVIEWS, payload)
+
+        payload = list(m.requests.values())[0][0].kwargs['json']
         assert payload['positive_tags'] == []
         assert payload['negative_tags'] == None
+
+    @pytest.mark.asyncio
+    async def test__publish_summary__reuses_shared_session(self, backend_env, mock_payload):
+        with aioresponses() as m:
+            m.post(self.expected_url, status = 201, repeat = True)
+            async with aiohttp.ClientSession() as shared_session:
+                with patch('core.summaries.publisher.aiohttp.ClientSession') as mock_session_class:
+                    await publish_summary(Source_Type.CLIENT_SUPPLIER_REVIEWS, mock_payload, shared_session)
+                    await publish_summary(Source_Type.CLIENT_SUPPLIER_REVIEWS, mock_payload, shared_session)
+
+                mock_session_class.assert_not_called()
+                assert not shared_session.closed
+
+        assert len(list(m.requests.values())[0]) == 2
+
+    @pytest.mark.asyncio
+    async def test__dispatch__posts_outbox_payload(self, backend_env, mock_payload):
+        record = MagicMock(
+            id = uuid.uuid4(),
+            summary_id = uuid.uuid4(),
+            entity_id = self.supplier_id,
+            source_type = Source_Type.CLIENT_SUPPLIER_REVIEWS,
+            payload = mock_payload,
+            attempts = 1,
+            run_after = datetime.now(timezone.utc)
+        )
+        with patch('core.summaries.dispatcher.AsyncSessionLocal'), \
+             patch('core.summaries.dispatcher.logfire'):
+            dispatcher = Summary_Outbox_Dispatcher()
+            dispatcher.outbox = MagicMock(mark_published = AsyncMock(), mark_failed = AsyncMock())
+            with aioresponses() as m:
+                m.post(self.expected_url, status = 201)
+                status = await dispatcher.dispatch(record)
+
+        assert status == Job_Status.SUCCEEDED
+        assert list(m.requests.values())[0][0].kwargs['json'] == mock_payload
+        assert dispatcher.outbox.mark_published.call_args[0][1] == record
+        dispatcher.outbox.mark_failed.assert_not_called()
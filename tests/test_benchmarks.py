@@ -0,0 +1,56 @@
+import time
+import asyncio
+import pytest
+
+from benchmarks.stats import percentile, summarize
+from benchmarks.compare import compare
+from benchmarks.probes import EventLoopLagProbe
+
+
+def make_report(p99, rps):
+    return {"results": [{
+        "scenario": "content_enrichment",
+        "concurrency": 8,
+        "latency_ms": {"p50": 10, "p95": 20, "p99": p99},
+        "requests_per_second": rps
+    }]}
+
+
+class TestBenchmarks:
+    """Test suite for the benchmark statistics and comparison"""
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+        assert percentile([], 50) is None
+
+    def test_summarize_in_ms(self):
+        summary = summarize([0.1, 0.2, 0.3])
+        assert summary["count"] == 3
+        assert summary["p50"] == 200
+        assert summary["max"] == 300
+
+    def test_latency_regression(self):
+        rows = compare(make_report(p99=30, rps=100), make_report(p99=40, rps=100), threshold=10)
+        regressed = [row["metric"] for row in rows if row["regressed"]]
+        assert regressed == ["latency p99 ms"]
+
+    def test_throughput_regression(self):
+        rows = compare(make_report(p99=30, rps=100), make_report(p99=30, rps=80), threshold=10)
+        assert [row["metric"] for row in rows if row["regressed"]] == ["requests/sec"]
+
+    def test_no_regression_within_threshold(self):
+        rows = compare(make_report(p99=30, rps=100), make_report(p99=32, rps=95), threshold=10)
+        assert not any(row["regressed"] for row in rows)
+
+    @pytest.mark.asyncio
+    async def test_event_loop_lag_probe_sees_blocking(self):
+        probe = EventLoopLagProbe(interval=0.005)
+        probe.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)  # Blocks the loop
+        await asyncio.sleep(0.02)
+        lags = await probe.stop()
+        assert max(lags) >= 0.04
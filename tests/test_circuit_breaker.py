@@ -0,0 +1,142 @@
+import httpx
+import openai
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from llms.factory import LLMFetcher
+from llms.rate_limiter import RateLimiter
+from llms.retry import RetryPolicy
+from llms.circuit_breaker import CircuitBreaker, CircuitState, get_circuit_breaker
+from utils.latency_tracker import get_latency_window
+
+
+def make_status_error(status_code):
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    response = httpx.Response(status_code, request=request)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    with patch.dict("llms.circuit_breaker._circuit_breakers", clear=True):
+        yield
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = LLMFetcher(provider="openai")
+    fetcher.limiter = RateLimiter(default_tpm=10**9)
+    fetcher.retry_policy = RetryPolicy(max_attempts=1)
+    fetcher.async_client = MagicMock()
+    return fetcher
+
+
+def make_response(model):
+    return MagicMock(model=model, usage=MagicMock(input_tokens=10, output_tokens=10))
+
+
+class TestCircuitBreaker:
+    """Test suite for the per-model circuit breaker"""
+
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker(window_size=10, min_calls=4, failure_rate=0.5)
+        for succeeded in (True, False, True):
+            breaker.record(succeeded, 0.1)
+        assert breaker.allow()
+
+        breaker.record(False, 0.1)
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.allow()
+
+    def test_opens_on_slow_calls(self):
+        breaker = CircuitBreaker(window_size=10, min_calls=2, slow_call_seconds=1, slow_call_rate=0.5)
+        breaker.record(True, 0.1)
+        breaker.record(True, 5)
+        assert breaker.state == CircuitState.OPEN
+
+    def test_half_open_allows_a_single_probe(self):
+        breaker = CircuitBreaker(min_calls=1, cooldown_seconds=0)
+        breaker.record(False, 0.1)
+
+        assert breaker.allow()
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert not breaker.allow()
+
+        breaker.record(True, 0.1)
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(min_calls=1, cooldown_seconds=0)
+        breaker.record(False, 0.1)
+        breaker.allow()
+        breaker.record(False, 0.1)
+        assert breaker.state == CircuitState.OPEN
+
+    def test_released_probe_can_be_retaken(self):
+        breaker = CircuitBreaker(min_calls=1, cooldown_seconds=0)
+        breaker.record(False, 0.1)
+        breaker.allow()
+        breaker.release()
+        assert breaker.allow()
+
+
+class TestModelFallback:
+    """Test suite for LLMFetcher's fallback chain"""
+
+    @pytest.mark.asyncio
+    async def test_falls_back_on_unavailable_model(self, fetcher):
+        fetcher.async_client.responses.create = AsyncMock(side_effect=[make_status_error(503), make_response("gpt-4o-mini")])
+
+        response = await fetcher.create_response(model="gpt-4.1-mini", fallback_models=["gpt-4o-mini"], input="hi")
+
+        assert response.model == "gpt-4o-mini"
+        models = [call.kwargs["model"] for call in fetcher.async_client.responses.create.call_args_list]
+        assert models == ["gpt-4.1-mini", "gpt-4o-mini"]
+
+    @pytest.mark.asyncio
+    async def test_latency_is_recorded_for_the_model_that_answered(self, fetcher):
+        fetcher.async_client.responses.create = AsyncMock(side_effect=[make_status_error(503), make_response("gpt-4o-mini")])
+
+        with patch.dict("utils.latency_tracker._latency_windows", clear=True):
+            await fetcher.create_response(model="gpt-4.1-mini", fallback_models=["gpt-4o-mini"], input="hi")
+
+            assert len(get_latency_window("gpt-4o-mini").samples) == 1
+            assert len(get_latency_window("gpt-4.1-mini").samples) == 0
+
+    @pytest.mark.asyncio
+    async def test_bad_request_does_not_fall_back(self, fetcher):
+        fetcher.async_client.responses.create = AsyncMock(side_effect=make_status_error(400))
+
+        with pytest.raises(openai.APIStatusError):
+            await fetcher.create_response(model="gpt-4.1-mini", fallback_models=["gpt-4o-mini"], input="hi")
+        assert fetcher.async_client.responses.create.call_count == 1
+        assert get_circuit_breaker("gpt-4.1-mini").state == CircuitState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_is_skipped(self, fetcher):
+        get_circuit_breaker("gpt-4.1-mini")._open()
+        fetcher.async_client.responses.create = AsyncMock(return_value=make_response("gpt-4o-mini"))
+
+        await fetcher.create_response(model="gpt-4.1-mini", fallback_models=["gpt-4o-mini"], input="hi")
+
+        fetcher.async_client.responses.create.assert_awaited_once()
+        assert fetcher.async_client.responses.create.call_args.kwargs["model"] == "gpt-4o-mini"
+
+    @pytest.mark.asyncio
+    async def test_primary_is_tried_when_every_circuit_is_open(self, fetcher):
+        get_circuit_breaker("gpt-4.1-mini")._open()
+        get_circuit_breaker("gpt-4o-mini")._open()
+        fetcher.async_client.responses.create = AsyncMock(return_value=make_response("gpt-4.1-mini"))
+
+        response = await fetcher.create_response(model="gpt-4.1-mini", fallback_models=["gpt-4o-mini"], input="hi")
+
+        assert response.model == "gpt-4.1-mini"
+
+    @pytest.mark.asyncio
+    async def test_last_error_is_raised_when_the_chain_is_exhausted(self, fetcher):
+        fetcher.async_client.responses.create = AsyncMock(side_effect=make_status_error(503))
+
+        with pytest.raises(openai.APIStatusError):
+            await fetcher.create_response(model="gpt-4.1-mini", fallback_models=["gpt-4o-mini"], input="hi")
+        assert fetcher.async_client.responses.create.call_count == 2
@@ -0,0 +1,83 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from core.content_enrichment.ContentGenerator import ContentGenerator
+from core.content_enrichment.cache import ResponseCache, InMemoryResponseCache, make_cache_key
+
+
+class TestInMemoryResponseCache:
+    """Test suite for the in-process response cache backend"""
+
+    @pytest.mark.asyncio
+    async def test_get_returns_stored_value(self):
+        cache = InMemoryResponseCache(ttl_seconds=60, max_entries=10)
+        await cache.set("key", {"text": "cached"})
+        assert await cache.get("key") == {"text": "cached"}
+        assert await cache.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_a_miss(self):
+        cache = InMemoryResponseCache(ttl_seconds=60, max_entries=10)
+        with patch("core.content_enrichment.cache.time.monotonic", return_value=1000.0):
+            await cache.set("key", {"text": "cached"})
+        with patch("core.content_enrichment.cache.time.monotonic", return_value=1061.0):
+            assert await cache.get("key") is None
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_entry_is_evicted(self):
+        cache = InMemoryResponseCache(ttl_seconds=60, max_entries=2)
+        await cache.set("a", {"text": "a"})
+        await cache.set("b", {"text": "b"})
+        await cache.get("a")  # "b" is now the least recently used
+        await cache.set("c", {"text": "c"})
+        assert await cache.get("b") is None
+        assert await cache.get("a") == {"text": "a"}
+        assert await cache.get("c") == {"text": "c"}
+
+    def test_incomplete_backend_fails_on_creation(self):
+        class GetOnlyCache(ResponseCache):
+            async def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnlyCache()
+
+    def test_cache_key_depends_on_every_input(self):
+        base = make_cache_key("gpt-4.1-mini", "instructions", "prompt", "html")
+        assert base == make_cache_key("gpt-4.1-mini", "instructions", "prompt", "html")
+        assert base != make_cache_key("gpt-4.1", "instructions", "prompt", "html")
+        assert base != make_cache_key("gpt-4.1-mini", "other", "prompt", "html")
+        assert base != make_cache_key("gpt-4.1-mini", "instructions", "other", "html")
+        assert base != make_cache_key("gpt-4.1-mini", "instructions", "prompt", "text")
+
+
+class TestContentGeneratorCache:
+    """Test suite for the cache in front of ContentGenerator.generate"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_request_is_served_from_cache(self, elaborate_request_html, mock_llm_fetcher):
+        first = ContentGenerator(elaborate_request_html)
+        assert await first.generate() == ("Test generated content", "gpt-4.1-mini", Decimal('0.4016'))
+
+        second = ContentGenerator(elaborate_request_html)
+        response_text, model, cost = await second.generate()
+
+        mock_llm_fetcher.async_client.responses.create.assert_called_once()
+        assert second.cache_hit
+        assert response_text == "Test generated content"
+        assert model == "gpt-4.1-mini"
+        assert cost == Decimal('0')
+
+    @pytest.mark.asyncio
+    async def test_bypass_cache_calls_the_model(self, elaborate_request_html, mock_llm_fetcher):
+        await ContentGenerator(elaborate_request_html).generate()
+
+        elaborate_request_html.bypass_cache = True
+        generator = ContentGenerator(elaborate_request_html)
+        _, _, cost = await generator.generate()
+
+        assert mock_llm_fetcher.async_client.responses.create.call_count == 2
+        assert not generator.cache_hit
+        assert cost == Decimal('0.4016')
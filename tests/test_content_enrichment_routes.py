@@ -1,5 +1,11 @@
+import json
 import uuid
-from core.content_enrichment.models import Function
+from datetime import datetime, timezone
+from unittest.mock import patch, AsyncMock, MagicMock
+from sqlalchemy.exc import DBAPIError
+from app.v1.routes import content_enrichment as content_enrichment_routes
+from core.content_enrichment import rollup
+from core.content_enrichment.models import Function, RollupWatermark
 
 # Test data
 VALID_GENERATE_REQUEST = {
@@ -56,6 +62,21 @@ def test_create_content_missing_required_field(test_client, mock_llm_fetcher, mo
     assert response.status_code == 400
     assert "Invalid request: Missing required field: user_instructions" in response.json()["detail"]
 
+def test_create_content_invalid_enum_in_db(test_client, mock_llm_fetcher):
+    """Test that Postgres rejecting an enum value (asyncpg SQLSTATE 22P02) is a 400, not a 500"""
+    orig = Exception("invalid input value for enum ai.content_function")
+    orig.sqlstate = "22P02"
+    error = DBAPIError("INSERT INTO ai.content_enrichment_response ...", {}, orig)
+    with patch.object(content_enrichment_routes.content_db, "create", AsyncMock(side_effect=error)):
+        response = test_client.post("/v1/content-enrichment/", json=VALID_GENERATE_REQUEST)
+    assert response.status_code == 400
+    assert "Invalid function value" in response.json()["detail"]
+
+def test_accept_content_malformed_id(test_client):
+    """Test that an id that isn't a UUID is rejected before reaching the database"""
+    response = test_client.post("/v1/content-enrichment/not-a-uuid/accept")
+    assert response.status_code == 400
+
 def test_accept_content_success(test_client, test_db, mock_llm_fetcher, mock_llm_response):
     """Test successful content acceptance"""
     # First create some content
@@ -77,3 +98,102 @@ def test_accept_content_not_found(test_client):
     response = test_client.post(f"/v1/content-enrichment/{non_existent_id}/accept")
     assert response.status_code == 404
     assert f"Content with ID {non_existent_id} not found" in response.json()["detail"]
+
+def test_create_content_stream_success(test_client, mock_llm_fetcher, mock_llm_stream):
+    """Test streaming content creation emits deltas then a done event with the stored id"""
+    mock_llm_fetcher.async_client.responses.create.return_value = mock_llm_stream()
+    response = test_client.post("/v1/content-enrichment/stream", json=VALID_GENERATE_REQUEST)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    names = [lines[0].removeprefix("event: ") for lines in events]
+    payloads = [json.loads(lines[1].removeprefix("data: ")) for lines in events]
+    assert names == ["delta", "delta", "done"]
+    assert "".join(p["text"] for p in payloads[:-1]) == "Test generated content"
+    assert payloads[-1]["text"] == "Test generated content"
+    assert isinstance(payloads[-1]["id"], str)
+
+def test_create_content_stream_invalid_function(test_client):
+    """Test streaming content creation validates the request before streaming"""
+    response = test_client.post("/v1/content-enrichment/stream", json=INVALID_FUNCTION_REQUEST)
+    assert response.status_code == 400
+
+def test_create_content_batch_success(test_client, mock_llm_fetcher):
+    """Test batch content creation returns one stored result per item, in order"""
+    polish_request = {
+        "metadata": {"block_id": "test-block-2"},
+        "output_format": "text",
+        "polish": {"existing_text": "Existing content"}
+    }
+    response = test_client.post("/v1/content-enrichment/batch", json={"items": [VALID_GENERATE_REQUEST, polish_request]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["index"] for r in results] == [0, 1]
+    assert all(r["text"] == "Test generated content" and r["error"] is None for r in results)
+    assert len({r["id"] for r in results}) == 2
+    assert mock_llm_fetcher.async_client.responses.create.call_count == 2
+
+def test_create_content_batch_item_errors(test_client, mock_llm_fetcher):
+    """Test a failing item is reported in place without failing the batch"""
+    mock_llm_fetcher.async_client.responses.create.side_effect = Exception("LLM unavailable")
+    response = test_client.post("/v1/content-enrichment/batch", json={"items": [VALID_GENERATE_REQUEST]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 1
+    assert results[0]["id"] is None
+    assert "Content enrichment failed" in results[0]["error"]
+
+def test_create_content_batch_insert_fallback(test_client, mock_llm_fetcher):
+    """Test a failed bulk insert falls back to per-item inserts and keeps the generated text of unstored items"""
+    stored = MagicMock(id=uuid.uuid4(), ai_response="Test generated content")
+    with patch.object(content_enrichment_routes.content_db, "create_many", AsyncMock(side_effect=Exception("bulk insert failed"))), \
+        patch.object(content_enrichment_routes.content_db, "create", AsyncMock(side_effect=[stored, Exception("insert failed")])):
+        response = test_client.post("/v1/content-enrichment/batch", json={"items": [VALID_GENERATE_REQUEST, VALID_GENERATE_REQUEST]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["id"] == str(stored.id)
+    assert results[0]["error"] is None
+    assert results[1]["id"] is None
+    assert results[1]["text"] == "Test generated content"
+    assert "could not be stored" in results[1]["error"]
+
+def test_create_content_batch_empty(test_client):
+    """Test an empty batch is rejected"""
+    response = test_client.post("/v1/content-enrichment/batch", json={"items": []})
+    assert response.status_code == 400
+
+def test_content_stats_success(test_client, test_db, mock_llm_fetcher):
+    """Test that stored content shows up in the stats once the rollup is refreshed"""
+    response = test_client.post("/v1/content-enrichment/", json=VALID_GENERATE_REQUEST)
+    assert response.status_code == 200
+
+    # A backfilled rollup, refreshed on every request without leaving the rows just written for the next refresh
+    test_db.merge(RollupWatermark(name=rollup.ROLLUP_NAME, watermark=datetime(2000, 1, 1, tzinfo=timezone.utc)))
+    test_db.commit()
+    with patch.object(rollup, "CONTENT_STATS_REFRESH_INTERVAL_SECONDS", 0), \
+        patch.object(rollup, "CONTENT_STATS_REFRESH_LAG_SECONDS", 0):
+        response = test_client.get("/v1/content-enrichment/stats", params={"bucket": "hour", "group_by": ["function", "model"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["refreshed_through"] is not None
+    rows = [row for row in data["rows"] if row["function"] == Function.GENERATE.value and row["model"] == "gpt-4.1-mini"]
+    assert rows
+    assert rows[-1]["requests"] >= 1
+    assert rows[-1]["latency_ms_p50"] is not None
+
+def test_content_stats_cold_rollup(test_client):
+    """Test that a rollup that was never backfilled is served as is, not refreshed from the request"""
+    with patch.object(rollup, "get_watermark", AsyncMock(return_value=None)), \
+        patch.object(rollup, "refresh_rollup", AsyncMock()) as refresh, \
+        patch.object(content_enrichment_routes, "query_stats", AsyncMock(return_value=[])):
+        response = test_client.get("/v1/content-enrichment/stats")
+    assert response.status_code == 200
+    assert response.json()["refreshed_through"] is None
+    assert response.json()["rows"] == []
+    refresh.assert_not_called()
+
+def test_content_stats_invalid_range(test_client):
+    """Test that a range ending before it starts is rejected"""
+    response = test_client.get("/v1/content-enrichment/stats", params={"since": "2025-07-02T00:00:00Z", "until": "2025-07-01T00:00:00Z"})
+    assert response.status_code == 400
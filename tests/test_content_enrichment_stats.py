@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from core.content_enrichment.rollup import (
+    LATENCY_BUCKETS_MS, HISTOGRAM_SIZE, histogram_percentile, build_stats_query, _stats_row
+)
+
+
+def histogram(**slots):
+    counts = [0] * HISTOGRAM_SIZE
+    for slot, count in slots.items():
+        counts[int(slot.removeprefix("slot"))] = count
+    return counts
+
+
+class TestContentEnrichmentStats:
+    """Test suite for the content enrichment rollup queries and percentile estimates"""
+
+    def test_percentile_interpolates_inside_bucket(self):
+        # 10 rows in [0, 100), 10 in [100, 250)
+        counts = histogram(slot0=10, slot1=10)
+        assert histogram_percentile(counts, 50) == 100
+        assert histogram_percentile(counts, 25) == 50
+        assert histogram_percentile(counts, 95) == 235
+
+    def test_percentile_open_ended_bucket(self):
+        counts = histogram(slot0=1, **{f"slot{len(LATENCY_BUCKETS_MS)}": 99})
+        assert histogram_percentile(counts, 95) == LATENCY_BUCKETS_MS[-1]
+
+    def test_percentile_empty(self):
+        assert histogram_percentile(histogram(), 50) is None
+
+    def test_stats_query_groups_by_position(self):
+        query = build_stats_query("week", ["model"], "polish")
+        assert "date_trunc('week', bucket AT TIME ZONE 'UTC') AS period" in query
+        assert "ai_model AS model" in query
+        assert "function = :function" in query
+        assert "GROUP BY 1, 2" in query
+        assert f"latency_histogram[{HISTOGRAM_SIZE}]" in query
+
+    def test_stats_query_rejects_unknown_bucket_and_dimension(self):
+        with pytest.raises(ValueError):
+            build_stats_query("minute", ["function"])
+        with pytest.raises(ValueError):
+            build_stats_query("day", ["output_format"])
+
+    def test_stats_row(self):
+        row = SimpleNamespace(
+            period=datetime(2025, 7, 1),
+            tone="",
+            requests=4,
+            accepted=1,
+            failed=0,
+            latency_count=4,
+            latency_sum_ms=Decimal(1000),
+            cost_usd=Decimal("0.0123"),
+            latency_histogram=histogram(slot1=2, slot2=2)
+        )
+        stats = _stats_row(row, ["tone"])
+        assert stats["period"] == datetime(2025, 7, 1, tzinfo=timezone.utc)
+        # The rollup keys a missing tone as ''
+        assert stats["tone"] is None
+        assert stats["acceptance_rate"] == 0.25
+        assert stats["latency_ms_mean"] == 250.0
+        assert stats["latency_ms_p50"] == 250.0
+        assert stats["cost_usd"] == 0.0123
@@ -95,3 +95,17 @@ class TestContentGenerator:
         assert response_text == "Test generated content"
         assert model == "gpt-4.1-mini"
         assert cost == Decimal('0.4016')
+
+    @pytest.mark.asyncio
+    async def test_stream_elaborate(self, elaborate_request_html, mock_llm_fetcher, mock_llm_stream):
+        """Test streaming yields deltas and exposes the final result"""
+        mock_llm_fetcher.async_client.responses.create.return_value = mock_llm_stream()
+        generator = ContentGenerator(elaborate_request_html)
+
+        deltas = [delta async for delta in generator.stream()]
+
+        call_args = mock_llm_fetcher.async_client.responses.create.call_args[1]
+        assert call_args['stream'] is True
+        assert call_args['instructions'] == f"{ELABORATE_INSTRUCTIONS}\n\n{MARKDOWN_INSTRUCTIONS}"
+        assert deltas == ["Test generated ", "content"]
+        assert generator.result == ("Test generated content", "gpt-4.1-mini", Decimal('0.4016'))
@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from core.content_enrichment.ContentGenerator import ContentGenerator
+from core.content_enrichment.hedging import hedged
+from utils.latency_tracker import LatencyWindow
+
+
+def delayed(seconds, result=None, error=None):
+    async def call():
+        await asyncio.sleep(seconds)
+        if error:
+            raise error
+        return result
+    return call
+
+
+class TestHedged:
+    """Test suite for the hedged call helper"""
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self):
+        calls = []
+
+        async def call():
+            calls.append(1)
+            return "primary"
+
+        assert await hedged(call, delay=1) == ("primary", None, None)
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_loser_cancelled(self):
+        started = []
+
+        async def call():
+            started.append(asyncio.current_task())
+            await asyncio.sleep(1 if len(started) == 1 else 0)
+            return f"call {len(started)}"
+
+        result, winner, loser_result = await hedged(call, delay=0.01)
+
+        assert (winner, loser_result) == ("hedge", None)
+        await asyncio.sleep(0)
+        assert started[0].cancelled()
+
+    @pytest.mark.asyncio
+    async def test_caller_cancelled_before_hedge_cancels_primary(self):
+        started = []
+
+        async def call():
+            started.append(asyncio.current_task())
+            await asyncio.sleep(1)
+
+        caller = asyncio.create_task(hedged(call, delay=0.5))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+        await asyncio.sleep(0)
+        assert len(started) == 1
+        assert started[0].cancelled()
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_to_hedge(self):
+        calls = iter([delayed(0.05, error=RuntimeError("primary failed")), delayed(0.1, result="hedge")])
+
+        result, winner, _ = await hedged(lambda: next(calls)(), delay=0.01)
+
+        assert (result, winner) == ("hedge", "hedge")
+
+    @pytest.mark.asyncio
+    async def test_every_call_failing_raises(self):
+        with pytest.raises(RuntimeError):
+            await hedged(delayed(0.02, error=RuntimeError("down")), delay=0.01)
+
+    def test_latency_window_percentile(self):
+        window = LatencyWindow(size=100, min_samples=10)
+        for latency in range(5):
+            window.add(latency)
+        assert window.percentile(0.95) is None
+
+        for latency in range(100):
+            window.add(latency / 100)
+        assert window.percentile(0.95) == 0.95
+
+
+class TestContentGeneratorHedging:
+    """Test suite for hedging in ContentGenerator"""
+
+    @pytest.mark.asyncio
+    async def test_hedge_cost_is_recorded(self, elaborate_request_html, mock_llm_fetcher, mock_llm_response):
+        slow_then_fast = iter([1, 0])
+
+        async def create(**kwargs):
+            await asyncio.sleep(next(slow_then_fast))
+            return mock_llm_response
+
+        mock_llm_fetcher.async_client.responses.create.side_effect = create
+        generator = ContentGenerator(elaborate_request_html)
+        generator.hedge_enabled = True
+
+        with patch("core.content_enrichment.ContentGenerator.hedge_delay", return_value=0.01):
+            response_text, _, cost = await generator.generate()
+
+        assert response_text == "Test generated content"
+        assert cost == Decimal('0.8032')
+        assert generator.metadata["hedge"] == {
+            "delay_seconds": 0.01,
+            "winner": "hedge",
+            "cost_usd": 0.4016,
+            "cost_estimated": True
+        }
+
+    @pytest.mark.asyncio
+    async def test_hedging_is_off_by_default(self, elaborate_request_html, mock_llm_fetcher):
+        generator = ContentGenerator(elaborate_request_html)
+        _, _, cost = await generator.generate()
+
+        assert not generator.hedge_enabled
+        assert cost == Decimal('0.4016')
+        assert generator.metadata == {}
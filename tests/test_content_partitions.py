@@ -0,0 +1,46 @@
+from datetime import date
+
+from core.content_enrichment.partitions import (
+    add_months, partition_name, upper_bound, months_to_create, partitions_to_detach
+)
+
+
+class TestContentPartitions:
+    """Test suite for planning the monthly partitions of content_enrichment_response"""
+
+    def test_add_months_across_years(self):
+        assert add_months(date(2025, 11, 15), 3) == date(2026, 2, 1)
+        assert add_months(date(2025, 1, 31), -1) == date(2024, 12, 1)
+
+    def test_partition_name(self):
+        assert partition_name(date(2025, 9, 1)) == "content_enrichment_response_p2025_09"
+
+    def test_upper_bound(self):
+        assert upper_bound("FOR VALUES FROM (MINVALUE) TO ('2025-09-01 00:00:00+00')") == date(2025, 9, 1)
+        # Rendered in the session time zone
+        assert upper_bound("FOR VALUES FROM ('2025-09-01 02:00:00+02') TO ('2025-10-01 02:00:00+02')") == date(2025, 10, 1)
+        assert upper_bound("FOR VALUES FROM ('2025-09-01 00:00:00+00') TO (MAXVALUE)") is None
+
+    def test_months_to_create_continue_after_last_partition(self):
+        partitions = [
+            ("content_enrichment_response_legacy", date(2025, 9, 1)),
+            ("content_enrichment_response_p2025_09", date(2025, 10, 1)),
+        ]
+        assert months_to_create(partitions, date(2025, 9, 20), 2) == [date(2025, 10, 1), date(2025, 11, 1)]
+        assert months_to_create(partitions, date(2025, 8, 20), 2) == [date(2025, 10, 1)]
+        assert months_to_create(partitions, date(2025, 8, 20), 1) == []
+
+    def test_months_to_create_without_partitions(self):
+        assert months_to_create([], date(2025, 12, 5), 1) == [date(2025, 12, 1), date(2026, 1, 1)]
+
+    def test_partitions_to_detach(self):
+        partitions = [
+            ("content_enrichment_response_legacy", date(2024, 9, 1)),
+            ("content_enrichment_response_p2024_09", date(2024, 10, 1)),
+            ("content_enrichment_response_p2024_10", date(2024, 11, 1)),
+        ]
+        # 12 full months before October 2025 start in October 2024
+        assert partitions_to_detach(partitions, date(2025, 10, 3), 12) == [
+            "content_enrichment_response_legacy", "content_enrichment_response_p2024_09"
+        ]
+        assert partitions_to_detach(partitions, date(2025, 10, 3), 0) == []
@@ -0,0 +1,60 @@
+import io
+import csv
+from types import SimpleNamespace
+
+from analytics.cost import build_query, result_row, flatten, write_report
+
+
+def make_row(**values):
+    row = {
+        "rows": 3, "acceptance_known": 3, "accepted": 2,
+        "cost_total": 0.06, "cost_mean": 0.02, "cost_percentiles": [0.02, 0.03, 0.03],
+        "latency_mean": 200.0, "latency_percentiles": [200.0, 300.0, 300.0]
+    }
+    return SimpleNamespace(**{**row, **values})
+
+
+class TestCostAnalytics:
+    """Test suite for the grouped cost analytics"""
+
+    def test_group_result(self):
+        result = result_row(make_row(function="paraphrase", model="gpt-4.1"), ["function", "model"])
+        assert (result["function"], result["model"]) == ("paraphrase", "gpt-4.1")
+        assert result["rows"] == 3
+        assert result["accepted"] == 2
+        assert result["acceptance_rate"] == 0.6667
+        assert result["cost_usd"] == {"total": 0.06, "mean": 0.02, "p50": 0.02, "p95": 0.03, "p99": 0.03}
+        assert result["latency_ms"] == {"mean": 200.0, "p50": 200.0, "p95": 300.0, "p99": 300.0}
+
+    def test_nulls_are_left_out_of_measures(self):
+        row = make_row(tone=None, rows=2, acceptance_known=0, accepted=0, cost_total=0, cost_mean=None, cost_percentiles=None)
+        result = result_row(row, ["tone"])
+        assert result["tone"] is None
+        assert result["cost_usd"]["total"] == 0
+        assert result["cost_usd"]["mean"] is None
+        assert result["cost_usd"]["p95"] is None
+        # Summaries have no acceptance
+        assert result["accepted"] is None
+        assert result["acceptance_rate"] is None
+
+    def test_query_aggregates_in_postgres(self):
+        query = build_query("content_enrichment", ["tone", "day"])
+        assert "tone AS tone" in query
+        assert "ai_model" not in query
+        # Nearest-rank percentiles, computed per group by Postgres
+        assert "percentile_disc(ARRAY[0.5, 0.95, 0.99]::float8[]) WITHIN GROUP (ORDER BY latency_ms)" in query
+        assert query.endswith("GROUP BY 1, 2 ORDER BY 1 NULLS FIRST, 2 NULLS FIRST")
+
+    def test_query_without_group_by(self):
+        query = build_query("summaries", [])
+        assert query.startswith("SELECT count(*) AS rows")
+        assert "GROUP BY" not in query
+
+    def test_csv_report(self):
+        results = [result_row(make_row(day="2026-10-01", cost_total=0.5), ["day"])]
+        output = io.StringIO()
+        write_report({"results": results}, output, "csv")
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        assert rows[0]["day"] == "2026-10-01"
+        assert rows[0]["cost_usd_total"] == "0.5"
+        assert set(flatten(results[0])) >= {"latency_ms_p95", "acceptance_rate"}
@@ -0,0 +1,110 @@
+import time
+import pytest
+from unittest.mock import patch
+
+import settings
+from llms.factory import LLMFetcher
+from llms.rate_limiter import RateLimiter
+from llms.providers import OpenAIProvider, get_provider
+from llms.fake_provider import FakeProvider, LatencyModel
+from core.summaries.types import Summary_With_Tags
+from utils.usage_tracker import UsageTracker
+
+
+@pytest.fixture
+def fake_provider():
+    return FakeProvider(latency=LatencyModel("constant", 0), output_tokens=50)
+
+
+class TestProviders:
+    """Test suite for the LLM provider registry"""
+
+    def test_openai_clients_are_created_lazily(self):
+        provider = OpenAIProvider()
+        assert provider._client is None and provider._async_client is None
+        assert provider.async_client is provider.async_client
+
+    def test_fetcher_does_not_create_clients(self):
+        with patch("llms.factory.get_provider", return_value=OpenAIProvider()):
+            fetcher = LLMFetcher(provider="openai")
+        assert fetcher.provider._client is None and fetcher.provider._async_client is None
+        assert fetcher.async_client is fetcher.provider.async_client
+
+    def test_fake_provider_needs_no_openai_key(self):
+        with patch("settings.LLM_PROVIDER", "fake"), patch("settings.OPENAI_API_KEY", None):
+            settings.validate_environment()
+        with patch("settings.LLM_PROVIDER", "openai"), patch("settings.OPENAI_API_KEY", None):
+            with pytest.raises(ValueError):
+                settings.validate_environment()
+
+    def test_unknown_provider(self):
+        with pytest.raises(ValueError):
+            get_provider("nope")
+
+    def test_providers_are_shared(self):
+        assert get_provider("fake") is get_provider("fake")
+
+
+class TestFakeProvider:
+    """Test suite for the offline fake provider"""
+
+    @pytest.mark.asyncio
+    async def test_same_request_same_text(self, fake_provider):
+        request = {"model": "gpt-4.1-mini", "instructions": "Polish", "input": "Some text"}
+        first = await fake_provider.async_client.responses.create(**request)
+        second = await fake_provider.async_client.responses.create(**request)
+        other = await fake_provider.async_client.responses.create(**{**request, "input": "Other text"})
+
+        assert first.output_text == second.output_text
+        assert first.output_text != other.output_text
+        assert first.model == "gpt-4.1-mini"
+
+    @pytest.mark.asyncio
+    async def test_usage_can_be_priced(self, fake_provider):
+        response = await fake_provider.async_client.responses.create(model="gpt-4.1-mini", input="x" * 400)
+
+        assert response.usage.input_tokens == 100
+        assert response.usage.total_tokens == response.usage.input_tokens + response.usage.output_tokens
+        assert UsageTracker().track_response(response.model, response.usage)["cost"] > 0
+
+    @pytest.mark.asyncio
+    async def test_structured_output(self, fake_provider):
+        response = await fake_provider.async_client.responses.parse(
+            model="gpt-4.1", input="reviews", text_format=Summary_With_Tags
+        )
+
+        assert isinstance(response.output_parsed, Summary_With_Tags)
+        assert response.output_parsed.summary
+        assert response.output_parsed.positive_tags
+
+    @pytest.mark.asyncio
+    async def test_stream(self, fake_provider):
+        stream = await fake_provider.async_client.responses.create(stream=True, model="gpt-4.1-mini", input="hi")
+        events = [event async for event in stream]
+
+        text = "".join(event.delta for event in events if event.type == "response.output_text.delta")
+        assert events[-1].type == "response.completed"
+        assert text == events[-1].response.output_text
+
+    @pytest.mark.asyncio
+    async def test_latency_is_applied(self):
+        provider = FakeProvider(latency=LatencyModel("constant", 0.05))
+        start_time = time.monotonic()
+        await provider.async_client.responses.create(model="gpt-4.1-mini", input="hi")
+        assert time.monotonic() - start_time >= 0.05
+
+    def test_latency_distributions_are_seeded(self):
+        samples = [LatencyModel("lognormal", 1.0, 0.5, seed=7).sample() for _ in range(2)]
+        assert samples[0] == samples[1]
+        assert 0.9 <= LatencyModel("uniform", 1.0, 0.1).sample() <= 1.1
+        with pytest.raises(ValueError):
+            LatencyModel("bimodal")
+
+    @pytest.mark.asyncio
+    async def test_fetcher_with_fake_provider(self):
+        fetcher = LLMFetcher(provider="fake")
+        fetcher.async_client = FakeProvider(latency=LatencyModel("constant", 0)).async_client
+        fetcher.limiter = RateLimiter()
+
+        response = await fetcher.create_response(model="gpt-4.1-mini", input="hi")
+        assert response.output_text
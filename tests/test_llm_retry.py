@@ -0,0 +1,85 @@
+import time
+import httpx
+import asyncio
+import openai
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from llms.retry import RetryPolicy, is_retryable, get_retry_after
+
+
+def make_status_error(status_code, headers=None, code=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    body = {"code": code} if code else None
+    return openai.APIStatusError("error", response=response, body=body)
+
+
+class TestRetryPolicy:
+    """Test suite for the LLM retry policy"""
+
+    @pytest.mark.asyncio
+    async def test_transient_error_is_retried(self):
+        func = AsyncMock(side_effect=[make_status_error(503), "response"])
+        policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001)
+
+        assert await policy.call(func) == "response"
+        assert func.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_error_is_raised_immediately(self):
+        func = AsyncMock(side_effect=make_status_error(400))
+        policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+
+        with pytest.raises(openai.APIStatusError):
+            await policy.call(func)
+        assert func.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self):
+        func = AsyncMock(side_effect=make_status_error(500))
+        policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001)
+
+        with pytest.raises(openai.APIStatusError):
+            await policy.call(func)
+        assert func.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_waits_for_retry_after(self):
+        func = AsyncMock(side_effect=[make_status_error(429, {"retry-after-ms": "250"}), "response"])
+        policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+
+        with patch("llms.retry.asyncio.sleep", AsyncMock()) as mock_sleep:
+            assert await policy.call(func) == "response"
+        mock_sleep.assert_awaited_once_with(0.25)
+
+    @pytest.mark.asyncio
+    async def test_no_retry_past_the_deadline(self):
+        func = AsyncMock(side_effect=make_status_error(429, {"retry-after": "10"}))
+        policy = RetryPolicy(max_attempts=5)
+
+        with pytest.raises(openai.APIStatusError):
+            await policy.call(func, deadline=time.monotonic() + 1)
+        assert func.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_attempt_is_cut_off_at_the_deadline(self):
+        async def slow():
+            await asyncio.sleep(5)
+
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await RetryPolicy(max_attempts=3, base_delay=0.001).call(slow, deadline=time.monotonic() + 0.05)
+        assert time.monotonic() - start < 1
+
+    def test_error_classification(self):
+        assert is_retryable(make_status_error(429))
+        assert is_retryable(make_status_error(502))
+        assert not is_retryable(make_status_error(401))
+        assert not is_retryable(make_status_error(429, code="insufficient_quota"))
+        assert not is_retryable(ValueError("bad input"))
+
+    def test_retry_after_header_formats(self):
+        assert get_retry_after(make_status_error(429, {"retry-after": "2"})) == 2.0
+        assert get_retry_after(make_status_error(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+        assert get_retry_after(make_status_error(429)) is None
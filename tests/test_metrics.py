@@ -0,0 +1,95 @@
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+
+from app.main import app
+from settings import API_KEY
+from utils import UsageTracker
+from utils.metrics import Counter, Gauge, Histogram, LLM_TOKENS, LLM_COST, LLM_REQUEST_DURATION
+
+
+class TestMetrics:
+    """Test suite for the process-wide metrics registry"""
+
+    def test_counter_and_gauge_render(self):
+        counter = Counter("test_total", "A counter", ("model",))
+        counter.inc(model="gpt-4.1")
+        counter.inc(2, model="gpt-4.1")
+        gauge = Gauge("test_in_flight", "A gauge")
+        gauge.inc()
+        gauge.dec()
+
+        assert counter.get(model="gpt-4.1") == 3
+        assert 'test_total{model="gpt-4.1"} 3.0' in counter.render()
+        assert "# TYPE test_in_flight gauge" in gauge.render()
+        with pytest.raises(ValueError):
+            counter.inc(-1, model="gpt-4.1")
+        with pytest.raises(ValueError):
+            counter.inc(function="generate")
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_seconds", "A histogram", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+
+        rendered = histogram.render()
+        assert 'test_seconds_bucket{le="0.1"} 1' in rendered
+        assert 'test_seconds_bucket{le="1.0"} 2' in rendered
+        assert 'test_seconds_bucket{le="+Inf"} 3' in rendered
+        assert "test_seconds_count 3" in rendered
+        assert histogram.get() == (3, 5.55)
+
+    def test_label_values_are_escaped(self):
+        counter = Counter("test_escaped_total", "A counter", ("route",))
+        counter.inc(route='a"b')
+        assert 'route="a\\"b"' in counter.render()
+
+    def test_usage_tracker_feeds_process_totals(self):
+        usage = SimpleNamespace(
+            input_tokens=1000, output_tokens=100,
+            input_tokens_details=SimpleNamespace(cached_tokens=200)
+        )
+        before_input = LLM_TOKENS.get(model="gpt-4.1-mini", function="test", type="input")
+        before_cached = LLM_TOKENS.get(model="gpt-4.1-mini", function="test", type="cached_input")
+        before_cost = LLM_COST.get(model="gpt-4.1-mini", function="test")
+
+        # Two trackers, as every ContentGenerator and Summaries builds its own
+        for _ in range(2):
+            UsageTracker(function="test").track_response("gpt-4.1-mini", usage)
+
+        assert LLM_TOKENS.get(model="gpt-4.1-mini", function="test", type="input") - before_input == 1600
+        assert LLM_TOKENS.get(model="gpt-4.1-mini", function="test", type="cached_input") - before_cached == 400
+        assert LLM_COST.get(model="gpt-4.1-mini", function="test") > before_cost
+
+    def test_unpriced_model_tokens_are_counted(self):
+        usage = SimpleNamespace(input_tokens=1000, output_tokens=100, input_tokens_details=None)
+        before_output = LLM_TOKENS.get(model="unpriced-model", function="test", type="output")
+
+        breakdown = UsageTracker(function="test").track_response("unpriced-model", usage)
+
+        assert breakdown["cost"] is None
+        assert LLM_TOKENS.get(model="unpriced-model", function="test", type="output") - before_output == 100
+        assert LLM_COST.get(model="unpriced-model", function="test") == 0
+
+    @pytest.mark.asyncio
+    async def test_llm_latency_is_recorded(self, generate_request_html, mock_llm_fetcher):
+        from core.content_enrichment.ContentGenerator import ContentGenerator
+        count_before, _ = LLM_REQUEST_DURATION.get(model="gpt-4.1-mini", outcome="success")
+
+        await ContentGenerator(generate_request_html).generate()
+
+        count_after, _ = LLM_REQUEST_DURATION.get(model="gpt-4.1-mini", outcome="success")
+        assert count_after == count_before + 1
+
+    def test_metrics_endpoint(self):
+        client = TestClient(app, headers={"Authorization": f"Bearer {API_KEY}"})
+        client.get("/status")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",route="/status",status="200"}' in response.text
+        assert 'db_pool_connections{pool="sync",state="checkedout"}' in response.text
+
+    def test_metrics_endpoint_requires_api_key(self):
+        assert TestClient(app).get("/metrics").status_code == 401
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from llms.rate_limiter import RateLimiter, Priority, TokenBucket, estimate_request_tokens
+
+
+class TestRateLimiter:
+    """Test suite for the shared LLM concurrency / rate limiter"""
+
+    @pytest.mark.asyncio
+    async def test_interactive_waiters_go_first(self):
+        limiter = RateLimiter(max_concurrency=1, default_rpm=1000, default_tpm=10**6)
+        order = []
+
+        async def call(name, priority):
+            async with limiter.acquire("gpt-4.1-mini", 10, priority):
+                order.append(name)
+
+        async with limiter.acquire("gpt-4.1-mini", 10, Priority.BACKGROUND):
+            background = asyncio.create_task(call("background", Priority.BACKGROUND))
+            await asyncio.sleep(0)
+            interactive = asyncio.create_task(call("interactive", Priority.INTERACTIVE))
+            await asyncio.sleep(0)
+        await asyncio.gather(background, interactive)
+
+        assert order == ["interactive", "background"]
+        assert limiter.active == 0
+
+    @pytest.mark.asyncio
+    async def test_requests_per_minute_budget_blocks(self):
+        limiter = RateLimiter(max_concurrency=10, default_rpm=2, default_tpm=10**6, share=1)
+        for _ in range(2):
+            async with limiter.acquire("gpt-4.1", 10):
+                pass
+
+        with pytest.raises(asyncio.TimeoutError):
+            async with asyncio.timeout(0.05):
+                async with limiter.acquire("gpt-4.1", 10):
+                    pass
+        # Other models have their own budget
+        async with limiter.acquire("gpt-4.1-mini", 10):
+            pass
+        assert limiter.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_a_slot(self):
+        limiter = RateLimiter(max_concurrency=1, default_rpm=1000, default_tpm=10**6)
+        async with limiter.acquire("gpt-4.1-mini", 10):
+            waiter = asyncio.create_task(limiter.acquire("gpt-4.1-mini", 10).__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+
+        async with limiter.acquire("gpt-4.1-mini", 10):
+            assert limiter.active == 1
+
+    @pytest.mark.asyncio
+    async def test_actual_usage_corrects_the_token_budget(self):
+        limiter = RateLimiter(default_tpm=1000, share=1)
+        async with limiter.acquire("gpt-4.1-mini", 100) as lease:
+            lease.record_usage(MagicMock(total_tokens=600))
+        _, tokens_bucket = limiter._buckets_for("gpt-4.1-mini")
+        assert 399 <= tokens_bucket.level <= 401
+
+    def test_share_scales_every_limit(self):
+        limiter = RateLimiter(default_rpm=500, default_tpm=200000, model_limits={"gpt-4.1": {"rpm": 10}}, share=0.3)
+        requests_bucket, tokens_bucket = limiter._buckets_for("gpt-4.1-mini")
+        assert (requests_bucket.capacity, tokens_bucket.capacity) == (150, 60000)
+        assert limiter._buckets_for("gpt-4.1")[0].capacity == 3
+
+    def test_token_bucket_wait_time(self):
+        bucket = TokenBucket(per_minute=60)
+        bucket.consume(60)
+        assert 0.9 <= bucket.wait_time(1) <= 1.0
+        assert bucket.wait_time(1000) <= 60  # Capped at a full bucket
+
+    def test_estimate_request_tokens(self):
+        assert estimate_request_tokens({"input": "a" * 400, "max_output_tokens": 50}) > 150
+        assert estimate_request_tokens({"input": "a" * 400, "max_output_tokens": 50}) < 200
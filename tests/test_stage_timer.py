@@ -0,0 +1,74 @@
+import time
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from fastapi.testclient import TestClient
+
+from app.main import app
+from utils import StageTimer
+from llms.factory import LLMFetcher
+from core.content_enrichment.ContentGenerator import ContentGenerator
+
+
+class TestStageTimer:
+    """Test suite for per-stage request timings"""
+
+    def test_stages_add_up(self):
+        timer = StageTimer()
+        timer.add("llm_queue", 0.25)
+        timer.add("llm_queue", 0.5)
+        with timer.stage("prompt"):
+            time.sleep(0.01)
+
+        timings = timer.as_ms()
+        assert timings["llm_queue"] == 750.0
+        assert timings["prompt"] >= 10
+
+    def test_server_timing_header_value(self):
+        timer = StageTimer()
+        timer.add("validation", 0.0012)
+        timer.add("llm", 1.5)
+
+        value = timer.server_timing()
+        assert value.startswith("validation;dur=1.2, llm;dur=1500.0, total;dur=")
+
+    def test_server_timing_header_is_sent(self):
+        response = TestClient(app).get("/status")
+        assert response.headers["Server-Timing"].startswith("total;dur=")
+
+    @pytest.mark.asyncio
+    async def test_generate_records_stages(self, generate_request_html, mock_llm_fetcher):
+        generator = ContentGenerator(generate_request_html)
+        await generator.generate()
+
+        assert {"prompt", "cache", "llm_queue", "llm"} <= set(generator.timer.as_ms())
+
+    @pytest.mark.asyncio
+    async def test_stream_records_time_to_first_token(self, elaborate_request_html, mock_llm_fetcher, mock_llm_stream):
+        mock_llm_fetcher.async_client.responses.create.return_value = mock_llm_stream()
+        timer = StageTimer()
+        generator = ContentGenerator(elaborate_request_html, timer)
+        [delta async for delta in generator.stream()]
+
+        timings = timer.as_ms()
+        assert {"llm_ttft", "llm"} <= set(timings)
+        assert timings["llm_ttft"] <= timings["llm"]
+
+    @pytest.mark.asyncio
+    async def test_llm_stage_excludes_queue_time(self):
+        @asynccontextmanager
+        async def slow_acquire(model, tokens, priority):
+            await asyncio.sleep(0.05)
+            yield MagicMock()
+
+        fetcher = LLMFetcher(provider="openai")
+        fetcher.limiter = MagicMock(acquire=slow_acquire)
+        fetcher.async_client = MagicMock()
+        fetcher.async_client.responses.create = AsyncMock(return_value=MagicMock(model="gpt-4.1-mini"))
+        timer = StageTimer()
+        await fetcher.create_response(model="gpt-4.1-mini", timer=timer, input="hi")
+
+        timings = timer.as_ms()
+        assert timings["llm_queue"] >= 50
+        assert timings["llm"] < 50
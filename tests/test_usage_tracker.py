@@ -0,0 +1,62 @@
+import pytest
+from decimal import Decimal
+from types import SimpleNamespace
+
+from utils.usage_tracker import UsageTracker, TokenUsage, sum_usage
+
+
+def make_usage(input_tokens, output_tokens, cached_tokens=0, reasoning_tokens=0):
+    return SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        total_tokens=input_tokens + output_tokens,
+        input_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+        output_tokens_details=SimpleNamespace(reasoning_tokens=reasoning_tokens)
+    )
+
+
+class TestUsageTracker:
+    """Test suite for LLM cost and token accounting"""
+
+    def test_cached_tokens_are_not_billed_twice(self):
+        # gpt-4.1-mini: $0.40 input, $0.10 cached input, $1.60 output per 1M tokens
+        usage = UsageTracker().track_response("gpt-4.1-mini", make_usage(1_000_000, 0, cached_tokens=400_000))
+
+        assert usage["cost"] == pytest.approx(0.6 * 0.40 + 0.4 * 0.10)
+        assert usage["input_tokens"] == 1_000_000
+        assert usage["cached_input_tokens"] == 400_000
+
+    def test_reasoning_tokens_are_reported(self):
+        usage = UsageTracker().track_response("o4-mini", make_usage(100, 1000, reasoning_tokens=800))
+        assert usage["reasoning_tokens"] == 800
+        assert usage["output_tokens"] == 1000
+
+    def test_dated_model_names_are_priced(self):
+        usage = UsageTracker().track_response("gpt-4.1-2025-04-14", make_usage(1_000_000, 0))
+        assert usage["cost"] == pytest.approx(2.00)
+
+    def test_cached_tokens_without_a_cached_price_are_billed_as_input(self):
+        tracker = UsageTracker()
+        token_usage = TokenUsage.from_response("computer-use-preview", make_usage(1_000_000, 0, cached_tokens=500_000))
+        assert tracker.track_usage(token_usage) == Decimal("3.00")
+
+    def test_missing_details_count_as_zero(self):
+        usage = SimpleNamespace(input_tokens=1000, output_tokens=10, input_tokens_details=None)
+        breakdown = UsageTracker().track_response("gpt-4.1-mini", usage)
+
+        assert breakdown["cached_input_tokens"] == 0
+        assert breakdown["reasoning_tokens"] == 0
+        assert breakdown["cost"] > 0
+
+    def test_unknown_model_is_unpriced_not_free(self):
+        assert UsageTracker().track_response("not-a-model", make_usage(1000, 10))["cost"] is None
+
+    def test_sum_usage(self):
+        totals = sum_usage([
+            {"input_tokens": 100, "cached_input_tokens": 50, "output_tokens": 10, "reasoning_tokens": 0, "cost": 0.25},
+            {"input_tokens": 200, "cached_input_tokens": 0, "output_tokens": 20, "reasoning_tokens": 5, "cost": None},
+            {"cost": 0.5}
+        ])
+        assert totals == {
+            "input_tokens": 300, "cached_input_tokens": 50, "output_tokens": 30, "reasoning_tokens": 5, "cost": 0.75
+        }
@@ -1,7 +1,10 @@
-from .latency_tracker import track_latency
+from .latency_tracker import track_latency, StageTimer
 from .usage_tracker import UsageTracker
+from .http_client import create_http_session
 
 __all__ = [
     'track_latency',
-    'UsageTracker'
+    'StageTimer',
+    'UsageTracker',
+    'create_http_session'
 ]
@@ -0,0 +1,17 @@
+import aiohttp
+
+from settings import HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_SECONDS, HTTP_TIMEOUT_SECONDS
+
+def create_http_session() -> aiohttp.ClientSession:
+    '''
+        Application-lifetime HTTP client. Connections (DNS, TCP and TLS) are pooled and kept alive between requests,
+        so create one per process (FastAPI lifespan, summaries worker) and close it on shutdown.
+        Must be called from within a running event loop.
+    '''
+    connector = aiohttp.TCPConnector(
+        limit = HTTP_POOL_LIMIT,
+        limit_per_host = HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout = HTTP_KEEPALIVE_SECONDS,
+        ttl_dns_cache = 300
+    )
+    return aiohttp.ClientSession(connector = connector, timeout = aiohttp.ClientTimeout(total = HTTP_TIMEOUT_SECONDS))
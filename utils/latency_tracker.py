@@ -1,5 +1,10 @@
 import time
 import functools
+from typing import Optional
+from contextlib import contextmanager
+from collections import deque, defaultdict
+
+from settings import CONTENT_HEDGE_MIN_SAMPLES, CONTENT_HEDGE_WINDOW_SIZE
 
 def track_latency(func):
     @functools.wraps(func)
@@ -8,3 +13,58 @@ def track_latency(func):
         result = await func(*args, **kwargs)
         return (result, round(time.time() - start_time, 4))
     return wrapper
+
+class StageTimer:
+    '''
+        Durations of the named stages of a request, on the monotonic clock.
+        A stage recorded more than once (retries, hedged calls) adds up.
+    '''
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start_time)
+
+    def elapsed(self) -> float:
+        '''Seconds since the timer was created.'''
+        return time.perf_counter() - self.started_at
+
+    def as_ms(self) -> dict[str, float]:
+        return {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()}
+
+    def server_timing(self) -> str:
+        '''Server-Timing header value: every stage, then the total so far.'''
+        metrics = [f'{stage};dur={ms}' for stage, ms in self.as_ms().items()]
+        metrics.append(f'total;dur={round(self.elapsed() * 1000, 1)}')
+        return ', '.join(metrics)
+
+class LatencyWindow:
+    '''The most recent latencies (seconds) of one model.'''
+
+    def __init__(self, size: int = CONTENT_HEDGE_WINDOW_SIZE, min_samples: int = CONTENT_HEDGE_MIN_SAMPLES):
+        self.samples = deque(maxlen = size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+# Per model, fed by LLMFetcher with the latency of every successful call (see core/content_enrichment/hedging.py)
+_latency_windows: dict[str, LatencyWindow] = defaultdict(LatencyWindow)
+
+def get_latency_window(model: str) -> LatencyWindow:
+    return _latency_windows[model]
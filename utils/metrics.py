@@ -0,0 +1,174 @@
+'''
+    Process-wide metrics, exposed in the Prometheus text format at /metrics.
+    Kept dependency free and cheap: recording is a dict update under a lock, all formatting happens at scrape time.
+    Label values must stay low-cardinality (route templates, model names, functions), never ids or free text.
+'''
+import math
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120, 300)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+class _Metric:
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self._labels(key))} {_format_value(value)}' for key, value in items]
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}', *self.samples()]
+        return '\n'.join(lines)
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError('Counters can only go up')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def get(self, **labels) -> tuple[int, float]:
+        '''(count, sum) of the observations.'''
+        counts, total = self._values.get(self._key(labels), ([0], 0.0))
+        return sum(counts), total
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, (counts, total) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels({**labels, "le": _format_value(bound)})} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[_Metric] = []
+        # Called before every render, to set gauges that are read rather than tracked (e.g. DB pool stats)
+        self.collectors = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template', ('method', 'route', 'status')
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge('http_requests_in_flight', 'HTTP requests being handled'))
+LLM_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'llm_request_duration_seconds', 'LLM call latency (rate limiter wait excluded) by model and outcome', ('model', 'outcome'),
+    buckets = LLM_LATENCY_BUCKETS
+))
+LLM_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge('llm_requests_in_flight', 'LLM calls sent and not yet answered', ('model',)))
+LLM_TOKENS = REGISTRY.register(Counter(
+    'llm_tokens_total', 'Tokens by model, function and type (input excludes cached_input)', ('model', 'function', 'type')
+))
+LLM_COST = REGISTRY.register(Counter('llm_cost_usd_total', 'LLM cost in USD by model and function', ('model', 'function')))
+DB_POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    'db_pool_connections', 'DB connection pool connections by pool and state', ('pool', 'state')
+))
+
+def record_llm_tokens(model: str, function: str, usage) -> None:
+    '''Tokens of one LLM response, usage being the API's (or a TokenUsage).'''
+    details = getattr(usage, 'input_tokens_details', None)
+    cached = (getattr(details, 'cached_tokens', 0) or 0) if details else 0
+    LLM_TOKENS.inc(max(0, usage.input_tokens - cached), model = model, function = function, type = 'input')
+    LLM_TOKENS.inc(cached, model = model, function = function, type = 'cached_input')
+    LLM_TOKENS.inc(usage.output_tokens, model = model, function = function, type = 'output')
+
+def record_llm_cost(model: str, function: str, cost) -> None:
+    if cost:
+        LLM_COST.inc(float(cost), model = model, function = function)
+
+def _collect_db_pools():
+    from db.base import engine, async_engine
+
+    for name, pool in (('sync', engine.pool), ('async', async_engine.sync_engine.pool)):
+        for state in ('size', 'checkedout', 'overflow', 'checkedin'):
+            stat = getattr(pool, state, None)
+            if callable(stat):
+                DB_POOL_CONNECTIONS.set(stat(), pool = name, state = state)
+
+REGISTRY.add_collector(_collect_db_pools)
@@ -9,6 +9,8 @@ from decimal import Decimal
 
 import logfire
 
+from .metrics import record_llm_tokens, record_llm_cost
+
 # Per 1 million tokens
 MODEL_PRICING = {
     # GPT-4.1 Series
@@ -182,14 +184,62 @@ class TokenUsage:
             return self.input_tokens
         return self.input_tokens - self.input_tokens_details.cached_tokens
 
+    @property
+    def cached_input_tokens(self) -> int:
+        return self.input_tokens_details.cached_tokens if self.input_tokens_details else 0
+
+    @property
+    def reasoning_tokens(self) -> int:
+        '''Included in output_tokens, and billed as output.'''
+        return self.output_tokens_details.reasoning_tokens if self.output_tokens_details else 0
+
+    @classmethod
+    def from_response(cls, model: str, usage) -> 'TokenUsage':
+        '''
+            From the usage of an API response (or anything shaped like it).
+            Missing or None counts and details are taken as 0, rather than failing the cost calculation.
+        '''
+        def count(obj, name: str) -> int:
+            return int(getattr(obj, name, 0) or 0)
+
+        input_details = getattr(usage, 'input_tokens_details', None)
+        output_details = getattr(usage, 'output_tokens_details', None)
+        input_tokens, output_tokens = count(usage, 'input_tokens'), count(usage, 'output_tokens')
+        return cls(
+            input_tokens = input_tokens,
+            output_tokens = output_tokens,
+            total_tokens = count(usage, 'total_tokens') or input_tokens + output_tokens,
+            model = model,
+            input_tokens_details = InputTokensDetails(cached_tokens = count(input_details, 'cached_tokens')),
+            output_tokens_details = OutputTokensDetails(reasoning_tokens = count(output_details, 'reasoning_tokens'))
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            'input_tokens': self.input_tokens,
+            'cached_input_tokens': self.cached_input_tokens,
+            'output_tokens': self.output_tokens,
+            'reasoning_tokens': self.reasoning_tokens
+        }
+
+USAGE_FIELDS = ('input_tokens', 'cached_input_tokens', 'output_tokens', 'reasoning_tokens')
+
+def sum_usage(breakdowns: list[dict]) -> dict:
+    '''Totals of UsageTracker.track_response breakdowns; a None (unpriced) cost counts as 0.'''
+    totals = {field: sum(breakdown.get(field) or 0 for breakdown in breakdowns) for field in USAGE_FIELDS}
+    totals['cost'] = round(sum(breakdown.get('cost') or 0 for breakdown in breakdowns), 6)
+    return totals
+
 class UsageTracker:
     '''
         Tracks and calculates costs for AI model usage.
         This tracker maintains cumulative totals of tokens and costs for each model.
         Use reset() to clear the tracking data when needed.
+        Every cost calculated is also added to the process-wide metrics (utils/metrics.py), labelled with `function`.
     '''
     
-    def __init__(self):
+    def __init__(self, function: str = 'unknown'):
+        self.function = function
         self.total_costs: Dict[str, Decimal] = {}  # Model -> total cost
         self.total_tokens: Dict[str, Dict[str, int]] = {}  # Model -> {input/output/cached} -> count
     
@@ -200,13 +250,15 @@ class UsageTracker:
         
         pricing = MODEL_PRICING[model]
         
-        # Calculate costs for cached and non-cached input tokens separately
+        # Calculate costs for cached and non-cached input tokens separately.
+        # Models without a cached price bill cached tokens as regular input.
         cached_input_cost = Decimal('0')
-        if usage.input_tokens_details and usage.input_tokens_details.cached_tokens and pricing['cached_input'] is not None:
+        if usage.input_tokens_details and usage.input_tokens_details.cached_tokens:
+            cached_input_price = pricing['cached_input'] if pricing['cached_input'] is not None else pricing['input']
             cached_input_cost = (
                 Decimal(str(usage.input_tokens_details.cached_tokens)) / 
                 Decimal('1000000') * 
-                Decimal(str(pricing['cached_input']))
+                Decimal(str(cached_input_price))
             )
         
         non_cached_input_cost = (
@@ -228,23 +280,25 @@ class UsageTracker:
             Track usage and return the cost for this request.
             This method adds to the cumulative totals for the model.
             The totals persist until reset() is called.
+            Raises ValueError for a model without pricing, once its tokens have been counted.
         '''
-        cost = self._calculate_cost(usage.model, usage)
-        
-        # Update totals
-        if usage.model not in self.total_costs:
-            self.total_costs[usage.model] = Decimal('0')
+        # Update totals; tokens were used whether or not the model has a price, so they are counted first
+        if usage.model not in self.total_tokens:
             self.total_tokens[usage.model] = {
                 'input': 0,
                 'output': 0,
                 'cached_input': 0
             }
         
-        self.total_costs[usage.model] += cost
         self.total_tokens[usage.model]['input'] += usage.input_tokens
         self.total_tokens[usage.model]['output'] += usage.output_tokens
         if usage.input_tokens_details:
             self.total_tokens[usage.model]['cached_input'] += usage.input_tokens_details.cached_tokens
+        record_llm_tokens(usage.model, self.function, usage)
+        
+        cost = self._calculate_cost(usage.model, usage)
+        self.total_costs[usage.model] = self.total_costs.get(usage.model, Decimal('0')) + cost
+        record_llm_cost(usage.model, self.function, cost)
         
         return cost
     
@@ -254,16 +308,21 @@ class UsageTracker:
             return self.total_costs.get(model, Decimal('0'))
         return sum(self.total_costs.values())
     
-    def get_responses_cost_simple(self, model: str, usage) -> float:
+    def track_response(self, model: str, usage) -> dict:
+        '''
+            Tracks the usage of an API response and returns its breakdown:
+            {'input_tokens', 'cached_input_tokens', 'output_tokens', 'reasoning_tokens', 'cost'}
+            input_tokens includes the cached ones, as the API reports them; reasoning_tokens are part of output_tokens.
+            cost (USD, float) is None when the model has no pricing, logged as an error: unpriced is not free.
+        '''
+        token_usage = TokenUsage.from_response(model, usage)
+        breakdown = token_usage.as_dict()
         try:
-            return (
-                MODEL_PRICING[model]['input'] * usage.input_tokens / 1_000_000 +
-                MODEL_PRICING[model]['output'] * usage.output_tokens / 1_000_000 +
-                MODEL_PRICING[model]['cached_input'] * usage.input_tokens_details.cached_tokens / 1_000_000
-            )
-        except Exception as e:
-            logfire.error(f'Error in {self.__class__.__name__}.{self.get_responses_cost_simple.__name__}: {e}')
-            return 0
+            breakdown['cost'] = float(self.track_usage(token_usage))
+        except ValueError as e:
+            logfire.error(f'Error in {self.__class__.__name__}.{self.track_response.__name__}: {e}')
+            breakdown['cost'] = None
+        return breakdown
 
     def get_total_tokens(self, model: Optional[str] = None) -> Dict[str, Dict[str, int]]:
         '''Get total tokens for a specific model or all models.'''